@@ -0,0 +1,103 @@
+from collections import OrderedDict
+import threading
+import pygame
+from Atlas import load_atlas, try_build_atlas
+
+ASSET_MEMORY_BUDGET = 32 * 1024 * 1024
+
+
+def surface_size_in_bytes(surface: pygame.Surface) -> int:
+    return surface.get_height() * surface.get_pitch()
+
+
+class AssetCache:
+    def __init__(self, memory_budget: int = ASSET_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        self.images = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_loads = 0
+        self.atlas_loads = 0
+        # THE ATLAS IS LOOKED FOR ON THE FIRST LOAD. IF IT IS MISSING OR STALE IT IS BUILT BY A BACKGROUND THREAD AND
+        # STAYS None UNTIL THAT IS DONE, SO THE IMAGES COME FROM THEIR OWN FILES IN THE MEANTIME
+        self.atlas = None
+        self.atlas_checked = False
+        # THE IMAGE PREFETCH THREAD SHARES THIS CACHE WITH THE MAIN THREAD
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.images)
+
+    def __str__(self):
+        return (f"AssetCache: {len(self)} images, {self.memory_used // 1024} KiB of "
+                f"{self.memory_budget // 1024} KiB, {self.hits} hits, {self.misses} misses, "
+                f"{self.disk_loads} disk loads, {self.atlas_loads} atlas loads")
+
+    def load(self, path: str, size: tuple[int, int] | None = None) -> pygame.Surface:
+        key = (path, size)
+
+        with self.lock:
+            image = self.images.get(key)
+
+            if image is not None:
+                self.hits += 1
+                self.images.move_to_end(key)
+                return image
+
+            self.misses += 1
+            # A PACKED IMAGE IS READ FROM ITS SHEET AND COUNTS AGAINST THE BUDGET LIKE ANY OTHER
+            image = self.find_in_atlas(path, size)
+            if image is not None:
+                self.atlas_loads += 1
+            elif size is None:
+                image = self.load_from_disk(path)
+            else:
+                image = pygame.transform.scale(self.load(path), size)
+
+            self.store(key, image)
+            return image
+
+    def find_in_atlas(self, path: str, size: tuple[int, int] | None) -> pygame.Surface | None:
+        if not self.atlas_checked:
+            self.atlas_checked = True
+            self.atlas = load_atlas()
+            if self.atlas is None:
+                threading.Thread(target=self.build_atlas, name="atlas-build", daemon=True).start()
+        return self.atlas.find(path, size) if self.atlas is not None else None
+
+    def build_atlas(self):
+        atlas = try_build_atlas()
+        with self.lock:
+            self.atlas = atlas
+
+    def load_from_disk(self, path: str) -> pygame.Surface:
+        self.disk_loads += 1
+        image = pygame.image.load(path)
+
+        # CONVERTING ONCE TO THE DISPLAY FORMAT MAKES EVERY LATER BLIT CHEAP, BUT NEEDS A DISPLAY MODE TO BE SET
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha() if image.get_flags() & pygame.SRCALPHA else image.convert()
+
+        return image
+
+    def store(self, key: tuple, image: pygame.Surface):
+        self.images[key] = image
+        self.memory_used += surface_size_in_bytes(image)
+
+        # EVICTING THE LEAST RECENTLY USED IMAGES, BUT NEVER THE ONE THAT WAS JUST REQUESTED
+        while self.memory_used > self.memory_budget and len(self.images) > 1:
+            _, evicted = self.images.popitem(last=False)
+            self.memory_used -= surface_size_in_bytes(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.images.clear()
+            self.memory_used = 0
+
+
+asset_cache = AssetCache()
+
+
+def load_image(path: str, size: tuple[int, int] | None = None) -> pygame.Surface:
+    return asset_cache.load(path, size)
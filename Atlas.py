@@ -0,0 +1,185 @@
+import glob
+import json
+import os
+import numpy as np
+import pygame
+import Constants as c
+
+ATLAS_DIR = os.path.join("assets", "atlas")
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+SHEET_WIDTH = 2048
+MAX_SHEET_HEIGHT = 2048
+
+ROLE_CARDS = ("BackOfRole.png", "Scientist.png", "Researcher.png", "OperationsExpert.png", "ContingencyPlanner.png",
+              "Dispatcher.png", "Medic.png", "QuarantineSpecialist.png")
+
+# (SHEET, FILES, SIZE THE GAME DRAWS THEM AT OR None FOR THEIR OWN SIZE). THE SIZE IS PART OF AN IMAGE'S KEY, AS IN THE
+# ASSET CACHE, SO A PIN IS PACKED ALREADY SCALED DOWN TO THE SIZE OF A PAWN
+ATLAS_CONTENTS = (
+    ("cards", os.path.join("assets", "Cities", "*_P.png"), None),
+    ("cards", os.path.join("assets", "Epidemic_P.png"), None),
+    ("cards", os.path.join("assets", "*_E.png"), None),
+    ("roles", [os.path.join("assets", role_card) for role_card in ROLE_CARDS], None),
+    ("pieces", os.path.join("assets", "*Pin.png"), (c.LENGTH_PLAYER, c.HEIGHT_PLAYER)),
+    ("pieces", os.path.join("assets", "ResearchStation.png"), None),
+    ("pieces", os.path.join("assets", "Cities", "BackOfCity.png"), (100, 140))
+)
+
+# A FEW SHEETS TO READ FROM INSTEAD OF A FILE TO OPEN AND DECODE PER IMAGE. THE SHEETS ARE UNCOMPRESSED RGBA: READING
+# THE PIXELS IS MORE THAN TEN TIMES CHEAPER THAN INFLATING A PNG OF THEM. python Atlas.py BUILDS THEM AHEAD OF TIME, AND
+# WHEN AN IMAGE IN THEM CHANGED THE GAME REBUILDS THEM IN THE BACKGROUND WHILE IT LOADS THE IMAGES FROM THEIR FILES
+
+
+def source_signature(path: str) -> list[int]:
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def atlas_sources() -> list[tuple]:
+    sources = []
+    for sheet, files, size in ATLAS_CONTENTS:
+        paths = [files] if isinstance(files, str) else files
+        for path in sorted(found for pattern in paths for found in glob.glob(pattern)):
+            sources.append((sheet, os.path.normpath(path), size))
+    return sources
+
+
+def pack(sizes: list[tuple[int, int]], sheet_width: int = SHEET_WIDTH,
+         max_sheet_height: int = MAX_SHEET_HEIGHT) -> list[tuple[int, int, int]]:
+    # SHELF PACKING: THE TALLEST IMAGES FIRST, LEFT TO RIGHT IN ROWS, A NEW SHEET WHEN A ROW NO LONGER FITS.
+    # RETURNS (SHEET, X, Y) FOR EVERY SIZE
+    placements = [None] * len(sizes)
+    sheet = x = y = row_height = 0
+
+    for number in sorted(range(len(sizes)), key=lambda k: sizes[k][1], reverse=True):
+        width, height = sizes[number]
+        if x + width > sheet_width:
+            x, y, row_height = 0, y + row_height, 0
+        if y + height > max_sheet_height:
+            sheet, x, y, row_height = sheet + 1, 0, 0, 0
+
+        placements[number] = (sheet, x, y)
+        x += width
+        row_height = max(row_height, height)
+
+    return placements
+
+
+class Atlas:
+    def __init__(self, atlas_dir: str, sheet_files: list, regions: list):
+        self.atlas_dir = atlas_dir
+        # (FILE, WIDTH, HEIGHT) OF EVERY SHEET
+        self.sheet_files = sheet_files
+        self.sheets = [None] * len(sheet_files)
+        # (PATH, SIZE) -> (SHEET, RECT OF THE IMAGE IN IT)
+        self.regions = {(path, tuple(size) if size else None): (sheet, pygame.Rect(x, y, width, height))
+                        for path, size, sheet, x, y, width, height in regions}
+
+    def __len__(self):
+        return len(self.regions)
+
+    def sheet(self, number: int) -> np.ndarray:
+        # A SHEET IS MEMORY MAPPED, NOT READ: ONLY THE PAGES OF THE IMAGES THAT ARE CUT OUT OF IT ARE EVER LOADED
+        if self.sheets[number] is None:
+            sheet_file, width, height = self.sheet_files[number]
+            self.sheets[number] = np.memmap(os.path.join(self.atlas_dir, sheet_file), dtype=np.uint8, mode="r",
+                                            shape=(height, width, 4))
+        return self.sheets[number]
+
+    def find(self, path: str, size: tuple[int, int] | None = None) -> pygame.Surface | None:
+        # A COPY OF THE IMAGE'S PIXELS FROM ITS SHEET, OR None IF IT WASN'T PACKED. THE IMAGE IS A SURFACE OF ITS OWN,
+        # SO IT IS KEPT AND EVICTED BY THE ASSET CACHE LIKE AN IMAGE LOADED FROM ITS FILE
+        region = self.regions.get((os.path.normpath(path), size))
+        if region is None:
+            return None
+
+        sheet, rect = region
+        pixels = self.sheet(sheet)[rect.top:rect.bottom, rect.left:rect.right]
+        image = pygame.image.frombytes(pixels.tobytes(), rect.size, "RGBA")
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()
+        return image
+
+
+def build_atlas(atlas_dir: str = ATLAS_DIR) -> Atlas:
+    sources = atlas_sources()
+    images = []
+    for _, path, size in sources:
+        image = pygame.image.load(path)
+        images.append(image if size is None else pygame.transform.scale(image, size))
+
+    os.makedirs(atlas_dir, exist_ok=True)
+    sheet_files = []
+    regions = []
+
+    for sheet_name in dict.fromkeys(sheet for sheet, _, _ in sources):
+        members = [number for number, source in enumerate(sources) if source[0] == sheet_name]
+        placements = pack([images[number].get_size() for number in members])
+
+        for sheet_number in range(max(sheet for sheet, _, _ in placements) + 1):
+            placed = [(number, x, y) for number, (sheet, x, y) in zip(members, placements) if sheet == sheet_number]
+            width = max(x + images[number].get_width() for number, x, _ in placed)
+            height = max(y + images[number].get_height() for number, _, y in placed)
+
+            sheet = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+            for number, x, y in placed:
+                # MAX ONTO THE EMPTY SHEET COPIES THE PIXELS WITH THEIR ALPHA, A NORMAL BLIT WOULD BLEND THEM WITH IT
+                sheet.blit(images[number], (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+                _, path, size = sources[number]
+                regions.append([path, size, len(sheet_files), x, y, *images[number].get_size()])
+
+            sheet_file = f"{sheet_name}_{sheet_number}.rgba"
+            with open(os.path.join(atlas_dir, sheet_file), "wb") as f:
+                f.write(pygame.image.tobytes(sheet, "RGBA"))
+            sheet_files.append([sheet_file, width, height])
+
+    manifest = {"version": FORMAT_VERSION, "sources": {path: source_signature(path) for _, path, _ in sources},
+                "sheets": sheet_files, "regions": regions}
+
+    # THE MANIFEST IS WRITTEN LAST AND IN ONE STEP, SO A HALF BUILT ATLAS IS NEVER TAKEN AS FRESH
+    manifest_file = os.path.join(atlas_dir, MANIFEST_FILE)
+    with open(manifest_file + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_file + ".tmp", manifest_file)
+
+    return Atlas(atlas_dir, sheet_files, regions)
+
+
+def read_manifest(atlas_dir: str = ATLAS_DIR) -> dict | None:
+    try:
+        with open(os.path.join(atlas_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == FORMAT_VERSION else None
+
+
+def is_atlas_fresh(manifest: dict, atlas_dir: str = ATLAS_DIR) -> bool:
+    # FRESH WHEN THE SAME IMAGES ARE PACKED, NONE OF THEM CHANGED AND ALL THE SHEETS ARE THERE
+    try:
+        return {path: source_signature(path) for _, path, _ in atlas_sources()} == manifest["sources"] and \
+            all(os.path.exists(os.path.join(atlas_dir, sheet_file)) for sheet_file, _, _ in manifest["sheets"])
+    except OSError:
+        return False
+
+
+def load_atlas(atlas_dir: str = ATLAS_DIR) -> Atlas | None:
+    # None WHEN THERE IS NO ATLAS OR IT IS STALE. IT IS NEVER BUILT HERE, THAT TAKES AS LONG AS LOADING EVERY IMAGE
+    manifest = read_manifest(atlas_dir)
+    if manifest is not None and is_atlas_fresh(manifest, atlas_dir):
+        return Atlas(atlas_dir, manifest["sheets"], manifest["regions"])
+    return None
+
+
+def try_build_atlas(atlas_dir: str = ATLAS_DIR) -> Atlas | None:
+    # NO ATLAS WITHOUT A PLACE TO WRITE IT: THE IMAGES ARE THEN LOADED ONE BY ONE AS BEFORE
+    try:
+        return build_atlas(atlas_dir)
+    except (OSError, pygame.error):
+        return None
+
+
+if __name__ == "__main__":
+    built = build_atlas()
+    print(f"Packed {len(built)} images into {len(built.sheet_files)} sheets in {built.atlas_dir}")
@@ -0,0 +1,216 @@
+import numpy as np
+import Constants as c
+from Engine import GameState, LOST
+
+# THE INFECTION PHASES AND EPIDEMICS OF MANY INDEPENDENT GAMES AT ONCE: EVERY ARRAY HAS ONE ROW PER GAME
+
+
+class InfectionBatch:
+    def __init__(self, map_data, games: int, seed=None):
+        self.games = games
+        self.cities = len(map_data)
+        self.rng = np.random.default_rng(seed)
+
+        self.colors = np.asarray(map_data.colors, dtype=np.intp)
+        self.offsets = np.asarray(map_data.offsets, dtype=np.intp)
+        self.neighbors = np.asarray(map_data.neighbors, dtype=np.intp)
+        self.degrees = np.diff(self.offsets)
+
+        # THE INFECTION DECK OF A GAME IS decks[game, bottoms[game]:tops[game]] WITH ITS TOP CARD LAST. AN EPIDEMIC
+        # DRAWS FROM THE BOTTOM AND PUTS THE DISCARD PILE ABOVE THE TOP, AND EVERY CARD IS EITHER IN THE DECK OR IN THE
+        # DISCARD PILE, SO THE TOP NEVER GOES PAST TWICE THE NUMBER OF CITIES
+        self.decks = np.zeros((games, 2 * self.cities), dtype=np.intp)
+        self.decks[:, :self.cities] = self.shuffled_decks(games)
+        self.bottoms = np.zeros(games, dtype=np.intp)
+        self.tops = np.full(games, self.cities, dtype=np.intp)
+
+        # THE DISCARD PILE IN THE ORDER THE CARDS WERE DISCARDED
+        self.discards = np.zeros((games, self.cities), dtype=np.intp)
+        self.discard_counts = np.zeros(games, dtype=np.intp)
+
+        # WHERE IN decks EVERY STRATUM STARTS, THE FIRST ONE IS THE SHUFFLED DECK OF THE SETUP AND EVERY EPIDEMIC ADDS
+        # ONE. A CARD BELONGS TO THE LAST STRATUM THAT STARTS BELOW IT
+        self.strata_starts = np.zeros((games, max(c.EPIDEMIC_CARDS.values()) + 1), dtype=np.intp)
+        self.strata_counts = np.ones(games, dtype=np.intp)
+
+        self.cubes = np.zeros((games, self.cities, len(c.COLOR_NAMES)), dtype=np.int8)
+        self.cube_supply = np.full((games, len(c.COLOR_NAMES)), c.CUBES_PER_COLOR, dtype=np.int16)
+        self.eradicated = np.zeros((games, len(c.COLOR_NAMES)), dtype=bool)
+        self.outbreaks = np.zeros(games, dtype=np.int16)
+        self.infection_rate_counters = np.zeros(games, dtype=np.intp)
+        self.lost = np.zeros(games, dtype=bool)
+
+    @classmethod
+    def from_states(cls, states: list[GameState], seed=None) -> "InfectionBatch":
+        # A BATCH THAT CONTINUES THE GIVEN GAMES FROM WHERE THEY ARE, WITH THEIR DECKS IN THE SAME ORDER
+        batch = cls(states[0].map, len(states), seed)
+        index = states[0].map.index
+        batch.strata_starts = np.zeros((len(states), max(batch.strata_starts.shape[1],
+                                                          max(len(state.infection_strata) for state in states))),
+                                       dtype=np.intp)
+
+        for game, state in enumerate(states):
+            deck = [index[card.name] for card in reversed(state.infection_deck.snapshot())]
+            batch.decks[game, :len(deck)] = deck
+            batch.tops[game] = len(deck)
+
+            discards = [index[card.name] for card in state.infection_discard_pile]
+            batch.discards[game, :len(discards)] = discards
+            batch.discard_counts[game] = len(discards)
+
+            strata = state.infection_strata or [len(deck)]
+            batch.strata_starts[game, :len(strata)] = np.cumsum([0] + strata[:-1])
+            batch.strata_counts[game] = len(strata)
+
+            batch.cubes[game] = state.cubes
+            batch.cube_supply[game] = state.cube_supply
+            batch.eradicated[game] = state.eradicated
+            batch.outbreaks[game] = state.outbreaks
+            batch.infection_rate_counters[game] = state.infection_rate_counter
+            batch.lost[game] = state.status == LOST
+        return batch
+
+    def to_states(self, states: list[GameState]):
+        # WRITES THE BATCH BACK INTO THE GAMES IT WAS MADE FROM, WITH THEIR STRATA AND THEIR HASHES UP TO DATE
+        for game, state in enumerate(states):
+            names = state.map.names
+            cards = {card.name: card for card in state.infection_deck}
+            cards.update((card.name, card) for card in state.infection_discard_pile)
+
+            bottom, top = self.bottoms[game], self.tops[game]
+            deck = self.decks[game, bottom:top]
+            state.infection_deck.restore(tuple(cards[names[city]] for city in deck[::-1].tolist()))
+            state.infection_discard_pile.restore(tuple(cards[names[city]] for city in
+                                                       self.discards[game, :self.discard_counts[game]].tolist()))
+
+            starts = self.strata_starts[game, :self.strata_counts[game]]
+            below = starts[None, :] <= np.arange(bottom, top)[:, None]
+            strata = len(starts) - 1 - np.argmax(below[:, ::-1], axis=1)
+
+            state.cubes[:] = self.cubes[game]
+            state.cube_supply = self.cube_supply[game].tolist()
+            state.eradicated = self.eradicated[game].tolist()
+            state.outbreaks = int(self.outbreaks[game])
+            state.infection_rate_counter = int(self.infection_rate_counters[game])
+            if self.lost[game]:
+                state.status = LOST
+            state.index_infection_strata(np.bincount(strata, minlength=len(starts)).tolist())
+            state.rehash()
+
+    def shuffled_decks(self, games: int) -> np.ndarray:
+        return np.argsort(self.rng.random((games, self.cities)), axis=1)
+
+    @property
+    def infection_rates(self) -> np.ndarray:
+        rates = np.asarray(c.INFECTION_RATES)
+        return rates[np.minimum(self.infection_rate_counters, len(rates) - 1)]
+
+    def draw(self, games: np.ndarray) -> (np.ndarray, np.ndarray):
+        # THE TOP CARD OF EVERY GAME GOES TO ITS DISCARD PILE. A GAME WITH AN EMPTY DECK DRAWS NOTHING, SO THE GAMES
+        # THAT DID DRAW ARE RETURNED WITH THEIR CARDS
+        games = games[self.tops[games] > self.bottoms[games]]
+        self.tops[games] -= 1
+        cards = self.decks[games, self.tops[games]]
+        self.discard(games, cards)
+        return games, cards
+
+    def discard(self, games: np.ndarray, cards: np.ndarray):
+        self.discards[games, self.discard_counts[games]] = cards
+        self.discard_counts[games] += 1
+
+    def infect_initial(self):
+        # FIRST INFECTIONS OF 9 CITIES: 3 CITIES WITH 3, 2 AND 1 CUBES
+        everyone = np.arange(self.games)
+        for cubes in (3, 2, 1):
+            for _ in range(3):
+                self.add_cubes(*self.draw(everyone), cubes)
+
+    def infection_phase(self):
+        rates = self.infection_rates
+        for card_number in range(rates.max()):
+            games = np.flatnonzero((card_number < rates) & ~self.lost)
+            if len(games):
+                self.add_cubes(*self.draw(games), 1)
+
+    def epidemic(self, games: np.ndarray):
+        games = games[~self.lost[games]]
+        self.infection_rate_counters[games] += 1
+
+        # INFECT: THE BOTTOM CARD GETS 3 CUBES
+        drawing = games[self.tops[games] > self.bottoms[games]]
+        cities = self.decks[drawing, self.bottoms[drawing]]
+        self.bottoms[drawing] += 1
+        self.add_cubes(drawing, cities, 3)
+        self.discard(drawing, cities)
+
+        # INTENSIFY: EVERY DISCARD PILE IS SHUFFLED BY SORTING RANDOM KEYS, THE EMPTY END OF THE ROW SORTS LAST, AND IS
+        # PUT ON TOP OF ITS DECK AS A NEW STRATUM
+        counts = self.discard_counts[games]
+        columns = np.arange(self.cities)
+        filled = columns < counts[:, None]
+        keys = np.where(filled, self.rng.random((len(games), self.cities)), np.inf)
+        shuffled = np.take_along_axis(self.discards[games], np.argsort(keys, axis=1), axis=1)
+        self.decks[np.repeat(games, counts), (self.tops[games][:, None] + columns)[filled]] = shuffled[filled]
+
+        if self.strata_counts[games].max(initial=0) >= self.strata_starts.shape[1]:
+            self.strata_starts = np.pad(self.strata_starts, ((0, 0), (0, self.strata_starts.shape[1])))
+        self.strata_starts[games, self.strata_counts[games]] = self.tops[games]
+        self.strata_counts[games] += 1
+
+        self.tops[games] += counts
+        self.discard_counts[games] = 0
+
+    def add_cubes(self, games: np.ndarray, cities: np.ndarray, number: int):
+        colors = self.colors[cities]
+        placing = ~self.eradicated[games, colors]
+        games, cities, colors = games[placing], cities[placing], colors[placing]
+
+        # MOST CARDS DON'T CAUSE AN OUTBREAK, SO THE FIRST CUBES ARE PLACED WITH ONE VALUE PER GAME
+        current = self.cubes[games, cities, colors].astype(np.int16)
+        updated = np.minimum(current + number, 3)
+        self.cubes[games, cities, colors] = updated
+        self.cube_supply[games, colors] -= (updated - current).astype(np.int16)
+
+        overflow = current + number > 3
+        if overflow.any():
+            self.outbreak(games[overflow], cities[overflow], colors[overflow])
+
+        self.lost[games] |= (self.outbreaks[games] >= c.OUTBREAK_LIMIT) | (self.cube_supply[games, colors] < 0)
+
+    def outbreak(self, games: np.ndarray, cities: np.ndarray, colors: np.ndarray):
+        # ONE CHAIN PER GAME; A CHAIN SPREADS WAVE BY WAVE WHERE EVERY WAVE IS A FEW ARRAY OPERATIONS
+        outbroken = np.zeros((len(games), self.cities), dtype=bool)
+        outbroken[np.arange(len(games)), cities] = True
+        self.outbreaks[games] += 1
+        incoming = self.spread(outbroken)
+        every_city = np.arange(self.cities)
+
+        while True:
+            receiving = (incoming > 0) & ~outbroken
+            if not receiving.any():
+                break
+
+            current = self.cubes[games[:, None], every_city, colors[:, None]].astype(np.int16)
+            total = current + incoming
+            overflow = receiving & (total > 3)
+            updated = np.where(receiving, np.minimum(total, 3), current)
+
+            self.cubes[games[:, None], every_city, colors[:, None]] = updated
+            self.cube_supply[games, colors] -= (updated - current).sum(axis=1).astype(np.int16)
+
+            outbroken |= overflow
+            self.outbreaks[games] += overflow.sum(axis=1).astype(np.int16)
+            incoming = self.spread(overflow)
+
+    def spread(self, overflow: np.ndarray) -> np.ndarray:
+        # EVERY OUTBREAKING CITY SENDS ONE CUBE TO EACH OF ITS NEIGHBORS THROUGH THE CSR ADJACENCY
+        chains, cities = np.nonzero(overflow)
+        incoming = np.zeros(overflow.shape, dtype=np.int16)
+        if len(cities) == 0:
+            return incoming
+
+        degrees = self.degrees[cities]
+        first_entry = np.repeat(self.offsets[cities] - np.cumsum(degrees) + degrees, degrees)
+        targets = self.neighbors[first_entry + np.arange(degrees.sum())]
+        np.add.at(incoming, (np.repeat(chains, degrees), targets), 1)
+        return incoming
@@ -1,33 +1,45 @@
-import math
-import os
 from Player import Player
 from Button import Button
-import networkx.classes.reportviews
+from Widgets import Panel, Label
 import pygame
-import networkx as nx
-import json
+import numpy as np
 import Constants as c
 import Images as i
-
-
-def color_map(color_name):
-    color_mapping = {
-        "Red": c.RED,
-        "Yellow": c.YELLOW,
-        "Blue": c.BLUE,
-        "Black": c.BLACK
-    }
-
-    return color_mapping.get(color_name)
-
-
-def distance_between_click_and_city(m_x, m_y, city_x, city_y):
-    return math.sqrt((m_x - city_x) ** 2 + (m_y - city_y) ** 2)
-
-
+from Fonts import render_text
+from SpatialIndex import UniformGrid
+from Viewport import Camera, EdgeIndex, world_size, CITY_MARGIN
+from Distances import cities_in
+from Forecast import InfectionForecast
+from MapCompiler import load_map
+from Engine import GameState, CharterFlight, DirectFlight, BuildResearchStation, WON
+from SaveGame import save_game, CHECKPOINT_FILE
+from Profiling import profiler, timed
+from Fonts import text_cache, get_font
+from Assets import asset_cache
+import Input
+
+
+ACTION_MENU_RECT = pygame.Rect(0, 540, 1500, 260)
+ACTION_TAB_RECT = pygame.Rect(0, 780, 1500, 20)
+CURRENT_PLAYER_RECT = pygame.Rect(20, 20, 100, 60)
+OUTBREAKS_RECT = pygame.Rect(20, 500, 220, 35)
+INFECTION_RATE_RECT = pygame.Rect(1085, 30, 415, 115)
+OUTBREAK_FLASH_TIME = 150
+PROFILING_OVERLAY_RECT = pygame.Rect(20, 90, 420, 200)
+PROFILING_OVERLAY_TIMERS = ("display_board", "display_connecting_lines", "display_cities", "write",
+                            "create_city_buttons", "handle_click", "deck.draw")
+# WHERE THE FIRST, SECOND AND THIRD CUBE COUNTS OF A CITY ARE WRITTEN, LEFT OR RIGHT OF ITS CENTER
+DISEASE_OFFSETS = (-30, 10, -50)
+# THE INFECTION RISK HEATMAP: A RING AROUND EVERY CITY THAT CAN BE DRAWN IN THE NEXT INFECTION PHASE, FROM YELLOW FOR
+# UNLIKELY TO RED FOR CERTAIN, AND THE EXPECTED OUTBREAKS PER COLOR UNDER THE INFECTION RATE
+HEAT_RING_GAP = 2
+HEAT_RING_WIDTH = 4
+OUTBREAK_FORECAST_RECT = pygame.Rect(1085, 150, 415, 35)
+
+
+@timed("write")
 def write(screen, text, text_size, x, y, color=c.RED, has_background=False):
-    font = pygame.font.Font(None, text_size)
-    text = font.render(text, True, color, c.WHITE if has_background else None)
+    text = render_text(text, text_size, color, c.WHITE if has_background else None)
     screen.blit(text, (x, y))
 
 
@@ -41,155 +53,227 @@ def iterate_diseases(city_diseases):
             yield number, color
 
 
-def load_json_from_file(file_name):
-    with open(file_name) as f:
-        data = json.load(f)
-    return data
-
-
 class City:
-    def __init__(self, name, color, image, x, y, has_research_station):
-        self.name = name
-        self.color = color_map(color)
-        self.image = image
-        self.diseases = {
-            c.RED: 0,
-            c.BLUE: 0,
-            c.YELLOW: 0,
-            c.BLACK: 0
-        }
-        self.has_research_station = has_research_station
-        self.x = x
-        self.y = y
+    # A CITY IS ONLY A VIEW ONTO THE BOARD'S ARRAYS: THE MAP FOR WHAT NEVER CHANGES, THE GameState FOR THE REST
+    __slots__ = ("board", "index")
+
+    def __init__(self, board, index):
+        self.board = board
+        self.index = index
 
     def __str__(self):
         return (f"{self.name} - Color: {self.color}, "
                 f"Diseases: {self.diseases}")
 
+    @property
+    def name(self) -> str:
+        return self.board.map.names[self.index]
+
+    @property
+    def color(self) -> tuple[int, int, int]:
+        return c.DISEASE_COLORS[self.board.map.colors[self.index]]
+
+    @property
+    def image(self) -> str:
+        return self.board.map.images[self.index]
+
+    @property
+    def x(self) -> int:
+        return int(self.board.map.xs[self.index])
+
+    @property
+    def y(self) -> int:
+        return int(self.board.map.ys[self.index])
+
+    @property
+    def diseases(self) -> dict:
+        return dict(zip(c.DISEASE_COLORS, self.board.state.cubes[self.index].tolist()))
+
+    @property
+    def has_research_station(self) -> bool:
+        return self.board.state.has_research_station(self.index)
+
     def add_diseases(self, number, color):
-        if self.diseases[color] + number < 4:
-            self.diseases[color] = self.diseases[color] + number
-            print(f"Added to {self.name} {number} cubes")
-        else:
-            pass  # WRITE AN OUTBREAK!!!!!!!!!!!!!!
+        return self.board.state.add_cubes(self.index, c.DISEASE_COLORS.index(color), number)
 
     def remove_diseases(self, number, color):
-        if self.diseases[color] - number > 0:
-            self.diseases[color] = self.diseases[color] - number
-        else:
-            self.diseases[color] = 0
+        self.board.state.remove_cubes(self.index, c.DISEASE_COLORS.index(color), number)
 
 
 class Board:
     def __init__(self):
         self.cities = {}
-        self.graph = nx.Graph()
+        self.city_index = UniformGrid(2 * c.RADIUS_OF_CIRCLE)
+        self.map = None
+        self.state = None
         self.player_count = 0
         self.difficulty = ""
-        self.outbreaks_counter = 0
-        self.infection_rate_counter = 0
 
-    def add_cities(self):
-        data = load_json_from_file("cities.json")
+    @property
+    def outbreaks_counter(self) -> int:
+        return self.state.outbreaks if self.state is not None else 0
 
-        # INITIALIZING THE CITIES
-        for city_data in data:
-            image = os.path.join(*city_data["image"].split(","))
+    @property
+    def infection_rate_counter(self) -> int:
+        return self.state.infection_rate_counter if self.state is not None else 0
 
-            city = City(city_data["name"], city_data["color"], image, city_data["x"], city_data["y"],
-                        True if city_data["name"] == "Atlanta" else False)
+    def add_cities(self):
+        # THE COMPILED MAP IS USED WHEN IT IS NEWER THAN cities.json AND connections.json
+        if self.map is None:
+            self.map = load_map()
+            # THE DISTANCE TABLE AND WHAT EVERY CITY REACHES ARE BUILT WITH THE MAP, SO A MOVEMENT QUERY IS A LOOKUP
+            self.map.distances
+        self.state = GameState(self.map)
 
-            self.graph.add_node(city)
+        # INITIALIZING THE CITIES
+        for index in range(len(self.map)):
+            city = City(self, index)
             self.cities[city.name] = city
+            self.city_index.insert(city.name, city.x, city.y)
+
+    def start_game(self, roles: list[str], seed=None):
+        self.state = GameState(self.map, self.difficulty, seed)
+        self.state.setup(roles)
 
-    def add_connections(self):
-        connections = load_json_from_file("connections.json")
+    def resume_game(self, state: GameState):
+        self.state = state
+        self.difficulty = state.difficulty
+        self.player_count = len(state.players)
 
-        # ADDING THE CONNECTIONS IN THE GRAPH
-        for connection in connections:
-            city1 = connection["city1"]
-            city2 = connection["city2"]
+    @property
+    def distances(self):
+        return self.map.distances
 
-            self.graph.add_edge(city1, city2)
+    @property
+    def research_stations(self) -> int:
+        return self.state.research_stations if self.state is not None else 0
 
     def has_edge(self, chosen_city: str, player_city: str) -> bool:
-        return self.graph.has_edge(chosen_city, player_city)
+        return self.distances.distance(self.map.index[chosen_city], self.map.index[player_city]) == 1
 
-    def get_city_at_coordinates(self, mouse_x: int, mouse_y: int) -> str | None:
-        for city in self.cities:
-            if distance_between_click_and_city(mouse_x, mouse_y, self.cities[city].x,
-                                               self.cities[city].y) < c.RADIUS_OF_CIRCLE:
-                return city
+    def distance(self, city1: str, city2: str, with_shuttles: bool = True) -> int:
+        return self.distances.distance(self.map.index[city1], self.map.index[city2],
+                                       self.research_stations if with_shuttles else 0)
+
+    def can_reach(self, city: str, target: str, moves: int, with_shuttles: bool = True) -> bool:
+        return self.distance(city, target, with_shuttles) <= moves
+
+    def reachable_cities(self, city: str, moves: int, with_shuttles: bool = True) -> list[str]:
+        reachable = self.distances.reachable_within(self.map.index[city], moves,
+                                                    self.research_stations if with_shuttles else 0)
+        return [self.map.names[index] for index in cities_in(reachable)]
+
+    def get_city_at_coordinates(self, x: float, y: float, radius: float = c.RADIUS_OF_CIRCLE) -> str | None:
+        return self.city_index.nearest_within(x, y, radius)
 
 
 class GUI:
     def __init__(self, screen: pygame.Surface, board: Board):
         self.board = board
         self.screen = screen
-        self.action_menu_open = False
-        self.action_button_list = []
+        self.static_layer = None
+        self.city_bounds = {}
+        self.drawn_state = None
+        self.invalid_rects = []
+        self.dirty_rects = []
+        self.checkpoint_file = CHECKPOINT_FILE
+        self.action_log = None
+        # WHO PLAYS EVERY PLAYER, SAVED WITH EVERY CHECKPOINT SO A RESUMED GAME KEEPS ITS AI SEATS
+        self.seats = None
+        self.profiling_overlay = False
+        self.last_drawn = None
+
+        # THE CAMERA DECIDES WHAT PART OF THE WORLD IS ON SCREEN, ONLY THE CITIES AND EDGES IN VIEW ARE DRAWN
+        world_width, world_height = world_size(board.map)
+        self.camera = Camera(world_width, world_height, *screen.get_size())
+        self.edge_index = EdgeIndex(board.map, world_width)
+        self.visible_cities = {}
+        self.visible_indices = np.zeros(0, dtype=np.intp)
+        self.city_positions = {}
+        self.marker_radius = c.RADIUS_OF_CIRCLE
+        self.show_labels = True
+        self.heatmap = False
+        self.forecast = None
+        self.heat = {}
+
+        # THE PANELS OVER THE BOARD. THE TAB OPENS THE ACTION MENU, WHICH SHOWS EITHER THE ACTION BUTTONS OR A HAND
+        self.widgets = Panel(screen.get_rect())
+        self.action_tab = self.widgets.add_panel(Panel(ACTION_TAB_RECT))
+        action_menu_background = pygame.Surface(ACTION_MENU_RECT.size, pygame.SRCALPHA)
+        action_menu_background.fill((128, 128, 128, 220))
+        self.action_menu = self.widgets.add_panel(Panel(ACTION_MENU_RECT, action_menu_background, visible=False))
+        self.action_panel = self.action_menu.add_panel(Panel(ACTION_MENU_RECT))
+        self.action_panel.add(Label(320, 710, "hand_label", "Hand", 40, c.BLACK),
+                              Label(530, 710, "build_label", "Build", 40, c.BLACK))
+        self.hand_panel = self.action_menu.add_panel(Panel(ACTION_MENU_RECT, visible=False))
 
     @staticmethod
     def get_next_input() -> (int, int):
-        while True:
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            for event in pygame.event.get():
-                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    return mouse_x, mouse_y
-
-    def display_diseases(self, city: City):
-        try:
-            iterator = iterate_diseases(city.diseases)
-
-            number, color = next(iterator)
-            write(self.screen, str(number), 40, city.x - 30, city.y - 15, color if color != c.YELLOW else c.DARK_YELLOW)
-
-            number, color = next(iterator)
-            write(self.screen, str(number), 40, city.x + 10, city.y - 15, color if color != c.YELLOW else c.DARK_YELLOW)
-
-            number, color = next(iterator)
-            write(self.screen, str(number), 40, city.x - 50, city.y - 15, color if color != c.YELLOW else c.DARK_YELLOW)
-
-        except StopIteration:
-            pass
-
-    def display_connecting_lines(self, edges: networkx.classes.reportviews.EdgeView):
-        for city1, city2 in edges:
-            if city1 == "San Francisco" and city2 == "Tokyo":
-                pygame.draw.line(self.screen, c.BLACK, (self.board.cities[city1].x, self.board.cities[city1].y),
-                                 (0, 200), 2)
-                pygame.draw.line(self.screen, c.BLACK, (self.board.cities[city2].x, self.board.cities[city2].y),
-                                 (1500, 251), 2)
-            elif city1 == "San Francisco" and city2 == "Manila":
-                pygame.draw.line(self.screen, c.BLACK, (self.board.cities[city1].x, self.board.cities[city1].y),
-                                 (0, 300), 2)
-                pygame.draw.line(self.screen, c.BLACK, (self.board.cities[city2].x, self.board.cities[city2].y),
-                                 (1500, 420), 2)
-            elif city1 == "Los Angeles" and city2 == "Sydney":
-                pygame.draw.line(self.screen, c.BLACK, (self.board.cities[city1].x, self.board.cities[city1].y),
-                                 (0, 362), 2)
-                pygame.draw.line(self.screen, c.BLACK, (self.board.cities[city2].x, self.board.cities[city2].y),
-                                 (1500, 630), 2)
-            else:
-                pygame.draw.line(self.screen, c.BLACK, (self.board.cities[city1].x, self.board.cities[city1].y),
-                                 (self.board.cities[city2].x, self.board.cities[city2].y), 2)
-
+        return Input.wait_for_click()
+
+    def disease_blits(self, city: City, x: int, y: int):
+        for (number, color), offset in zip(iterate_diseases(city.diseases), DISEASE_OFFSETS):
+            text = render_text(str(number), 40, color if color != c.YELLOW else c.DARK_YELLOW)
+            yield text, (x + offset, y - 15)
+
+    @timed("display_connecting_lines")
+    def display_connecting_lines(self, surface: pygame.Surface):
+        # ONLY THE SEGMENTS CROSSING THE VIEW ARE DRAWN. AN EDGE ACROSS THE PACIFIC (OR ANY EDGE THAT WRAPS AROUND THE
+        # WORLD) IS TWO SEGMENTS THAT END AT THE EDGES OF THE WORLD
+        segments = self.edge_index.query_rect(*self.camera.world_rect)
+        starts = zip(*(axis.tolist() for axis in self.camera.to_screen_arrays(segments[:, 0], segments[:, 1])))
+        ends = zip(*(axis.tolist() for axis in self.camera.to_screen_arrays(segments[:, 2], segments[:, 3])))
+        width = 2 if self.camera.zoom >= 1 else 1
+        for start, end in zip(starts, ends):
+            pygame.draw.line(surface, c.BLACK, start, end, width)
+
+    def display_city_markers(self, cities: dict, surface: pygame.Surface):
+        for name, city in cities.items():
+            pygame.draw.circle(surface, city.color, self.city_positions[name], self.marker_radius)
+
+    def city_blits(self, city: City):
+        # THE NAME AND THE CUBE COUNTS OF A CITY AS (SURFACE, POSITION) PAIRS, READY FOR Surface.blits
+        x, y = self.city_positions[city.name]
+        if self.show_labels:
+            yield (render_text(f"{city.name}", 25, c.GRAY if not city.has_research_station else c.BLACK, c.WHITE),
+                   (x - 15 if city.name not in ("Ho Chi Minh City", "Istanbul") else x - 60, y + 15))
+        if self.camera.show_cubes:
+            yield from self.disease_blits(city, x, y)
+
+    def display_city_heat(self, city: City):
+        probability = self.heat.get(city.name, 0)
+        if probability > 0:
+            pygame.draw.circle(self.screen, (255, round(255 * (1 - probability)), 0), self.city_positions[city.name],
+                               self.marker_radius + HEAT_RING_GAP + HEAT_RING_WIDTH, HEAT_RING_WIDTH)
+
+    def display_city(self, city: City):
+        if self.heatmap:
+            self.display_city_heat(city)
+        self.screen.blits(self.city_blits(city), doreturn=False)
+
+    @timed("display_cities")
     def display_cities(self, cities: dict):
-        radius = c.RADIUS_OF_CIRCLE
-        for key in cities:
-            city = cities[key]
-            center = (city.x, city.y)
-            pygame.draw.circle(self.screen, city.color, center, radius)
-            write(self.screen, f"{city.name}", 25,
-                  city.x - 15 if city.name not in ("Ho Chi Minh City", "Istanbul") else city.x - 60,
-                  city.y + 15, c.GRAY if not city.has_research_station else c.BLACK, True)
-            self.display_diseases(city)
+        if self.heatmap:
+            for city in cities.values():
+                self.display_city_heat(city)
+        # ZOOMED OUT FAR ENOUGH THERE IS NOTHING TO WRITE NEXT TO THE MARKERS
+        if not (self.show_labels or self.camera.show_cubes):
+            return
+        # ALL THE TEXT OF ALL THE CITIES IN ONE CALL, IN THE SAME ORDER THEY WERE WRITTEN ONE BY ONE
+        self.screen.blits([blit for city in cities.values() for blit in self.city_blits(city)], doreturn=False)
 
     def display_outbreaks(self):
         write(self.screen, "Outbreaks:", 43, 20, 500, c.BLACK)
 
         write(self.screen, f"{self.board.outbreaks_counter}", 43, 187, 503, c.GREEN)
 
+    def display_outbreak_forecast(self):
+        write(self.screen, "Outbreak risk", 30, 1100, 155, c.BLACK)
+        x = 1260
+        for color, expected in zip(c.DISEASE_COLORS, self.forecast.expected_outbreaks):
+            write(self.screen, f"{expected:.2f}", 30, x, 155, color if color != c.YELLOW else c.DARK_YELLOW)
+            x += 60
+
     def display_infection_rate(self):
         write(self.screen, "Infection rate", 50, 1170, 30, c.BLACK)
 
@@ -198,7 +282,7 @@ class GUI:
         y = 100
 
         while counter < 7:
-            pygame.draw.circle(self.screen, c.DARK_GREEN if counter == self.board.outbreaks_counter else c.GREEN,
+            pygame.draw.circle(self.screen, c.DARK_GREEN if counter == self.board.infection_rate_counter else c.GREEN,
                                (x, y), c.RADIUS_OF_CIRCLE)
 
             if counter in range(0, 3):
@@ -214,111 +298,373 @@ class GUI:
     def display_action_tab_opener(self):
         pygame.draw.rect(self.screen, c.GRAY, (0, 780, 1500, 20), border_top_left_radius=5, border_top_right_radius=5)
 
+    def build_static_layer(self):
+        # THE MAP, THE CONNECTIONS AND THE CITY MARKERS ONLY CHANGE WITH THE CAMERA, SO THEY ARE DRAWN ONCE PER VIEW
+        self.static_layer = self.draw_background()
+        self.visible_cities = self.find_visible_cities()
+        self.visible_indices = np.array([city.index for city in self.visible_cities.values()], dtype=np.intp)
+        screen_xs, screen_ys = self.camera.to_screen_arrays(self.board.map.xs[self.visible_indices],
+                                                            self.board.map.ys[self.visible_indices])
+        self.city_positions = dict(zip(self.visible_cities, zip(screen_xs.tolist(), screen_ys.tolist())))
+        self.marker_radius = self.camera.marker_radius
+        self.show_labels = self.camera.show_labels(len(self.visible_cities))
+        self.display_connecting_lines(self.static_layer)
+        self.display_city_markers(self.visible_cities, self.static_layer)
+
+        self.city_bounds = {name: self.get_city_bounds(city) for name, city in self.visible_cities.items()}
+
+    def draw_background(self) -> pygame.Surface:
+        # CONVERTING DROPS THE MAP'S ALPHA SO REPAINTED REGIONS DON'T BLEND WITH WHAT WAS ON SCREEN BEFORE
+        background = i.background.convert()
+        if self.camera.is_identity:
+            return background
+
+        # ONLY THE PART OF THE MAP IN VIEW IS SCALED
+        layer = pygame.Surface(self.screen.get_size()).convert()
+        layer.fill(c.WHITE)
+        left, top, right, bottom = self.camera.world_rect
+        visible = background.get_rect().clip(pygame.Rect(int(left), int(top), int(right - left) + 2,
+                                                         int(bottom - top) + 2))
+        if visible:
+            size = (round(visible.width * self.camera.zoom), round(visible.height * self.camera.zoom))
+            layer.blit(pygame.transform.smoothscale(background.subsurface(visible), size),
+                       self.camera.to_screen(visible.x, visible.y))
+        return layer
+
+    def find_visible_cities(self) -> dict:
+        # THE CITIES WHOSE MARKER, NAME OR CUBES CAN REACH INTO THE VIEW, IN THE ORDER OF THE MAP
+        left, top, right, bottom = self.camera.world_rect
+        margin = CITY_MARGIN / self.camera.zoom
+        names = self.board.city_index.query_rect(left - margin, top - margin, right + margin, bottom + margin)
+        return {name: self.board.cities[name] for name in sorted(names, key=self.board.map.index.__getitem__)}
+
+    def get_city_bounds(self, city: City) -> pygame.Rect:
+        x, y = self.city_positions[city.name]
+        radius = self.marker_radius
+        bounds = pygame.Rect(x - radius, y - radius, 2 * radius, 2 * radius)
+
+        if self.heatmap:
+            bounds.inflate_ip(2 * (HEAT_RING_GAP + HEAT_RING_WIDTH), 2 * (HEAT_RING_GAP + HEAT_RING_WIDTH))
+
+        if self.show_labels:
+            label = render_text(city.name, 25, c.BLACK, c.WHITE)
+            label_x = x - 15 if city.name not in ("Ho Chi Minh City", "Istanbul") else x - 60
+            bounds.union_ip(label.get_rect(topleft=(label_x, y + 15)))
+
+        if self.camera.show_cubes:
+            digit_width, digit_height = render_text("0", 40, c.BLACK).get_size()
+            bounds.union_ip(pygame.Rect(x - 50, y - 15, 60 + digit_width, digit_height))
+        return bounds
+
+    @timed("display_board")
     def display_board(self):
-        display_image(self.screen, i.background, (0, 0))
+        if self.static_layer is None:
+            self.build_static_layer()
+
+        display_image(self.screen, self.static_layer, (0, 0))
 
-        self.display_connecting_lines(self.board.graph.edges)
-        self.display_cities(self.board.cities)
+        self.display_cities(self.visible_cities)
         self.display_outbreaks()
+        if self.heatmap:
+            self.display_outbreak_forecast()
         self.display_infection_rate()
         self.display_action_tab_opener()
 
-    def display_action_menu(self):
-        self.action_menu_open = True
+    @property
+    def action_menu_open(self) -> bool:
+        return self.action_menu.visible
 
-        # STACKOVERFLOW CODE FOR TRANSPARENT RECT
-        action_menu = pygame.Surface((1500, 260), pygame.SRCALPHA)
-        action_menu.fill((128, 128, 128, 220))
-        self.screen.blit(action_menu, (0, 540))
+    @action_menu_open.setter
+    def action_menu_open(self, is_open: bool):
+        self.action_menu.set_visible(is_open)
+        self.action_tab.set_visible(not is_open)
 
-    def display_action_icons(self):
-        for button in self.action_button_list:
-            button.display_button(self.screen)
+    def show_in_action_menu(self, panel: Panel):
+        self.action_menu_open = True
+        for menu_panel in self.action_menu.panels:
+            menu_panel.set_visible(menu_panel is panel)
+        self.dirty_rects.extend(self.widgets.draw(self.screen))
 
-        write(self.screen, "Hand", 40, 320, 710, c.BLACK)
-        write(self.screen, "Build", 40, 530, 710, c.BLACK)
+        # THE BOARD UNDER THE MENU HAS TO BE REPAINTED ONCE THE MENU IS CLOSED
+        self.invalid_rects.append(ACTION_MENU_RECT)
 
-    def display_current_board_position(self, current_player: Player, players: pygame.sprite.Group):
-        self.display_board()
+    def display_action_menu(self):
+        self.show_in_action_menu(self.action_panel)
+
+    def display_current_player(self, current_player: Player):
         self.screen.blit(current_player.image, (20, 20))
         write(self.screen, f"{current_player.moves}", 60, 70, 20)
-        players.draw(self.screen)
 
-    def display_player_hand(self, card_buttons: [Button]):
-        self.display_action_menu()
+    def take_board_snapshot(self, current_player: Player, players: pygame.sprite.Group) -> dict:
+        return {
+            # THE CUBES OF THE CITIES IN VIEW, A ROW PER CITY, SO THOUSANDS OF CITIES ARE COMPARED IN ONE GO
+            "cubes": self.board.state.cubes[self.visible_indices],
+            "research_stations": self.board.research_stations,
+            "pawns": {player: player.rect.copy() for player in players},
+            "hud": (current_player, current_player.moves),
+            "outbreaks": self.board.outbreaks_counter,
+            "infection_rate": self.board.infection_rate_counter,
+            # THE RISK OF THE CITIES IN VIEW AND THE EXPECTED OUTBREAKS, ROUNDED AS THEY ARE WRITTEN
+            "heat": self.forecast.probabilities[self.visible_indices] if self.heatmap else None,
+            "outbreak_forecast": [round(expected, 2) for expected in self.forecast.expected_outbreaks]
+            if self.heatmap else None
+        }
 
-        for button in card_buttons:
-            button.display_button(self.screen)
+    def find_changed_rects(self, snapshot: dict) -> list[pygame.Rect]:
+        previous = self.drawn_state
+        rects = []
+
+        names = self.board.map.names
+        changed_cities = np.flatnonzero((previous["cubes"] != snapshot["cubes"]).any(axis=1))
+        for city in self.visible_indices[changed_cities].tolist():
+            rects.append(self.city_bounds[names[city]])
+
+        for city in cities_in(previous["research_stations"] ^ snapshot["research_stations"]):
+            if names[city] in self.city_bounds:
+                rects.append(self.city_bounds[names[city]])
+
+        if self.heatmap:
+            changed_heat = np.flatnonzero(previous["heat"] != snapshot["heat"])
+            for city in self.visible_indices[changed_heat].tolist():
+                rects.append(self.city_bounds[names[city]])
+            if previous["outbreak_forecast"] != snapshot["outbreak_forecast"]:
+                rects.append(OUTBREAK_FORECAST_RECT)
+
+        for player, rect in snapshot["pawns"].items():
+            previous_rect = previous["pawns"].get(player)
+            if previous_rect != rect:
+                rects.append(rect)
+                if previous_rect is not None:
+                    rects.append(previous_rect)
+
+        if previous["hud"] != snapshot["hud"]:
+            rects.append(CURRENT_PLAYER_RECT)
+
+        if previous["outbreaks"] != snapshot["outbreaks"] or \
+                previous["infection_rate"] != snapshot["infection_rate"]:
+            rects.append(OUTBREAKS_RECT)
+            rects.append(INFECTION_RATE_RECT)
+
+        return rects
+
+    def repaint(self, rect: pygame.Rect, current_player: Player, players: pygame.sprite.Group):
+        self.screen.set_clip(rect)
+        self.screen.blit(self.static_layer, rect.topleft, rect)
+
+        for name, bounds in self.city_bounds.items():
+            if bounds.colliderect(rect):
+                self.display_city(self.board.cities[name])
+
+        if OUTBREAKS_RECT.colliderect(rect):
+            self.display_outbreaks()
+        if INFECTION_RATE_RECT.colliderect(rect):
+            self.display_infection_rate()
+        if self.heatmap and OUTBREAK_FORECAST_RECT.colliderect(rect):
+            self.display_outbreak_forecast()
+        if ACTION_TAB_RECT.colliderect(rect):
+            self.display_action_tab_opener()
+        if CURRENT_PLAYER_RECT.colliderect(rect):
+            self.display_current_player(current_player)
 
-        pygame.display.flip()
+        players.draw(self.screen)
+        self.screen.set_clip(None)
 
-    def pick_a_card(self, card_buttons: list[Button]) -> str | None:
-        run = True
-        while run:
-            for event in pygame.event.get():
+    def display_current_board_position(self, current_player: Player, players: pygame.sprite.Group):
+        if self.static_layer is None:
+            self.build_static_layer()
+        if self.drawn_state is None:
+            # AFTER A NEW VIEW THE PAWNS ARE PLACED FOR IT BEFORE THEIR RECTS GO INTO THE SNAPSHOT
+            players.update(self.board.cities, self.camera)
+        snapshot = self.take_board_snapshot(current_player, players)
+        self.heat = dict(zip(self.visible_cities, snapshot["heat"].tolist())) if self.heatmap else {}
+
+        if self.drawn_state is None:
+            self.display_board()
+            self.display_current_player(current_player)
+            players.draw(self.screen)
+            self.dirty_rects.append(self.screen.get_rect())
+        else:
+            rects = self.find_changed_rects(snapshot) + self.invalid_rects
+            for rect in rects:
+                self.repaint(rect, current_player, players)
+            self.dirty_rects.extend(rects)
+
+        self.invalid_rects = []
+        self.drawn_state = snapshot
+        self.last_drawn = (current_player, players)
+
+        if self.profiling_overlay:
+            self.display_profiling_overlay()
+
+    def toggle_profiling_overlay(self):
+        # THE TIMERS ONLY RUN WHILE THE OVERLAY IS SHOWN
+        self.profiling_overlay = not self.profiling_overlay
+        profiler.enabled = self.profiling_overlay
+        self.invalid_rects.append(PROFILING_OVERLAY_RECT)
+
+        # WITH THE ACTION MENU OPEN THE BOARD IS REDRAWN ONCE THE MENU CLOSES
+        if self.last_drawn is not None and not self.action_menu_open:
+            self.display_current_board_position(*self.last_drawn)
+            self.update_display()
+
+    def toggle_heatmap(self):
+        # THE RINGS MAKE EVERY CITY TAKE MORE ROOM, SO THE BOARD IS REDRAWN AS FOR A NEW VIEW
+        self.heatmap = not self.heatmap
+        if self.forecast is None or self.forecast.state is not self.board.state:
+            self.forecast = InfectionForecast(self.board.state)
+        self.view_changed(True)
+
+    def display_profiling_overlay(self):
+        frame = profiler.timer("frame")
+        lines = [f"frame p50/p95/p99: {frame.percentile(0.5) * 1000:.1f}/{frame.percentile(0.95) * 1000:.1f}/"
+                 f"{frame.percentile(0.99) * 1000:.1f} ms",
+                 f"events/sec: {profiler.events_per_second}",
+                 f"text cache: {len(text_cache)} surfaces, {text_cache.hits} hits, {text_cache.misses} misses",
+                 f"assets: {len(asset_cache)} images, {asset_cache.memory_used // 1024} KiB, "
+                 f"{asset_cache.hits} hits, {asset_cache.misses} misses"]
+        lines += [str(profiler.timers[name]) for name in PROFILING_OVERLAY_TIMERS if name in profiler.timers]
+
+        overlay = pygame.Surface(PROFILING_OVERLAY_RECT.size, pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 180))
+        self.screen.blit(overlay, PROFILING_OVERLAY_RECT.topleft)
+        # THE LINES CHANGE EVERY FRAME, SO THEY DON'T GO THROUGH (AND CHURN) THE TEXT CACHE THEY REPORT ON
+        font = get_font(20)
+        for line_number, line in enumerate(lines):
+            self.screen.blit(font.render(line, True, c.WHITE), (PROFILING_OVERLAY_RECT.x + 8,
+                                                               PROFILING_OVERLAY_RECT.y + 6 + 16 * line_number))
+
+        # THE BOARD UNDER THE OVERLAY IS REPAINTED BEFORE THE OVERLAY IS DRAWN AGAIN
+        self.invalid_rects.append(PROFILING_OVERLAY_RECT)
+        self.dirty_rects.append(PROFILING_OVERLAY_RECT)
+
+    def zoom(self, factor: float, screen_position: (int, int)):
+        self.view_changed(self.camera.zoom_at(*screen_position, factor))
+
+    def pan(self, screen_dx: int, screen_dy: int):
+        self.view_changed(self.camera.pan(screen_dx, screen_dy))
+
+    def reset_camera(self):
+        self.view_changed(self.camera.reset())
+
+    def view_changed(self, changed: bool):
+        # A NEW VIEW NEEDS A NEW STATIC LAYER AND A FULL REDRAW, NOTHING ON SCREEN IS IN THE RIGHT PLACE ANYMORE
+        if not changed:
+            return
+        self.static_layer = None
+        self.drawn_state = None
+
+        # WITH THE ACTION MENU OPEN THE BOARD IS REDRAWN ONCE THE MENU CLOSES
+        if self.last_drawn is not None and not self.action_menu_open:
+            self.display_current_board_position(*self.last_drawn)
+            self.update_display()
+
+    def city_at(self, mouse_x: int, mouse_y: int) -> str | None:
+        # CLICKS ARE ON THE SCREEN, THE CITIES ARE IN THE WORLD
+        x, y = self.camera.to_world(mouse_x, mouse_y)
+        return self.board.get_city_at_coordinates(x, y, self.camera.marker_radius / self.camera.zoom)
+
+    def update_display(self):
+        # ONLY THE PARTS OF THE SCREEN THAT WERE REDRAWN ARE SENT TO THE DISPLAY
+        if self.dirty_rects:
+            pygame.display.update(self.dirty_rects)
+            self.dirty_rects = []
+            Input.frame_drawn()
 
-                if event.type == pygame.QUIT:
-                    run = False
+    def display_player_hand(self, card_buttons: [Button]):
+        self.hand_panel.replace_widgets(card_buttons)
+        self.show_in_action_menu(self.hand_panel)
 
-                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    mouse_x, mouse_y = pygame.mouse.get_pos()
+        self.update_display()
 
-                    # PLAYER TRIES TO REMOVE THE ACTION MENU
-                    if mouse_y not in range(540, 800):
-                        self.action_menu_open = False
-                        return None
+    def pick_a_card(self) -> str | None:
+        while True:
+            mouse_x, mouse_y = self.get_next_input()
 
-                    for card_button in card_buttons:
-                        if card_button.is_clicked(mouse_x, mouse_y):
-                            return card_button.info
+            # PLAYER TRIES TO REMOVE THE ACTION MENU
+            if self.widgets.panel_at(mouse_x, mouse_y) is self.widgets:
+                self.action_menu_open = False
+                return None
+
+            card_button = self.hand_panel.route(mouse_x, mouse_y)
+            if card_button is not None:
+                return card_button.info
 
     def pick_a_city(self) -> str:
         while True:
             mouse_x, mouse_y = self.get_next_input()
 
-            for city, city_data in self.board.cities.items():
-                if distance_between_click_and_city(mouse_x, mouse_y, city_data.x, city_data.y) < c.RADIUS_OF_CIRCLE:
-                    return city
+            city = self.city_at(mouse_x, mouse_y)
+            if city is not None:
+                return city
 
-    @staticmethod
-    def find_pressed_card(mouse_x, mouse_y, card_buttons):
-        for button in card_buttons:
-            if button.is_clicked(mouse_x, mouse_y):
-                return button.info
+    def apply_action(self, action, players: pygame.sprite.Group) -> bool:
+        # THE GUI ONLY TRANSLATES CLICKS INTO ACTIONS, THE RULES ARE CHECKED BY THE GameState
+        if not self.board.state.is_legal(action):
+            return False
+
+        self.board.state.apply(action)
+        players.update(self.board.cities, self.camera)
+
+        if self.action_log is not None:
+            self.action_log.record(action, self.board.state.hash)
+
+        # A CHECKPOINT AFTER EVERY ACTION, SO A CRASHED GAME CAN BE RESUMED WITH python main.py --resume
+        if self.checkpoint_file is not None:
+            save_game(self.board.state, self.checkpoint_file, self.seats)
+
+        if self.board.state.events:
+            self.display_current_board_position(players.sprites()[self.board.state.current_player], players)
+            self.animate_infection_events(self.board.state.events)
+        return True
 
-    def handle_button_action(self, card_buttons, action, player, players):
+    def animate_infection_events(self, events: list):
+        # EVERY OUTBREAK OF A CHAIN IS FLASHED IN THE ORDER IT HAPPENED
+        for event in events:
+            if not event.outbreak:
+                continue
+
+            city = self.board.cities[self.board.map.names[event.city]]
+            ring = pygame.draw.circle(self.screen, c.DISEASE_COLORS[event.color],
+                                      self.camera.to_screen(city.x, city.y), 3 * c.RADIUS_OF_CIRCLE, 4)
+
+            # THE RING IS NOT PART OF THE BOARD, SO ITS AREA IS REPAINTED WITH THE NEXT BOARD POSITION
+            self.invalid_rects.append(ring)
+            self.dirty_rects.append(ring)
+            self.update_display()
+            pygame.time.wait(OUTBREAK_FLASH_TIME)
+
+    def handle_button_action(self, action, player, players):
         while True:
             mouse_x, mouse_y = self.get_next_input()
 
-            if mouse_y not in range(540, 800):
+            if self.widgets.panel_at(mouse_x, mouse_y) is self.widgets:
                 self.action_menu_open = False
-                self.display_current_board_position(player, players)
-                pygame.display.flip()
                 break
 
-            pressed_card_name = self.find_pressed_card(mouse_x, mouse_y, card_buttons)
+            card_button = self.hand_panel.route(mouse_x, mouse_y)
+            pressed_card_name = card_button.info if card_button is not None else None
 
             if pressed_card_name is not None:
+                self.action_menu_open = False
+
                 if pressed_card_name == player.city and action == "Hand":
                     self.display_current_board_position(player, players)
-                    pygame.display.flip()
-
-                    mouse_x, mouse_y = self.get_next_input()
+                    self.update_display()
 
-                    destination = self.board.get_city_at_coordinates(mouse_x, mouse_y)
-                    target_city = self.board.cities[destination]
-                    player.move(target_city.x, target_city.y, destination)
+                    destination = self.pick_a_city()
+                    self.apply_action(CharterFlight(self.board.map.index[destination]), players)
 
                 elif pressed_card_name == player.city and action == "Build":
-                    self.board.cities[pressed_card_name].has_research_station = True
-                    player.moves -= 1
+                    self.apply_action(BuildResearchStation(), players)
 
                 elif pressed_card_name != player.city:
-                    target_city = self.board.cities[pressed_card_name]
-                    player.move(target_city.x, target_city.y, pressed_card_name)
+                    self.apply_action(DirectFlight(self.board.map.index[pressed_card_name]), players)
 
-                player.cards.remove(pressed_card_name)
-                if player.moves != 0:
-                    self.display_current_board_position(player, players)
-                    pygame.display.flip()
                 break
+
+    def display_game_over(self):
+        message = "The diseases are cured!" if self.board.state.status == WON else "The world has fallen..."
+        text = render_text(message, 100, c.WHITE, c.BLACK)
+        self.screen.blit(text, text.get_rect(center=self.screen.get_rect().center))
+        self.dirty_rects.append(self.screen.get_rect())
+        self.update_display()
@@ -1,6 +1,9 @@
 import pygame
 import Constants as c
 import Images as i
+from Fonts import render_text
+from Assets import load_image
+from Profiling import timed
 
 
 class Button:
@@ -9,8 +12,23 @@ class Button:
         self.clickable = True
         self.x = x
         self.y = y
-
-    def display_button(self, screen: pygame.Surface, *args):
+        # A DIRTY BUTTON IS REPAINTED AT THE NEXT DRAW OF ITS PANEL, OVER WHERE IT WAS LAST DRAWN AND WHERE IT IS NOW
+        self.dirty = True
+        self.drawn_bounds = None
+
+    @property
+    def bounds(self) -> pygame.Rect:
+        # EVERYTHING THE BUTTON DRAWS, WHICH CAN REACH OUT OF THE RECT THAT IS CLICKED
+        return self.rect
+
+    def restyle(self, **attributes):
+        # CHANGES HOW THE BUTTON LOOKS OR WHAT IT DOES, ONLY A REAL CHANGE MAKES IT DIRTY
+        for name, value in attributes.items():
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                self.dirty = True
+
+    def display_button(self, screen: pygame.Surface):
         pass
 
     def is_clicked(self, mouse_x: int, mouse_y: int):
@@ -34,7 +52,11 @@ class ImageButton(Button):
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
 
-    def display_button(self, screen: pygame.Surface, *args):
+    @property
+    def bounds(self) -> pygame.Rect:
+        return self.image.get_rect(topleft=self.rect.topleft)
+
+    def display_button(self, screen: pygame.Surface):
         screen.blit(self.image, self.rect.topleft)
 
     def is_point_inside(self, x: int, y: int):
@@ -42,18 +64,29 @@ class ImageButton(Button):
 
 
 class TextButton(Button):
-    def __init__(self, x: int, y: int, name: str, width: int, height: int, text: str, text_size: int):
+    def __init__(self, x: int, y: int, name: str, width: int, height: int, text: str, text_size: int,
+                 rect_color: tuple[int, int, int] = c.GRAY, text_color: tuple[int, int, int] = c.RED,
+                 transparency: int = 0):
         super().__init__(x, y, name)
         self.rect = pygame.Rect(x, y, width, height)
         self.text_size = text_size
         self.text = text
+        self.rect_color = rect_color
+        self.text_color = text_color
+        self.transparency = transparency
+
+    @property
+    def bounds(self) -> pygame.Rect:
+        return self.rect.union(self.render().get_rect(center=self.rect.center))
+
+    def render(self) -> pygame.Surface:
+        return render_text(self.text, self.text_size, self.text_color)
 
-    def display_button(self, screen: pygame.Surface, rect_color: tuple[int, int, int] = c.GRAY, text_color: tuple[int, int, int] = c.RED, transparency: int = 0):
-        if transparency == 0:
-            pygame.draw.rect(screen, rect_color, self.rect)
+    def display_button(self, screen: pygame.Surface):
+        if self.transparency == 0:
+            pygame.draw.rect(screen, self.rect_color, self.rect)
 
-        font = pygame.font.Font(None, self.text_size)
-        text = font.render(self.text, True, text_color)
+        text = self.render()
 
         text_rect = text.get_rect(center=self.rect.center)
         screen.blit(text, text_rect)
@@ -62,6 +95,20 @@ class TextButton(Button):
         return self.rect.collidepoint(x, y)
 
 
+def display_buttons(screen: pygame.Surface, buttons: list[Button]):
+    # THE IMAGES OF CONSECUTIVE IMAGE BUTTONS GO TO THE SCREEN IN ONE Surface.blits CALL. THE BATCH IS SENT BEFORE ANY
+    # OTHER BUTTON IS DRAWN, SO THE BUTTONS STILL OVERLAP IN THE ORDER OF THE LIST
+    batch = []
+    for button in buttons:
+        if isinstance(button, ImageButton):
+            batch.append((button.image, button.rect.topleft))
+        else:
+            screen.blits(batch, doreturn=False)
+            batch = []
+            button.display_button(screen)
+    screen.blits(batch, doreturn=False)
+
+
 class ButtonFactory:
 
     @staticmethod
@@ -77,7 +124,7 @@ class ButtonFactory:
         # NUMBER OF PLAYERS BUTTONS
         for count in c.NUMBER_OF_PLAYERS:
             number_button = TextButton(player_count_x, c.HEIGHT / 1.8, str(count), 22, 45, text=str(count),
-                                       text_size=72)
+                                       text_size=72, text_color=c.BLACK, transparency=255)
             result.append(number_button)
 
             player_count_x += 100
@@ -89,7 +136,7 @@ class ButtonFactory:
 
         for diff in c.DIFFICULTIES:
             difficulty_button = TextButton(difficulty_x, c.HEIGHT / 1.8, diff, 120 + width_offset, 45, text=diff,
-                                           text_size=58)
+                                           text_size=58, text_color=c.BLACK, transparency=255)
 
             result.append(difficulty_button)
 
@@ -121,13 +168,19 @@ class ButtonFactory:
                 image_x += 400
             counter += 1
 
-        additional_buttons = [(TextButton(1225, 250, "Random", 242, 342, text="?", text_size=100), 2),
+        additional_buttons = [(TextButton(1225, 250, "Random", 242, 342, text="?", text_size=100,
+                                          rect_color=c.BLACK, text_color=c.WHITE), 2),
                               (TextButton(1200, 700, "More roles", 300, 100, text="More Roles", text_size=40), 1),
                               (TextButton(0, 700, "Previous", 300, 100, text="Previous Roles", text_size=40), 2)]
 
         buttons.extend(additional_buttons)
         return buttons
 
+    @staticmethod
+    def create_seat_button() -> TextButton:
+        # SWITCHES THE PLAYER WHOSE ROLE IS BEING CHOSEN BETWEEN A HUMAN AND THE MCTS AI
+        return TextButton(1150, 60, c.HUMAN_SEAT, 300, 80, text="Human player", text_size=40)
+
     @staticmethod
     def create_action_buttons():
         result_hand_button = [
@@ -138,12 +191,13 @@ class ButtonFactory:
         return result_hand_button
 
     @staticmethod
+    @timed("create_city_buttons")
     def create_city_buttons(cities, player_cards) -> list[Button]:
         city_buttons = []
 
         x = 5
         for card in player_cards:
-            card_button = ImageButton(x, 550, card, image=pygame.image.load(cities[card].image))
+            card_button = ImageButton(x, 550, card, image=load_image(cities[card].image))
             city_buttons.append(card_button)
             x += 190
 
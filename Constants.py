@@ -14,4 +14,20 @@ LENGTH_PLAYER = 40
 RADIUS_OF_CIRCLE = 10
 NUMBER_OF_PLAYERS = ("2", "3", "4")
 DIFFICULTIES = ("EASY", "NORMAL", "COVID19")
+HUMAN_SEAT = "Human"
+AI_SEAT = "AI"
+SEATS = (HUMAN_SEAT, AI_SEAT)
 
+COLOR_NAMES = ("Red", "Blue", "Yellow", "Black")
+DISEASE_COLORS = (RED, BLUE, YELLOW, BLACK)
+STARTING_CITY = "Atlanta"
+ACTIONS_PER_TURN = 4
+HAND_LIMIT = 7
+CARDS_TO_CURE = 5
+CUBES_PER_COLOR = 24
+OUTBREAK_LIMIT = 8
+INFECTION_RATES = (2, 2, 2, 3, 3, 4, 4)
+EPIDEMIC_CARDS = {"EASY": 4, "NORMAL": 5, "COVID19": 6}
+STARTING_HAND_SIZE = {2: 4, 3: 3, 4: 2}
+ROLES = ("Scientist", "Researcher", "Operations Expert", "Contingency Planner", "Dispatcher", "Medic",
+         "Quarantine Specialist")
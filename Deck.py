@@ -1,5 +1,7 @@
 import random
-import pygame.image
+from collections import deque
+from itertools import islice
+from Profiling import timed
 
 
 class Card:
@@ -12,10 +14,10 @@ class Card:
 
 
 class CityCard(Card):
-    def __init__(self, city, image):
+    def __init__(self, city, image_path):
         super().__init__("City Card", city)
-        self.image = image
-        self.rect = self.image.get_rect()
+        # THE IMAGE ITSELF IS ONLY LOADED (THROUGH THE ASSET CACHE) WHEN THE CARD IS SHOWN
+        self.image_path = image_path
 
 
 class EpidemicCard(Card):
@@ -34,40 +36,89 @@ class InfectionCard(Card):
 
 
 class Deck:
-    def __init__(self):
-        self.deck = []
+    # THE TOP OF THE DECK IS THE LEFT END OF THE DEQUE, SO DRAWING AND PUTTING CARDS ON TOP ARE O(1) PER CARD
+    def __init__(self, cards=()):
+        self.deck = deque(cards)
 
     def __len__(self):
         return len(self.deck)
 
+    def __iter__(self):
+        return iter(self.deck)
+
     def __str__(self):
         info = [card.name for card in self.deck]
         return str(info)
 
-    def add_cards(self, cards):
-        self.deck.extend(cards)
+    def copy(self):
+        other = self.__class__.__new__(self.__class__)
+        other.deck = self.deck.copy()
+        return other
 
-    def shuffle(self):
-        random.shuffle(self.deck)
+    def snapshot(self) -> tuple:
+        return tuple(self.deck)
 
-    def remove_top_cards(self, number_of_removed_cards):
-        self.deck = self.deck[number_of_removed_cards:]
+    def restore(self, snapshot: tuple):
+        self.deck = deque(snapshot)
+
+    def add_cards(self, cards):
+        self.deck.extend(cards)
 
-    def get_cards(self, number):
-        return self.deck[:number]
+    @timed("deck.shuffle")
+    def shuffle(self, rng=random):
+        cards = list(self.deck)
+        rng.shuffle(cards)
+        self.deck = deque(cards)
+
+    def shuffle_strata(self, sizes, rng=random):
+        # SHUFFLES EVERY STRATUM ON ITS OWN, THE SIZES GO FROM THE BOTTOM OF THE DECK UP
+        cards = list(self.deck)
+        end = len(cards)
+        for size in sizes:
+            stratum = cards[end - size:end]
+            rng.shuffle(stratum)
+            cards[end - size:end] = stratum
+            end -= size
+        self.deck = deque(cards)
+
+    def peek(self, number):
+        return list(islice(self.deck, number))
+
+    @timed("deck.draw")
+    def draw(self, number):
+        return [self.deck.popleft() for _ in range(min(number, len(self.deck)))]
+
+    def draw_bottom(self):
+        return self.deck.pop()
+
+    def put_on_top(self, cards):
+        # extendleft REVERSES WHAT IT IS GIVEN, SO THE FIRST CARD ENDS UP ON TOP
+        self.deck.extendleft(reversed(cards))
+
+    @timed("deck.intensify")
+    def intensify(self, discard_pile, rng=random):
+        # EPIDEMIC: THE DISCARD PILE IS SHUFFLED AND PUT ON TOP, WITHOUT TOUCHING THE REST OF THE DECK
+        cards = discard_pile.clear()
+        rng.shuffle(cards)
+        self.put_on_top(cards)
+
+    def clear(self):
+        cards = list(self.deck)
+        self.deck.clear()
+        return cards
 
 
 class PlayerDeck(Deck):
-    def __init__(self, cities):
+    def __init__(self, map_data):
         super().__init__()
-        for city_info in cities.values():
-            city_card = CityCard(city_info.name, pygame.image.load(city_info.image))
+        for name, image in zip(map_data.names, map_data.images):
+            city_card = CityCard(name, image)
             self.deck.append(city_card)
 
 
 class InfectionDeck(Deck):
-    def __init__(self, cities):
+    def __init__(self, map_data):
         super().__init__()
-        for city_info in cities.values():
-            city_card = InfectionCard(city_info.name)
+        for name in map_data.names:
+            city_card = InfectionCard(name)
             self.deck.append(city_card)
@@ -0,0 +1,133 @@
+import numpy as np
+import Constants as c
+
+# WIDE ENOUGH FOR THE LONGEST PATH OF ANY MAP, AND NEVER THE LENGTH OF ONE
+UNREACHABLE = 0xFFFF
+CITY_SET_CACHE_SIZE = 64
+# WHAT A CITY REACHES IS PRECOMPUTED FOR UP TO A TURN OF ACTIONS, WHICH IS WHAT THE GAME AND THE AI ASK ABOUT
+REACH_MOVES = c.ACTIONS_PER_TURN
+
+# SHORTEST PATHS BETWEEN ALL CITIES, COMPUTED ONCE PER MAP SO MOVEMENT QUESTIONS ARE TABLE LOOKUPS INSTEAD OF SEARCHES
+
+
+def all_distances(map_data) -> np.ndarray:
+    # EVERY BREADTH FIRST SEARCH AT ONCE, ONE LEVEL PER STEP: ROW city OF frontier IS A BITSET OF THE STARTS WHOSE
+    # SEARCH JUST GOT TO city, 64 STARTS PER WORD. THE NEXT FRONTIER OF A CITY IS THE OR OF ITS NEIGHBORS' ROWS OVER
+    # THE CSR ADJACENCY, SO A LEVEL IS A FEW NUMPY OPERATIONS WHATEVER THE SIZE OF THE MAP
+    cities = len(map_data)
+    matrix = np.full((cities, cities), UNREACHABLE, dtype=np.uint16)
+    if not cities:
+        return matrix
+
+    offsets = np.asarray(map_data.offsets, dtype=np.intp)
+    neighbors = np.asarray(map_data.neighbors, dtype=np.intp)
+    # reduceat CAN'T TAKE AN EMPTY RANGE, THE CITIES WITHOUT NEIGHBORS ARE LEFT OUT OF IT
+    connected = offsets[1:] > offsets[:-1]
+    starts = offsets[:-1][connected]
+
+    words = (cities + 63) // 64
+    everyone = np.arange(cities)
+    frontier = np.zeros((cities, words), dtype=np.uint64)
+    frontier[everyone, everyone // 64] = np.left_shift(np.uint64(1), (everyone % 64).astype(np.uint64))
+    visited = frontier.copy()
+
+    distance = 0
+    while frontier.any():
+        # THE MAP IS UNDIRECTED, SO WHETHER city REACHED start OR start REACHED city IS THE SAME ENTRY
+        reached = np.unpackbits(frontier.view(np.uint8), axis=1, count=cities, bitorder="little").view(bool)
+        matrix[reached] = distance
+
+        spread = np.zeros_like(frontier)
+        if len(starts):
+            spread[connected] = np.bitwise_or.reduceat(frontier[neighbors], starts, axis=0)
+        frontier = spread & ~visited
+        visited |= frontier
+        distance += 1
+    return matrix
+
+
+class DistanceTable:
+    def __init__(self, map_data):
+        self.cities = len(map_data)
+        self.matrix = all_distances(map_data)
+        reachable = self.matrix[self.matrix != UNREACHABLE]
+        self.diameter = int(reachable.max()) if len(reachable) else 0
+        self.city_sets = {}
+        # within[k][city] IS THE BITSET OF THE CITIES city CAN DRIVE TO IN AT MOST k MOVES
+        self.within = [mask_bitsets(self.matrix <= moves) for moves in range(min(self.diameter, REACH_MOVES) + 1)]
+
+    def tables_for(self, cities: int) -> (list[int], np.ndarray, list[int]):
+        # THE DISTANCE OF EVERY CITY TO THE CLOSEST CITY OF THE SET, AND EVERYTHING THE SET REACHES IN k MOVES.
+        # THE SETS ARE RESEARCH STATIONS, WHICH CHANGE A FEW TIMES PER GAME, SO THEY ARE CACHED BY THEIR BITMASK
+        tables = self.city_sets.get(cities)
+        if tables is None:
+            members = cities_in(cities)
+            if members:
+                nearest = self.matrix[:, members].min(axis=1)
+            else:
+                nearest = np.full(self.cities, UNREACHABLE, dtype=np.uint16)
+
+            # THE SET REACHES IN k MOVES EVERY CITY AT MOST k MOVES FROM ITS CLOSEST MEMBER
+            reach = mask_bitsets(nearest <= np.arange(len(self.within))[:, None])
+
+            if len(self.city_sets) >= CITY_SET_CACHE_SIZE:
+                del self.city_sets[next(iter(self.city_sets))]
+            tables = self.city_sets[cities] = (nearest.tolist(), nearest, reach)
+        return tables
+
+    def reach_of(self, cities: int, moves: int) -> int:
+        _, nearest, reach = self.tables_for(cities)
+        return reach[moves] if moves < len(reach) else mask_bitset(nearest <= moves)
+
+    def distance(self, city1: int, city2: int, research_stations: int = 0) -> int:
+        direct = int(self.matrix[city1, city2])
+        if not research_stations:
+            return direct
+
+        # A SHUTTLE FLIGHT IS NEVER WORTH TAKING TWICE, SO THE BEST PATH USES AT MOST ONE
+        nearest = self.tables_for(research_stations)[0]
+        return min(direct, nearest[city1] + 1 + nearest[city2])
+
+    def distance_to_nearest(self, city: int, cities: int) -> int:
+        return self.tables_for(cities)[0][city]
+
+    def reachable_within(self, city: int, moves: int, research_stations: int = 0) -> int:
+        if moves < 0:
+            return 0
+
+        # EVERY CITY THAT CAN BE DRIVEN TO IN AT MOST moves MOVES. ONLY MORE MOVES THAN A TURN HAS ARE READ OFF THE
+        # CITY'S ROW INSTEAD OF THE PRECOMPUTED BITSETS
+        moves = min(moves, self.diameter)
+        reachable = self.within[moves][city] if moves < len(self.within) else mask_bitset(self.matrix[city] <= moves)
+        if research_stations:
+            nearest = self.tables_for(research_stations)[0]
+            remaining = moves - nearest[city] - 1
+            if remaining >= 0:
+                reachable |= self.reach_of(research_stations, remaining)
+        return reachable
+
+
+def bitset(cities) -> int:
+    bits = 0
+    for city in cities:
+        bits |= 1 << int(city)
+    return bits
+
+
+def mask_bitset(mask: np.ndarray) -> int:
+    # THE SAME BITSET FROM A BOOLEAN ARRAY OVER ALL CITIES, PACKED BY NUMPY INSTEAD OF ONE CITY AT A TIME
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def mask_bitsets(masks: np.ndarray) -> list[int]:
+    # ONE BITSET PER ROW OF A BOOLEAN MATRIX
+    return [int.from_bytes(row.tobytes(), "little") for row in np.packbits(masks, axis=1, bitorder="little")]
+
+
+def cities_in(bits: int) -> list[int]:
+    cities = []
+    while bits:
+        lowest = bits & -bits
+        cities.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return cities
@@ -0,0 +1,597 @@
+import random
+from collections import deque, namedtuple
+from dataclasses import dataclass
+from itertools import islice
+import numpy as np
+import Constants as c
+from Deck import Deck, PlayerDeck, InfectionDeck, EpidemicCard
+from Zobrist import zobrist_keys
+
+# THE RULES OF THE GAME WITHOUT ANY PYGAME: CITIES, COLORS AND THE CARDS IN A HAND ARE INTEGER INDICES
+
+PLAYING = "playing"
+WON = "won"
+LOST = "lost"
+
+ACTION_PHASE = "actions"
+DISCARD_PHASE = "discard"
+
+# ONE PLACED GROUP OF CUBES OR ONE OUTBREAK, IN THE ORDER THEY HAPPENED DURING THE LAST ACTION
+InfectionEvent = namedtuple("InfectionEvent", "city color cubes outbreak")
+
+# FROZEN DATACLASSES AND NOT NAMEDTUPLES, SO THAT Drive(5) AND DirectFlight(5) ARE DIFFERENT ACTIONS
+
+
+@dataclass(frozen=True, slots=True)
+class Drive:
+    city: int
+
+
+@dataclass(frozen=True, slots=True)
+class DirectFlight:
+    city: int
+
+
+@dataclass(frozen=True, slots=True)
+class CharterFlight:
+    city: int
+
+
+@dataclass(frozen=True, slots=True)
+class ShuttleFlight:
+    city: int
+
+
+@dataclass(frozen=True, slots=True)
+class BuildResearchStation:
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class TreatDisease:
+    color: int
+
+
+@dataclass(frozen=True, slots=True)
+class DiscoverCure:
+    color: int
+
+
+@dataclass(frozen=True, slots=True)
+class Pass:
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class Discard:
+    card: int
+
+
+class IllegalActionError(ValueError):
+    pass
+
+
+class PlayerState:
+    def __init__(self, role: str, city: int):
+        self.role = role
+        self.city = city
+        self.hand = []
+
+    def __str__(self):
+        return f"{self.role} in city {self.city} with cards {self.hand}"
+
+    def copy(self):
+        other = PlayerState(self.role, self.city)
+        other.hand = list(self.hand)
+        return other
+
+
+class GameState:
+    def __init__(self, map_data, difficulty: str = "NORMAL", seed=None):
+        self.map = map_data
+        self.difficulty = difficulty
+        self.rng = random.Random(seed)
+
+        cities = len(map_data)
+        # THE ZOBRIST HASH OF EVERYTHING PER CITY OR PER CARD, KEPT UP TO DATE BY EVERY CHANGE TO THE STATE
+        self.keys = zobrist_keys(cities)
+        self.zobrist = 0
+
+        # STRUCTURE OF ARRAYS: ONE ROW OF CUBES PER CITY AND ONE BIT PER RESEARCH STATION
+        self.cubes = np.zeros((cities, len(c.COLOR_NAMES)), dtype=np.int8)
+        # PER COLOR, THE CITIES WITH 3 CUBES OF IT: THE ONES ANOTHER CUBE OF THAT COLOR WOULD MAKE OUTBREAK
+        self.full_cities = [set() for _ in c.COLOR_NAMES]
+        self.research_stations = 0
+        self.cube_supply = [c.CUBES_PER_COLOR] * len(c.COLOR_NAMES)
+        self.cured = [False] * len(c.COLOR_NAMES)
+        self.eradicated = [False] * len(c.COLOR_NAMES)
+
+        self.players = []
+        self.current_player = 0
+        self.moves = c.ACTIONS_PER_TURN
+        self.phase = ACTION_PHASE
+        self.status = PLAYING
+        self.turn = 0
+
+        self.outbreaks = 0
+        self.infection_rate_counter = 0
+        self.events = []
+
+        self.player_deck = Deck()
+        self.city_cards = []
+        self.player_discard_pile = Deck()
+        self.infection_deck = Deck()
+        self.infection_discard_pile = Deck()
+        # WHAT THE PLAYERS KNOW OF THE ORDER OF THE INFECTION DECK: IT IS A STACK OF STRATA, THE CARDS THAT WERE NEVER
+        # DRAWN AT THE BOTTOM AND THE DISCARD PILE OF EVERY EPIDEMIC ON TOP OF IT, EACH IN AN UNKNOWN ORDER. THE SIZES
+        # OF THE STRATA FROM THE BOTTOM UP, AND THE STRATUM OF EVERY CITY'S CARD, -1 FOR A CARD IN THE DISCARD PILE
+        self.infection_strata = []
+        self.infection_stratum = np.full(cities, -1, dtype=np.int16)
+
+        self.add_research_station(map_data.index[c.STARTING_CITY])
+
+    def __str__(self):
+        return (f"Turn {self.turn}, player {self.current_player} with {self.moves} moves, "
+                f"outbreaks: {self.outbreaks}, status: {self.status}")
+
+    @property
+    def hash(self) -> int:
+        # THE SMALL COUNTERS ARE MIXED IN HERE, WHICH IS AS CHEAP AS UPDATING THEM WITH EVERY CHANGE
+        keys = self.keys
+        value = (self.zobrist ^ keys.current_player[self.current_player] ^ keys.moves[self.moves] ^
+                 keys.outbreaks[min(self.outbreaks, c.OUTBREAK_LIMIT)] ^
+                 keys.infection_rate_counter[self.infection_rate_counter] ^
+                 keys.player_deck_size[len(self.player_deck)])
+        if self.phase == DISCARD_PHASE:
+            value ^= keys.discard_phase
+        if self.status != PLAYING:
+            value ^= keys.game_over
+        return value
+
+    def copy(self):
+        # THE MAP AND THE CARD OBJECTS NEVER CHANGE SO EVERY COPY SHARES THEM
+        other = GameState.__new__(GameState)
+        other.__dict__.update(self.__dict__)
+
+        other.cubes = self.cubes.copy()
+        other.full_cities = [set(cities) for cities in self.full_cities]
+        other.cube_supply = list(self.cube_supply)
+        other.cured = list(self.cured)
+        other.eradicated = list(self.eradicated)
+        other.players = [player.copy() for player in self.players]
+        other.events = []
+
+        other.player_deck = self.player_deck.copy()
+        other.player_discard_pile = self.player_discard_pile.copy()
+        other.infection_deck = self.infection_deck.copy()
+        other.infection_discard_pile = self.infection_discard_pile.copy()
+        other.infection_strata = list(self.infection_strata)
+        other.infection_stratum = self.infection_stratum.copy()
+
+        other.rng = random.Random()
+        other.rng.setstate(self.rng.getstate())
+        return other
+
+    def __getstate__(self):
+        # THE MAP IS MEMORY MAPPED AND THE KEYS ARE SHARED, SO A PICKLED STATE LEAVES THEM OUT AND attach_map PUTS
+        # THEM BACK IN THE PROCESS THAT RECEIVES IT
+        state = dict(self.__dict__)
+        state["map"] = None
+        state["keys"] = None
+        return state
+
+    def rehash(self):
+        # THE HASH FROM SCRATCH, FOR A STATE THAT WAS BUILT WITHOUT GOING THROUGH THE INCREMENTAL UPDATES
+        keys = self.keys
+        value = 0
+        for player_number, player in enumerate(self.players):
+            value ^= keys.positions[player_number][player.city]
+            for card in player.hand:
+                value ^= keys.hands[player_number][card]
+        for city, city_cubes in enumerate(self.cubes.tolist()):
+            for color, cubes in enumerate(city_cubes):
+                value ^= keys.cubes[city][color][cubes]
+        for city in self.research_station_cities():
+            value ^= keys.research_stations[city]
+        for card in self.infection_discard_pile:
+            value ^= keys.infection_discards[self.map.index[card.name]]
+        for color in range(len(c.COLOR_NAMES)):
+            if self.cured[color]:
+                value ^= keys.cured[color]
+            if self.eradicated[color]:
+                value ^= keys.eradicated[color]
+        self.zobrist = value
+        self.index_full_cities()
+
+    def index_full_cities(self):
+        self.full_cities = [set(np.flatnonzero(self.cubes[:, color] == 3).tolist())
+                            for color in range(len(c.COLOR_NAMES))]
+
+    def index_infection_strata(self, strata: list[int]):
+        # THE STRATUM OF EVERY CARD FROM THE SIZES OF THE STRATA, FOR A STATE THAT WAS BUILT WITHOUT DRAWING ITS CARDS
+        self.infection_strata = list(strata)
+        self.infection_stratum[:] = -1
+        cards = reversed(self.infection_deck.snapshot())
+        for stratum, size in enumerate(strata):
+            for card in islice(cards, size):
+                self.infection_stratum[self.map.index[card.name]] = stratum
+
+    def attach_map(self, map_data):
+        self.map = map_data
+        self.keys = zobrist_keys(len(map_data))
+
+    # SETUP
+
+    def setup(self, roles: list[str]):
+        starting_city = self.map.index[c.STARTING_CITY]
+        self.players = [PlayerState(role, starting_city) for role in roles]
+        for player_number in range(len(self.players)):
+            self.zobrist ^= self.keys.positions[player_number][starting_city]
+
+        self.player_deck = PlayerDeck(self.map)
+        self.city_cards = list(self.player_deck.deck)
+        self.player_deck.shuffle(self.rng)
+        self.infection_deck = InfectionDeck(self.map)
+        self.infection_deck.shuffle(self.rng)
+        self.index_infection_strata([len(self.infection_deck)])
+
+        # FIRST INFECTIONS OF 9 CITIES
+        for position, card in enumerate(self.infection_deck.draw(9)):
+            city = self.map.index[card.name]
+            self.add_cubes(city, self.map.colors[city], 3 if position < 3 else (2 if position < 6 else 1))
+            self.discard_infection_card(card)
+
+        # DEALING CARDS TO ALL THE PLAYERS
+        hand_size = c.STARTING_HAND_SIZE[len(self.players)]
+        for player_number in range(len(self.players)):
+            for card in self.player_deck.draw(hand_size):
+                self.take_card(player_number, self.map.index[card.name])
+
+        self.insert_epidemic_cards(c.EPIDEMIC_CARDS[self.difficulty])
+
+    def insert_epidemic_cards(self, epidemics: int):
+        # THE DECK IS SPLIT INTO EVEN PILES AND ONE EPIDEMIC IS SHUFFLED INTO EACH PILE
+        cards = self.player_deck.clear()
+        pile_size, bigger_piles = divmod(len(cards), epidemics)
+
+        start = 0
+        for pile_number in range(epidemics):
+            end = start + pile_size + (1 if pile_number < bigger_piles else 0)
+            pile = cards[start:end] + [EpidemicCard()]
+            self.rng.shuffle(pile)
+            self.player_deck.add_cards(pile)
+            start = end
+
+    # QUERIES
+
+    @property
+    def player(self) -> PlayerState:
+        return self.players[self.current_player]
+
+    @property
+    def infection_rate(self) -> int:
+        return c.INFECTION_RATES[min(self.infection_rate_counter, len(c.INFECTION_RATES) - 1)]
+
+    def neighbors(self, city: int):
+        return self.map.neighbors_of(city)
+
+    def has_research_station(self, city: int) -> bool:
+        return self.research_stations >> city & 1 == 1
+
+    def add_research_station(self, city: int):
+        if not self.has_research_station(city):
+            self.research_stations |= 1 << city
+            self.zobrist ^= self.keys.research_stations[city]
+
+    def research_station_cities(self) -> list[int]:
+        stations = self.research_stations
+        cities = []
+        while stations:
+            lowest_bit = stations & -stations
+            cities.append(lowest_bit.bit_length() - 1)
+            stations ^= lowest_bit
+        return cities
+
+    def cards_of_color(self, hand: list[int], color: int) -> list[int]:
+        return [card for card in hand if self.map.colors[card] == color]
+
+    def movement_action(self, city: int):
+        # THE ACTION A CLICK ON A CITY STANDS FOR: DRIVING TO A NEIGHBOR OR A SHUTTLE BETWEEN RESEARCH STATIONS
+        player_city = self.player.city
+        if city in self.neighbors(player_city):
+            return Drive(city)
+        if city != player_city and self.has_research_station(city) and self.has_research_station(player_city):
+            return ShuttleFlight(city)
+        return None
+
+    def legal_actions(self) -> list:
+        if self.status != PLAYING:
+            return []
+
+        if self.phase == DISCARD_PHASE:
+            return [Discard(card) for card in sorted(set(self.player.hand))]
+
+        player = self.player
+        city = player.city
+        actions = [Drive(neighbor) for neighbor in self.neighbors(city)]
+
+        if self.has_research_station(city):
+            actions.extend(ShuttleFlight(station) for station in self.research_station_cities() if station != city)
+
+        actions.extend(DirectFlight(card) for card in sorted(set(player.hand)) if card != city)
+
+        if city in player.hand:
+            actions.extend(CharterFlight(destination) for destination in range(len(self.map)) if destination != city)
+            if not self.has_research_station(city):
+                actions.append(BuildResearchStation())
+
+        actions.extend(TreatDisease(color) for color, cubes in enumerate(self.cubes[city].tolist()) if cubes > 0)
+
+        if self.has_research_station(city):
+            actions.extend(DiscoverCure(color) for color, cured in enumerate(self.cured)
+                           if not cured and len(self.cards_of_color(player.hand, color)) >= c.CARDS_TO_CURE)
+
+        actions.append(Pass())
+        return actions
+
+    def is_legal(self, action) -> bool:
+        return action in self.legal_actions()
+
+    # ACTIONS
+
+    def apply(self, action):
+        if self.status != PLAYING:
+            raise IllegalActionError(f"The game is over: {self.status}")
+
+        handler = ACTION_HANDLERS[type(action)]
+        in_action_phase = self.phase == ACTION_PHASE
+        if in_action_phase == (handler is GameState.discard):
+            raise IllegalActionError(f"{action} is not possible during the {self.phase} phase")
+
+        self.events = []
+        handler(self, action)
+
+        if in_action_phase and self.status == PLAYING:
+            self.moves -= 1
+            if self.moves <= 0:
+                self.end_turn()
+
+    def play_card(self, card: int):
+        hand = self.player.hand
+        if card not in hand:
+            raise IllegalActionError(f"{self.player.role} doesn't have the card of {self.map.names[card]}")
+        hand.remove(card)
+        self.zobrist ^= self.keys.hands[self.current_player][card]
+        self.player_discard_pile.add_cards([self.city_cards[card]])
+
+    def take_card(self, player_number: int, card: int):
+        self.players[player_number].hand.append(card)
+        self.zobrist ^= self.keys.hands[player_number][card]
+
+    # EVERY ACTION IS CHECKED BEFORE IT CHANGES ANYTHING, SO AN ILLEGAL ONE LEAVES THE STATE AS IT WAS
+
+    def check_city(self, city: int):
+        if not 0 <= city < len(self.map):
+            raise IllegalActionError(f"There is no city {city}")
+
+    def check_color(self, color: int):
+        if not 0 <= color < len(c.COLOR_NAMES):
+            raise IllegalActionError(f"There is no color {color}")
+
+    def check_destination(self, city: int):
+        self.check_city(city)
+        if city == self.player.city:
+            raise IllegalActionError(f"The player is already in {self.map.names[city]}")
+
+    def move_player(self, city: int):
+        positions = self.keys.positions[self.current_player]
+        self.zobrist ^= positions[self.player.city] ^ positions[city]
+        self.player.city = city
+
+    def drive(self, action: Drive):
+        self.check_city(action.city)
+        if action.city not in self.neighbors(self.player.city):
+            raise IllegalActionError(f"{self.map.names[action.city]} is not connected to the player's city")
+        self.move_player(action.city)
+
+    def direct_flight(self, action: DirectFlight):
+        self.check_destination(action.city)
+        self.play_card(action.city)
+        self.move_player(action.city)
+
+    def charter_flight(self, action: CharterFlight):
+        self.check_destination(action.city)
+        self.play_card(self.player.city)
+        self.move_player(action.city)
+
+    def shuttle_flight(self, action: ShuttleFlight):
+        self.check_destination(action.city)
+        if not (self.has_research_station(self.player.city) and self.has_research_station(action.city)):
+            raise IllegalActionError("Shuttle flights need a research station at both cities")
+        self.move_player(action.city)
+
+    def build_research_station(self, action: BuildResearchStation):
+        city = self.player.city
+        if self.has_research_station(city):
+            raise IllegalActionError(f"{self.map.names[city]} already has a research station")
+        self.play_card(city)
+        self.add_research_station(city)
+
+    def treat_disease(self, action: TreatDisease):
+        city = self.player.city
+        self.check_color(action.color)
+        cubes = int(self.cubes[city, action.color])
+        if cubes == 0:
+            raise IllegalActionError(f"There is no {c.COLOR_NAMES[action.color]} disease in {self.map.names[city]}")
+        self.remove_cubes(city, action.color, cubes if self.cured[action.color] else 1)
+
+    def discover_cure(self, action: DiscoverCure):
+        player = self.player
+        self.check_color(action.color)
+        cards = self.cards_of_color(player.hand, action.color)[:c.CARDS_TO_CURE]
+        if not self.has_research_station(player.city) or len(cards) < c.CARDS_TO_CURE or self.cured[action.color]:
+            raise IllegalActionError(f"{c.COLOR_NAMES[action.color]} can't be cured")
+
+        for card in cards:
+            self.play_card(card)
+        self.cured[action.color] = True
+        self.zobrist ^= self.keys.cured[action.color]
+        self.check_eradication(action.color)
+
+        if all(self.cured):
+            self.status = WON
+
+    def pass_turn(self, action: Pass):
+        # THE PASS ITSELF USES UP THE LAST MOVE
+        self.moves = 1
+
+    def discard(self, action: Discard):
+        self.check_city(action.card)
+        if action.card not in self.player.hand:
+            raise IllegalActionError(f"{self.player.role} doesn't have the card of {self.map.names[action.card]}")
+        self.play_card(action.card)
+
+        if len(self.player.hand) <= c.HAND_LIMIT:
+            self.phase = ACTION_PHASE
+            self.infection_phase()
+            self.next_turn()
+
+    # CUBES
+
+    def add_cubes(self, city: int, color: int, number: int) -> list:
+        # OUTBREAK CHAIN AS A WORKLIST INSTEAD OF RECURSION, outbroken IS A BITSET SO EVERY CITY OUTBREAKS ONCE
+        chain = []
+        if self.eradicated[color] or self.status != PLAYING:
+            return chain
+
+        outbroken = 0
+        worklist = deque([(city, number)])
+        while worklist:
+            city, number = worklist.popleft()
+            if outbroken >> city & 1:
+                continue
+
+            cubes = int(self.cubes[city, color])
+            added = min(number, 3 - cubes)
+            if added > 0:
+                self.set_cubes(city, color, cubes, cubes + added)
+                self.cube_supply[color] -= added
+                chain.append(InfectionEvent(city, color, added, False))
+
+                if self.cube_supply[color] < 0:
+                    self.status = LOST
+                    break
+
+            if cubes + number > 3:
+                outbroken |= 1 << city
+                self.outbreaks += 1
+                chain.append(InfectionEvent(city, color, 0, True))
+
+                if self.outbreaks >= c.OUTBREAK_LIMIT:
+                    self.status = LOST
+                    break
+
+                for neighbor in self.neighbors(city):
+                    if not outbroken >> neighbor & 1:
+                        worklist.append((neighbor, 1))
+
+        self.events.extend(chain)
+        return chain
+
+    def remove_cubes(self, city: int, color: int, number: int):
+        cubes = int(self.cubes[city, color])
+        removed = min(number, cubes)
+        self.set_cubes(city, color, cubes, cubes - removed)
+        self.cube_supply[color] += removed
+        self.check_eradication(color)
+
+    def set_cubes(self, city: int, color: int, old_cubes: int, new_cubes: int):
+        keys = self.keys.cubes[city][color]
+        self.zobrist ^= keys[old_cubes] ^ keys[new_cubes]
+        self.cubes[city, color] = new_cubes
+        if old_cubes == 3:
+            self.full_cities[color].discard(city)
+        if new_cubes == 3:
+            self.full_cities[color].add(city)
+
+    def check_eradication(self, color: int):
+        if self.cured[color] and self.cube_supply[color] == c.CUBES_PER_COLOR and not self.eradicated[color]:
+            self.eradicated[color] = True
+            self.zobrist ^= self.keys.eradicated[color]
+
+    # END OF THE TURN
+
+    def end_turn(self):
+        # DRAWING 2 PLAYER CARDS, RUNNING OUT OF PLAYER CARDS LOSES THE GAME
+        if len(self.player_deck) < 2:
+            self.status = LOST
+            return
+
+        for card in self.player_deck.draw(2):
+            if isinstance(card, EpidemicCard):
+                self.epidemic()
+            else:
+                self.take_card(self.current_player, self.map.index[card.name])
+
+        if self.status != PLAYING:
+            return
+
+        if len(self.player.hand) > c.HAND_LIMIT:
+            self.phase = DISCARD_PHASE
+            return
+
+        self.infection_phase()
+        self.next_turn()
+
+    def epidemic(self):
+        self.infection_rate_counter += 1
+
+        # INFECT: THE BOTTOM CARD GETS 3 CUBES
+        card = self.infection_deck.draw_bottom()
+        city = self.map.index[card.name]
+        self.add_cubes(city, self.map.colors[city], 3)
+
+        # INTENSIFY: THE DISCARD PILE IS SHUFFLED AND PUT BACK ON TOP OF THE INFECTION DECK
+        self.discard_infection_card(card)
+        stratum = len(self.infection_strata)
+        self.infection_strata.append(len(self.infection_discard_pile))
+        for discarded in self.infection_discard_pile:
+            discarded_city = self.map.index[discarded.name]
+            self.zobrist ^= self.keys.infection_discards[discarded_city]
+            self.infection_stratum[discarded_city] = stratum
+        self.infection_deck.intensify(self.infection_discard_pile, self.rng)
+
+    def infection_phase(self):
+        for card in self.infection_deck.draw(self.infection_rate):
+            city = self.map.index[card.name]
+            self.add_cubes(city, self.map.colors[city], 1)
+            self.discard_infection_card(card)
+
+    def discard_infection_card(self, card):
+        city = self.map.index[card.name]
+        self.infection_discard_pile.add_cards([card])
+        self.zobrist ^= self.keys.infection_discards[city]
+
+        # A CARD DRAWN FROM THE TOP OR THE BOTTOM LEAVES ITS STRATUM, THE OTHER CARDS STAY IN THEIRS
+        self.infection_strata[self.infection_stratum[city]] -= 1
+        self.infection_stratum[city] = -1
+
+    def next_turn(self):
+        if self.status != PLAYING:
+            return
+        self.current_player = (self.current_player + 1) % len(self.players)
+        self.moves = c.ACTIONS_PER_TURN
+        self.turn += 1
+
+
+ACTION_HANDLERS = {
+    Drive: GameState.drive,
+    DirectFlight: GameState.direct_flight,
+    CharterFlight: GameState.charter_flight,
+    ShuttleFlight: GameState.shuttle_flight,
+    BuildResearchStation: GameState.build_research_station,
+    TreatDisease: GameState.treat_disease,
+    DiscoverCure: GameState.discover_cure,
+    Pass: GameState.pass_turn,
+    Discard: GameState.discard
+}
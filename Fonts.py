@@ -0,0 +1,61 @@
+from collections import OrderedDict
+import pygame
+
+TEXT_CACHE_SIZE = 512
+
+_fonts = {}
+
+
+def get_font(text_size: int) -> pygame.font.Font:
+    font = _fonts.get(text_size)
+    if font is None:
+        font = pygame.font.Font(None, text_size)
+        _fonts[text_size] = font
+    return font
+
+
+class TextCache:
+    def __init__(self, max_size: int = TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def __str__(self):
+        return f"TextCache: {len(self)}/{self.max_size} surfaces, {self.hits} hits, {self.misses} misses"
+
+    def render(self, text: str, text_size: int, color: tuple[int, int, int],
+               background: tuple[int, int, int] | None = None) -> pygame.Surface:
+        key = (text, text_size, color, background)
+        surface = self.surfaces.get(key)
+
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = get_font(text_size).render(text, True, color, background)
+        self.surfaces[key] = surface
+
+        # DROPPING THE LEAST RECENTLY USED SURFACE WHEN THE CACHE IS FULL
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+text_cache = TextCache()
+
+
+def render_text(text: str, text_size: int, color: tuple[int, int, int],
+                background: tuple[int, int, int] | None = None) -> pygame.Surface:
+    return text_cache.render(text, text_size, color, background)
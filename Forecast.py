@@ -0,0 +1,146 @@
+from itertools import islice
+import numpy as np
+import Constants as c
+from Engine import GameState
+
+
+def stratum_draw_probabilities(strata: list[int], draws: int) -> list[float]:
+    # THE NEXT draws CARDS COME OFF THE TOP STRATUM FIRST. EVERY CARD OF A STRATUM IS EQUALLY LIKELY TO BE AMONG THE
+    # ONES TAKEN FROM IT, SO ITS CHANCE IS THE NUMBER OF CARDS TAKEN FROM THE STRATUM OVER ITS SIZE
+    probabilities = [0.0] * len(strata)
+    for stratum in range(len(strata) - 1, -1, -1):
+        size = strata[stratum]
+        if draws <= 0:
+            break
+        if size > 0:
+            taken = min(draws, size)
+            probabilities[stratum] = taken / size
+            draws -= taken
+    return probabilities
+
+
+class InfectionForecast:
+    # THE RISK OF THE NEXT INFECTION PHASE AS THE PLAYERS SEE IT: WHICH CITIES GET DRAWN AND HOW MANY OUTBREAKS THAT
+    # CAUSES. A CITY'S CHANCE IS THE CHANCE OF ITS STRATUM, SO A DRAW ONLY CHANGES THE DRAWN CITY AND THE STRATA WHOSE
+    # CHANCE MOVED, AND THE OUTBREAKS ONLY LOOK AT THE CITIES WITH 3 CUBES THE GameState KEEPS TRACK OF. EVERYTHING IS
+    # WORKED OUT AGAIN ONLY AFTER AN EPIDEMIC, OR WHEN THE FORECAST IS MOVED TO ANOTHER STATE
+    def __init__(self, state: GameState):
+        self.state = state
+        self.key = None
+        # WHAT THE FORECAST WAS WORKED OUT FOR: THE INFECTION RATE, THE SIZES OF THE STRATA AND HOW MANY CARDS OF THE
+        # DISCARD PILE IT HAS SEEN. A CARD THAT IS DRAWN IS ADDED TO THE DISCARD PILE, AN EPIDEMIC EMPTIES IT
+        self.infection_rate = None
+        self.strata = None
+        self.discards = 0
+        self.stratum_probabilities = None
+        self.outbreaks = None
+        # THE CHANCE OF EVERY CITY AND THE CITIES OF EVERY STRATUM, ONLY KEPT ONCE probabilities WAS ASKED FOR
+        self.city_probabilities = None
+        self.city_strata = None
+        self.members = None
+
+    def follow(self, state: GameState):
+        # THE SAME FORECAST CAN BE MOVED TO ANOTHER STATE, LIKE THE END OF EVERY ROLLOUT OF A SEARCH
+        self.state = state
+        self.key = None
+        self.strata = None
+
+    def update(self):
+        # A DRAW CHANGES THE STRATA, AN EPIDEMIC THE INFECTION RATE, AN INFECTION OR A TREATMENT THE CUBES
+        state = self.state
+        key = (state.zobrist, state.infection_rate_counter, len(state.infection_strata))
+        if key == self.key:
+            return
+        self.key = key
+
+        discards = len(state.infection_discard_pile)
+        if (self.strata is None or len(self.strata) != len(state.infection_strata) or discards < self.discards or
+                self.infection_rate != state.infection_rate):
+            self.recompute()
+        elif discards > self.discards:
+            drawn = islice(state.infection_discard_pile, self.discards, None)
+            self.draw([state.map.index[card.name] for card in drawn])
+        self.discards = discards
+
+        self.outbreaks = [self.expected_outbreaks_of(color) for color in range(len(c.COLOR_NAMES))]
+
+    def recompute(self):
+        state = self.state
+        self.infection_rate = state.infection_rate
+        self.strata = list(state.infection_strata)
+        self.stratum_probabilities = stratum_draw_probabilities(self.strata, self.infection_rate)
+        self.city_probabilities = None
+
+    def draw(self, cities: list[int]):
+        # THE CARDS OF cities WERE DRAWN: THEIR STRATA GOT SMALLER AND THEY CAN'T BE DRAWN AGAIN BEFORE AN EPIDEMIC
+        before = self.stratum_probabilities
+        self.strata = list(self.state.infection_strata)
+        self.stratum_probabilities = stratum_draw_probabilities(self.strata, self.infection_rate)
+        if self.city_probabilities is None:
+            return
+
+        for city in cities:
+            self.members[self.city_strata[city]].discard(city)
+            self.city_strata[city] = -1
+            self.city_probabilities[city] = 0.0
+        for stratum, (old, new) in enumerate(zip(before, self.stratum_probabilities)):
+            if old != new and self.members[stratum]:
+                self.city_probabilities[list(self.members[stratum])] = new
+
+    def index_cities(self):
+        strata = self.state.infection_stratum
+        self.city_strata = strata.tolist()
+        self.members = [set() for _ in self.strata]
+        for city, stratum in enumerate(self.city_strata):
+            if stratum >= 0:
+                self.members[stratum].add(city)
+        # THE LAST ENTRY IS FOR THE STRATUM -1, THE DISCARD PILE, WHICH CAN'T BE DRAWN BEFORE THE NEXT EPIDEMIC
+        self.city_probabilities = np.array(self.stratum_probabilities + [0.0])[strata]
+
+    def city_probability(self, city: int) -> float:
+        stratum = self.state.infection_stratum[city]
+        return self.stratum_probabilities[stratum] if stratum >= 0 else 0.0
+
+    def expected_outbreaks_of(self, color: int) -> float:
+        # ONLY A CITY WITH 3 CUBES OF ITS OWN COLOR OUTBREAKS WHEN IT IS DRAWN, AND THE CHAIN REACTION REACHES EVERY
+        # CITY WITH 3 CUBES OF THAT COLOR CONNECTED TO IT. THERE ARE AT MOST 8 SUCH CITIES PER COLOR WITH 24 CUBES, SO
+        # THE CHAINS ARE FOUND BY WALKING THEM. EVERY DRAW IS COUNTED ON ITS OWN: TWO CARDS OF THE SAME PHASE FEEDING
+        # THE SAME CHAIN ARE LEFT OUT, SO THE FORECAST ERRS LOW
+        state = self.state
+        full = state.full_cities[color]
+        expected = 0.0
+        chains = {}
+        for city in full:
+            probability = self.city_probability(city)
+            if state.map.colors[city] != color or probability == 0:
+                continue
+            if city not in chains:
+                chain = {city}
+                worklist = [city]
+                while worklist:
+                    for neighbor in state.neighbors(worklist.pop()):
+                        if neighbor in full and neighbor not in chain:
+                            chain.add(neighbor)
+                            worklist.append(neighbor)
+                for member in chain:
+                    chains[member] = len(chain)
+            expected += probability * chains[city]
+        return float(expected)
+
+    @property
+    def probabilities(self) -> np.ndarray:
+        # THE CHANCE OF EVERY CITY TO BE DRAWN IN THE NEXT INFECTION PHASE, IF NO EPIDEMIC COMES BEFORE IT
+        self.update()
+        if self.city_probabilities is None:
+            self.index_cities()
+        return self.city_probabilities
+
+    def probability(self, city: int) -> float:
+        self.update()
+        return float(self.city_probability(city))
+
+    @property
+    def expected_outbreaks(self) -> list[float]:
+        # PER COLOR, THE NUMBER OF OUTBREAKS THE NEXT INFECTION PHASE IS EXPECTED TO CAUSE
+        self.update()
+        return self.outbreaks
@@ -1,33 +1,81 @@
 import os
-import pygame
+import threading
 import Constants as c
+from Assets import load_image
 
-background = pygame.image.load(os.path.join("assets", "PandemicMapV2.png"))
-background = pygame.transform.scale(background, (c.WIDTH, c.HEIGHT))
-logo = pygame.image.load(os.path.join("assets", "PandemicLogo.png"))
-logo = pygame.transform.scale(logo, (600, 300))
-earth = pygame.image.load(os.path.join("assets", "Starting.png"))
-earth = pygame.transform.scale(earth, (c.WIDTH, c.HEIGHT))
-back_image = pygame.image.load(os.path.join("assets", "BackOfRole.png"))
-
-role_1 = pygame.image.load(os.path.join("assets", "Scientist.png"))
-role_2 = pygame.image.load(os.path.join("assets", "Researcher.png"))
-role_3 = pygame.image.load(os.path.join("assets", "OperationsExpert.png"))
-role_4 = pygame.image.load(os.path.join("assets", "ContingencyPlanner.png"))
-role_5 = pygame.image.load(os.path.join("assets", "Dispatcher.png"))
-role_6 = pygame.image.load(os.path.join("assets", "Medic.png"))
-role_7 = pygame.image.load(os.path.join("assets", "QuarantineSpecialist.png"))
-role_1_pin = pygame.image.load(os.path.join("assets", "GrayPin.png"))
-role_2_pin = pygame.image.load(os.path.join("assets", "BrownPin.png"))
-role_3_pin = pygame.image.load(os.path.join("assets", "DarkGreenPin.png"))
-role_4_pin = pygame.image.load(os.path.join("assets", "TealPin.png"))
-role_5_pin = pygame.image.load(os.path.join("assets", "PinkPin.png"))
-role_6_pin = pygame.image.load(os.path.join("assets", "OrangePin.png"))
-role_7_pin = pygame.image.load(os.path.join("assets", "Pin.png"))
-
-back_of_cities = pygame.image.load(os.path.join("assets", "Cities/BackOfCity.png"))
-back_of_cities = pygame.transform.scale(back_of_cities, (100, 140))
-card_algiers = pygame.image.load(os.path.join("assets", "Cities/Algiers_P.png"))
-card_atlanta = pygame.image.load(os.path.join("assets", "Cities/Atlanta_P.png"))
-card_baghdad = pygame.image.load(os.path.join("assets", "Cities/Baghdad_P.png"))
-research_station_image = pygame.image.load(os.path.join("assets", "ResearchStation.png"))
\ No newline at end of file
+# ASSETS IN THE ORDER THE SCREENS NEED THEM: STARTING SCREEN, ROLE MENU, THEN THE BOARD
+IMAGE_SPECS = {
+    "earth": (os.path.join("assets", "Starting.png"), (c.WIDTH, c.HEIGHT)),
+    "logo": (os.path.join("assets", "PandemicLogo.png"), (600, 300)),
+
+    "back_image": (os.path.join("assets", "BackOfRole.png"), None),
+    "role_1": (os.path.join("assets", "Scientist.png"), None),
+    "role_2": (os.path.join("assets", "Researcher.png"), None),
+    "role_3": (os.path.join("assets", "OperationsExpert.png"), None),
+    "role_4": (os.path.join("assets", "ContingencyPlanner.png"), None),
+    "role_5": (os.path.join("assets", "Dispatcher.png"), None),
+    "role_6": (os.path.join("assets", "Medic.png"), None),
+    "role_7": (os.path.join("assets", "QuarantineSpecialist.png"), None),
+    "role_1_pin": (os.path.join("assets", "GrayPin.png"), (c.LENGTH_PLAYER, c.HEIGHT_PLAYER)),
+    "role_2_pin": (os.path.join("assets", "BrownPin.png"), (c.LENGTH_PLAYER, c.HEIGHT_PLAYER)),
+    "role_3_pin": (os.path.join("assets", "DarkGreenPin.png"), (c.LENGTH_PLAYER, c.HEIGHT_PLAYER)),
+    "role_4_pin": (os.path.join("assets", "TealPin.png"), (c.LENGTH_PLAYER, c.HEIGHT_PLAYER)),
+    "role_5_pin": (os.path.join("assets", "PinkPin.png"), (c.LENGTH_PLAYER, c.HEIGHT_PLAYER)),
+    "role_6_pin": (os.path.join("assets", "OrangePin.png"), (c.LENGTH_PLAYER, c.HEIGHT_PLAYER)),
+    "role_7_pin": (os.path.join("assets", "Pin.png"), (c.LENGTH_PLAYER, c.HEIGHT_PLAYER)),
+
+    "background": (os.path.join("assets", "PandemicMapV2.png"), (c.WIDTH, c.HEIGHT)),
+    "back_of_cities": (os.path.join("assets", "Cities/BackOfCity.png"), (100, 140)),
+    "research_station_image": (os.path.join("assets", "ResearchStation.png"), None),
+    "card_algiers": (os.path.join("assets", "Cities/Algiers_P.png"), None),
+    "card_atlanta": (os.path.join("assets", "Cities/Atlanta_P.png"), None),
+    "card_baghdad": (os.path.join("assets", "Cities/Baghdad_P.png"), None)
+}
+
+
+class ImageLoader:
+    def __init__(self, specs: dict):
+        self.specs = specs
+        self.images = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def get(self, name: str):
+        image = self.images.get(name)
+        if image is None:
+            # IF THE PREFETCH THREAD IS DECODING THIS IMAGE RIGHT NOW WE ONLY WAIT FOR THAT ONE
+            with self.lock:
+                image = self.images.get(name)
+                if image is None:
+                    image = self.load(name)
+        return image
+
+    def load(self, name: str):
+        path, size = self.specs[name]
+        image = load_image(path, size)
+        self.images[name] = image
+        return image
+
+    def prefetch(self):
+        for name in self.specs:
+            with self.lock:
+                if name not in self.images:
+                    self.load(name)
+
+    def start_prefetch(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.prefetch, name="image-prefetch", daemon=True)
+            self.thread.start()
+
+
+loader = ImageLoader(IMAGE_SPECS)
+
+
+def start_prefetch():
+    loader.start_prefetch()
+
+
+def __getattr__(name):
+    if name in IMAGE_SPECS:
+        return loader.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,89 @@
+import sys
+import pygame
+from Profiling import profiler
+
+FPS_CAP = 60
+WAIT_TIMEOUT = 250
+
+
+class InputDispatcher:
+    def __init__(self, fps_cap: int = FPS_CAP, timeout: int = WAIT_TIMEOUT):
+        self.clock = pygame.time.Clock()
+        self.fps_cap = fps_cap
+        self.timeout = timeout
+        # SET WHEN A FRAME IS SENT TO THE DISPLAY, THE NEXT WAIT THEN KEEPS THE FRAMES AT MOST fps_cap A SECOND
+        self.drawn = False
+        self.idle_handlers = []
+        # FUNCTIONS CALLED FOR A KEY PRESS, OR WITH THE EVENT FOR AN EVENT TYPE, WHATEVER THE GAME IS WAITING FOR
+        self.key_handlers = {}
+        self.event_handlers = {}
+
+    @staticmethod
+    def quit():
+        pygame.quit()
+        sys.exit()
+
+    def wait_for_event(self) -> pygame.event.Event:
+        # BLOCKS UNTIL AN EVENT ARRIVES INSTEAD OF SPINNING ON pygame.event.get()
+        while True:
+            if self.drawn:
+                self.drawn = False
+                self.clock.tick(self.fps_cap)
+
+            event = pygame.event.wait(self.timeout)
+
+            if event.type == pygame.NOEVENT:
+                for handler in self.idle_handlers:
+                    handler()
+                continue
+
+            if event.type == pygame.QUIT:
+                self.quit()
+
+            # A MOVING MOUSE FILLS THE QUEUE WITH MOTION EVENTS, ONLY THE LAST POSITION MATTERS AND ONLY IF SOMETHING
+            # IS LISTENING FOR IT
+            if event.type == pygame.MOUSEMOTION:
+                if pygame.MOUSEMOTION not in self.event_handlers:
+                    continue
+                event = (pygame.event.get(pygame.MOUSEMOTION) or [event])[-1]
+
+            profiler.count_event()
+            if event.type == pygame.KEYDOWN and event.key in self.key_handlers:
+                self.key_handlers[event.key]()
+            elif event.type in self.event_handlers:
+                self.event_handlers[event.type](event)
+            return event
+
+    def frame_drawn(self):
+        self.drawn = True
+
+    def poll(self):
+        # KEEPS THE WINDOW RESPONSIVE DURING LONG COMPUTATIONS, CLICKS MADE MEANWHILE ARE DROPPED
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.quit()
+
+    def wait_for_click(self) -> (int, int):
+        while True:
+            event = self.wait_for_event()
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                return event.pos
+
+
+dispatcher = InputDispatcher()
+
+
+def wait_for_event() -> pygame.event.Event:
+    return dispatcher.wait_for_event()
+
+
+def wait_for_click() -> (int, int):
+    return dispatcher.wait_for_click()
+
+
+def poll():
+    dispatcher.poll()
+
+
+def frame_drawn():
+    dispatcher.frame_drawn()
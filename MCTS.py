@@ -0,0 +1,275 @@
+import argparse
+import math
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+import Constants as c
+from MapCompiler import load_map
+from Engine import GameState, PLAYING, WON, CharterFlight
+from Simulator import GreedyPolicy
+from Forecast import InfectionForecast
+from Zobrist import TranspositionTable
+
+MOVE_TIME_BUDGET = 1.0
+EXPLORATION = 1.4
+ROLLOUT_TURNS = 2
+# HOW OFTEN A SEARCH HANDS CONTROL BACK TO ITS CALLER, SO A WINDOW KEEPS ANSWERING WHILE THE AI THINKS
+POLL_INTERVAL = 0.05
+
+
+class SearchReport(namedtuple("SearchReport", "action nodes rollouts elapsed workers")):
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def rollouts_per_second(self) -> float:
+        return self.rollouts / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f"MCTS: {self.action} after {self.rollouts} rollouts and {self.nodes} nodes in {self.elapsed:.2f} s "
+                f"on {self.workers} workers: {self.nodes_per_second:.0f} nodes/sec, "
+                f"{self.rollouts_per_second:.0f} rollouts/sec")
+
+
+class Node:
+    # A POSITION OF THE SEARCH. TWO ORDERS OF THE SAME ACTIONS THAT END IN THE SAME POSITION SHARE ONE NODE THROUGH THE
+    # TRANSPOSITION TABLE, SO THE TREE IS A GRAPH AND A NODE DOESN'T KNOW ITS PARENT
+    __slots__ = ("children", "visits", "value")
+
+    def __init__(self):
+        self.children = {}
+        self.visits = 0
+        self.value = 0.0
+
+    def select(self, actions: list, exploration: float):
+        # UCT, BUT ONLY AMONG THE CHILDREN THAT ARE LEGAL IN THIS ITERATION'S VERSION OF THE HIDDEN CARDS
+        log_visits = math.log(self.visits)
+        children = self.children
+        return max(actions, key=lambda action: children[action].value / children[action].visits +
+                   exploration * math.sqrt(log_visits / children[action].visits))
+
+
+def candidate_actions(state: GameState) -> list:
+    # A CHARTER FLIGHT CAN GO ANYWHERE, ONLY THE ONES TO INFECTED CITIES AND RESEARCH STATIONS ARE WORTH SEARCHING
+    actions = state.legal_actions()
+    infected = state.cubes.any(axis=1).tolist()
+    return [action for action in actions if not isinstance(action, CharterFlight) or infected[action.city] or
+            state.has_research_station(action.city)]
+
+
+def evaluate(state: GameState, forecast: InfectionForecast | None = None) -> float:
+    # 1 FOR A WIN, 0 FOR A LOSS AND IN BETWEEN A GUESS FROM THE CURES, THE CUBES, THE OUTBREAKS AND THE HANDS. A SEARCH
+    # PASSES ITS OWN FORECAST, WHICH IS MOVED FROM ONE ROLLOUT'S STATE TO THE NEXT INSTEAD OF BEING MADE FOR EACH
+    if state.status != PLAYING:
+        return 1.0 if state.status == WON else 0.0
+
+    colors = len(c.COLOR_NAMES)
+    cures = sum(state.cured) / colors
+    cubes = sum(c.CUBES_PER_COLOR - supply for supply in state.cube_supply) / (colors * c.CUBES_PER_COLOR)
+    # THE OUTBREAKS THE NEXT INFECTION PHASE IS EXPECTED TO CAUSE COUNT AS IF THEY HAD ALREADY HAPPENED
+    if forecast is None:
+        forecast = InfectionForecast(state)
+    else:
+        forecast.follow(state)
+    outbreaks = min(1.0, (state.outbreaks + sum(forecast.expected_outbreaks)) / c.OUTBREAK_LIMIT)
+
+    progress = 0
+    for color in range(colors):
+        if not state.cured[color]:
+            best = max(len(state.cards_of_color(player.hand, color)) for player in state.players)
+            progress = max(progress, min(best, c.CARDS_TO_CURE) / c.CARDS_TO_CURE)
+
+    return 0.5 * cures + 0.2 * (1 - cubes) + 0.15 * (1 - outbreaks) + 0.15 * progress
+
+
+def determinize(state: GameState, rng: random.Random) -> GameState:
+    # THE SEARCH MUSTN'T KNOW THE ORDER OF THE DECKS, SO EVERY ITERATION PLAYS WITH ITS OWN SHUFFLE OF THEM. THE
+    # INFECTION DECK ONLY WITHIN ITS STRATA: THAT AN EPIDEMIC PUT THE DISCARD PILE ON TOP IS KNOWN TO EVERY PLAYER
+    state = state.copy()
+    state.player_deck.shuffle(rng)
+    state.infection_deck.shuffle_strata(state.infection_strata, rng)
+    state.rng = random.Random(rng.getrandbits(64))
+    return state
+
+
+def rollout(state: GameState, policy, rng: random.Random, forecast: InfectionForecast | None = None) -> float:
+    last_turn = state.turn + ROLLOUT_TURNS
+    while state.status == PLAYING and state.turn < last_turn:
+        state.apply(policy.choose(state, rng))
+    return evaluate(state, forecast)
+
+
+def search(root_state: GameState, time_budget: float, seed: int, exploration: float = EXPLORATION,
+           table: TranspositionTable | None = None, poll=None):
+    # OPEN LOOP MCTS: THE TREE STORES ACTIONS, THE STATES ARE REPLAYED FROM THE ROOT IN EVERY ITERATION. A NEW CHILD
+    # IS LOOKED UP BY THE HASH OF THE POSITION ITS ACTION LEADS TO, SO A POSITION THAT WAS ALREADY REACHED IN ANOTHER
+    # ORDER KEEPS ITS STATISTICS. THE TABLE OUTLIVES THE SEARCH, THE NEXT ONE STARTS FROM WHAT THIS ONE FOUND
+    rng = random.Random(seed)
+    policy = GreedyPolicy()
+    forecast = InfectionForecast(root_state)
+    if table is None:
+        table = TranspositionTable()
+    table.new_search()
+
+    root = table.get(root_state.hash)
+    if root is None:
+        root = Node()
+        table.store(root_state.hash, root)
+    nodes = 1
+    rollouts = 0
+
+    deadline = time.perf_counter() + time_budget
+    next_poll = 0.0
+    while rollouts == 0 or time.perf_counter() < deadline:
+        state = determinize(root_state, rng)
+        node = root
+        path = [root]
+
+        # SELECTION UNTIL A NODE HAS AN UNTRIED ACTION, WHICH IS EXPANDED
+        while state.status == PLAYING:
+            actions = candidate_actions(state)
+            untried = [action for action in actions if action not in node.children]
+            if untried:
+                action = rng.choice(untried)
+                state.apply(action)
+                key = state.hash
+                child = table.get(key)
+                if child is None:
+                    child = Node()
+                    table.store(key, child, len(path))
+                    nodes += 1
+                node.children[action] = child
+                path.append(child)
+                break
+
+            action = node.select(actions, exploration)
+            state.apply(action)
+            node = node.children[action]
+            path.append(node)
+
+        value = rollout(state, policy, rng, forecast)
+        rollouts += 1
+
+        for node in path:
+            node.visits += 1
+            node.value += value
+
+        if poll is not None and time.perf_counter() >= next_poll:
+            poll()
+            next_poll = time.perf_counter() + POLL_INTERVAL
+
+    return root, nodes, rollouts
+
+
+_map_data = None
+_transposition_table = None
+
+
+def initialize_worker():
+    global _map_data, _transposition_table
+    _map_data = load_map()
+    _transposition_table = TranspositionTable()
+
+
+def search_in_worker(state: GameState, time_budget: float, seed: int, exploration: float):
+    # ROOT PARALLELIZATION: EVERY WORKER GROWS ITS OWN TREE AND ONLY THE STATISTICS OF THE ROOT COME BACK
+    if _map_data is None:
+        initialize_worker()
+    state.attach_map(_map_data)
+
+    root, nodes, rollouts = search(state, time_budget, seed, exploration, _transposition_table)
+    statistics = {action: (child.visits, child.value) for action, child in root.children.items()}
+    return statistics, nodes, rollouts
+
+
+class MCTSPlayer:
+    def __init__(self, time_budget: float = MOVE_TIME_BUDGET, workers: int | None = None, seed=None,
+                 exploration: float = EXPLORATION):
+        self.time_budget = time_budget
+        self.workers = workers or os.cpu_count()
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        # ONE SearchReport PER SEARCH, FOR WHOEVER PLAYS WITH THIS PLAYER TO SHOW
+        self.reports = []
+        # THE TABLE OF THE SEARCHES RUN IN THIS PROCESS, EVERY WORKER OF THE POOL HAS ITS OWN
+        self.table = TranspositionTable()
+        # THE POOL IS STARTED ONCE AND KEPT FOR THE WHOLE GAME, EVERY MOVE ONLY SENDS THE CURRENT STATE
+        self.executor = ProcessPoolExecutor(self.workers, initializer=initialize_worker) if self.workers > 1 else None
+
+    def choose(self, state: GameState, poll=None):
+        # poll IS CALLED EVERY POLL_INTERVAL WHILE THE SEARCH RUNS
+        actions = state.legal_actions()
+        if len(actions) == 1:
+            return actions[0]
+
+        start = time.perf_counter()
+        if self.executor is None:
+            root, nodes, rollouts = search(state, self.time_budget, self.rng.getrandbits(64), self.exploration,
+                                           self.table, poll)
+            results = [({action: (child.visits, child.value) for action, child in root.children.items()},
+                        nodes, rollouts)]
+        else:
+            futures = [self.executor.submit(search_in_worker, state, self.time_budget, self.rng.getrandbits(64),
+                                            self.exploration) for _ in range(self.workers)]
+            while poll is not None and wait(futures, timeout=POLL_INTERVAL).not_done:
+                poll()
+            results = [future.result() for future in futures]
+
+        visits = {}
+        for statistics, _, _ in results:
+            for action, (action_visits, _) in statistics.items():
+                visits[action] = visits.get(action, 0) + action_visits
+
+        # THE MOST VISITED ACTION IS THE MOST ROBUST CHOICE
+        action = max(visits, key=visits.get, default=actions[0])
+
+        report = SearchReport(action, sum(result[1] for result in results), sum(result[2] for result in results),
+                              time.perf_counter() - start, self.workers)
+        self.reports.append(report)
+        return action
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays headless games with the MCTS player in every seat")
+    parser.add_argument("--games", type=int, default=1)
+    parser.add_argument("--players", type=int, choices=(2, 3, 4), default=2)
+    parser.add_argument("--difficulty", choices=c.DIFFICULTIES, default="EASY")
+    parser.add_argument("--budget", type=float, default=MOVE_TIME_BUDGET, help="seconds of search per action")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    map_data = load_map()
+    player = MCTSPlayer(arguments.budget, arguments.workers, arguments.seed)
+    wins = 0
+    try:
+        for game_number in range(arguments.games):
+            state = GameState(map_data, arguments.difficulty, arguments.seed + game_number)
+            state.setup(list(c.ROLES[:arguments.players]))
+            while state.status == PLAYING:
+                searches = len(player.reports)
+                state.apply(player.choose(state))
+                for report in player.reports[searches:]:
+                    print(report)
+            wins += state.status == WON
+            print(f"Game {game_number}: {state.status} after {state.turn} turns with {state.outbreaks} outbreaks")
+    finally:
+        player.close()
+
+    nodes = sum(report.nodes for report in player.reports)
+    rollouts = sum(report.rollouts for report in player.reports)
+    elapsed = sum(report.elapsed for report in player.reports)
+    print(f"{wins} of {arguments.games} games won, {len(player.reports)} searches: "
+          f"{nodes / elapsed:.0f} nodes/sec, {rollouts / elapsed:.0f} rollouts/sec")
+
+
+if __name__ == "__main__":
+    main()
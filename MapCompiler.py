@@ -0,0 +1,206 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from functools import cached_property
+import numpy as np
+import Constants as c
+from Distances import DistanceTable
+
+CITIES_FILE = "cities.json"
+CONNECTIONS_FILE = "connections.json"
+COMPILED_MAP_FILE = "map.bin"
+
+MAGIC = b"PDMAP"
+FORMAT_VERSION = 1
+
+# MAGIC, VERSION, (MTIME, SIZE) OF BOTH SOURCE FILES, CITIES, NEIGHBOR ENTRIES, STRINGS, STRING BYTES
+HEADER = struct.Struct("<5sxHqqqqIIII")
+
+
+def color_code(color_name: str) -> int:
+    return c.COLOR_NAMES.index(color_name)
+
+
+def image_path(raw_path: str) -> str:
+    return os.path.join(*raw_path.split(","))
+
+
+def source_signature(file_name: str) -> (int, int):
+    stat = os.stat(file_name)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def padding(length: int) -> bytes:
+    return b"\0" * (-length % 4)
+
+
+class MapData:
+    def __init__(self, names, images, xs, ys, colors, offsets, neighbors):
+        self.names = names
+        self.images = images
+        # THE COORDINATES ARE NUMPY ARRAYS, WHEN READ FROM THE COMPILED MAP THEY ARE VIEWS INTO THE MAPPED FILE
+        self.xs = np.asarray(xs, dtype=np.int32)
+        self.ys = np.asarray(ys, dtype=np.int32)
+        self.colors = colors
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.index = {name: index for index, name in enumerate(names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def neighbors_of(self, city: int):
+        return self.neighbors[self.offsets[city]:self.offsets[city + 1]]
+
+    def edges(self):
+        for city in range(len(self.names)):
+            for neighbor in self.neighbors_of(city):
+                if city < neighbor:
+                    yield city, neighbor
+
+    @cached_property
+    def distances(self) -> DistanceTable:
+        return DistanceTable(self)
+
+    def color_name(self, city: int) -> str:
+        return c.COLOR_NAMES[self.colors[city]]
+
+    @classmethod
+    def from_json(cls, cities_file: str = CITIES_FILE, connections_file: str = CONNECTIONS_FILE):
+        with open(cities_file) as f:
+            cities = json.load(f)
+        with open(connections_file) as f:
+            connections = json.load(f)
+
+        names = [city["name"] for city in cities]
+        index = {name: position for position, name in enumerate(names)}
+
+        adjacency = [set() for _ in names]
+        for connection in connections:
+            city1 = index[connection["city1"]]
+            city2 = index[connection["city2"]]
+            adjacency[city1].add(city2)
+            adjacency[city2].add(city1)
+
+        # COMPRESSED SPARSE ROW: THE NEIGHBORS OF CITY i ARE neighbors[offsets[i]:offsets[i + 1]]
+        offsets = [0]
+        neighbors = []
+        for city_neighbors in adjacency:
+            neighbors.extend(sorted(city_neighbors))
+            offsets.append(len(neighbors))
+
+        return cls(names, [image_path(city["image"]) for city in cities], [city["x"] for city in cities],
+                   [city["y"] for city in cities], [color_code(city["color"]) for city in cities], offsets, neighbors)
+
+
+def compile_map(cities_file: str = CITIES_FILE, connections_file: str = CONNECTIONS_FILE,
+                compiled_file: str = COMPILED_MAP_FILE) -> MapData:
+    map_data = MapData.from_json(cities_file, connections_file)
+    cities = len(map_data)
+
+    # STRING INTERNING: EVERY DISTINCT NAME OR IMAGE PATH IS STORED ONCE
+    strings = {}
+    for string in map_data.names + map_data.images:
+        strings.setdefault(string, len(strings))
+
+    encoded = [string.encode() for string in strings]
+    string_offsets = [0]
+    for string in encoded:
+        string_offsets.append(string_offsets[-1] + len(string))
+    blob = b"".join(encoded)
+
+    sections = [
+        struct.pack(f"<{len(string_offsets)}I", *string_offsets),
+        blob + padding(len(blob)),
+        struct.pack(f"<{cities}I", *(strings[name] for name in map_data.names)),
+        struct.pack(f"<{cities}I", *(strings[image] for image in map_data.images)),
+        map_data.xs.astype("<i4").tobytes(),
+        map_data.ys.astype("<i4").tobytes(),
+        bytes(map_data.colors) + padding(cities),
+        struct.pack(f"<{cities + 1}I", *map_data.offsets),
+        struct.pack(f"<{len(map_data.neighbors)}I", *map_data.neighbors)
+    ]
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, *source_signature(cities_file), *source_signature(connections_file),
+                         cities, len(map_data.neighbors), len(encoded), len(blob))
+
+    # WRITING TO A TEMPORARY FILE FIRST SO A READER NEVER MAPS A HALF WRITTEN MAP
+    temporary_file = compiled_file + ".tmp"
+    with open(temporary_file, "wb") as f:
+        f.write(header)
+        f.writelines(sections)
+    os.replace(temporary_file, compiled_file)
+
+    return map_data
+
+
+def read_header(compiled_file: str):
+    with open(compiled_file, "rb") as f:
+        data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        return None
+
+    header = HEADER.unpack(data)
+    if header[0] != MAGIC or header[1] != FORMAT_VERSION:
+        return None
+    return header
+
+
+def is_compiled_map_fresh(cities_file: str = CITIES_FILE, connections_file: str = CONNECTIONS_FILE,
+                          compiled_file: str = COMPILED_MAP_FILE) -> bool:
+    try:
+        header = read_header(compiled_file)
+    except OSError:
+        return False
+
+    return header is not None and \
+        header[2:4] == source_signature(cities_file) and header[4:6] == source_signature(connections_file)
+
+
+def read_compiled_map(compiled_file: str = COMPILED_MAP_FILE) -> MapData:
+    with open(compiled_file, "rb") as f:
+        buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    cities, neighbor_entries, string_count, blob_size = HEADER.unpack_from(buffer)[6:]
+    position = HEADER.size
+
+    def take(length: int, item_format: str | None = None):
+        nonlocal position
+        section = buffer[position:position + length]
+        position += length + (-length % 4)
+        return section.cast(item_format) if item_format else section
+
+    # THE NUMERIC SECTIONS STAY AS VIEWS INTO THE MAPPED FILE, ONLY THE STRINGS ARE DECODED
+    string_offsets = take(4 * (string_count + 1), "I")
+    blob = take(blob_size)
+    strings = [bytes(blob[string_offsets[k]:string_offsets[k + 1]]).decode() for k in range(string_count)]
+
+    names = [strings[k] for k in take(4 * cities, "I")]
+    images = [strings[k] for k in take(4 * cities, "I")]
+    xs = take(4 * cities, "i")
+    ys = take(4 * cities, "i")
+    colors = take(cities, "B")
+    offsets = take(4 * (cities + 1), "I")
+    neighbors = take(4 * neighbor_entries, "I")
+
+    return MapData(names, images, xs, ys, colors, offsets, neighbors)
+
+
+def load_map(cities_file: str = CITIES_FILE, connections_file: str = CONNECTIONS_FILE,
+             compiled_file: str = COMPILED_MAP_FILE) -> MapData:
+    if is_compiled_map_fresh(cities_file, connections_file, compiled_file):
+        return read_compiled_map(compiled_file)
+
+    # THE COMPILED MAP IS MISSING OR OLDER THAN THE JSON, SO THE JSON IS PARSED AND THE MAP RECOMPILED FOR NEXT TIME
+    try:
+        return compile_map(cities_file, connections_file, compiled_file)
+    except OSError:
+        return MapData.from_json(cities_file, connections_file)
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:] or [CITIES_FILE, CONNECTIONS_FILE, COMPILED_MAP_FILE]
+    compiled = compile_map(*arguments)
+    print(f"Compiled {len(compiled)} cities and {len(compiled.neighbors) // 2} connections")
@@ -1,31 +1,38 @@
 import pygame.sprite
+import Constants as c
 
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, name, player_image, x, y, offset_by_x):
+    def __init__(self, name, player_image, offset_by_x, game_state, index):
         super().__init__()
         self.name = name
-        self.city = "Atlanta"
-        self.cards = []
         self.image = player_image
         self.rect = self.image.get_rect()
-        self.moves = 4
         self.offset_by_x = offset_by_x
-        self.rect.center = (x, y)
+        self.game_state = game_state
+        self.index = index
 
     def __str__(self):
         return f"{self.name} is currently in {self.city}. They have {len(self.cards)} cards: {self.cards}"
 
-    def move(self, x: int, y: int, city: str):
-        self.rect.center = (x+5+self.offset_by_x, y-25)
-        self.city = city
-        self.moves -= 1
-        print(f"Player successfully moved to {city}")
+    # THE SPRITE ONLY SHOWS ITS PlayerState, EVERY CHANGE GOES THROUGH THE GameState
+    @property
+    def state(self):
+        return self.game_state.players[self.index]
 
-    def draw(self, cards):
-        self.cards.extend(cards)
+    @property
+    def city(self) -> str:
+        return self.game_state.map.names[self.state.city]
 
-    def replenish_moves(self):
-        self.moves = 4
+    @property
+    def cards(self) -> list[str]:
+        return [self.game_state.map.names[card] for card in self.state.hand]
 
+    @property
+    def moves(self) -> int:
+        return self.game_state.moves if self.game_state.current_player == self.index else c.ACTIONS_PER_TURN
 
+    def update(self, cities, camera=None):
+        city = cities[self.city]
+        x, y = (city.x, city.y) if camera is None else camera.to_screen(city.x, city.y)
+        self.rect.center = (x + 5 + self.offset_by_x, y - 25)
@@ -0,0 +1,137 @@
+import atexit
+import cProfile
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+SAMPLES = 240
+PROFILE_FILE = "pandemic.prof"
+
+# NAMED TIMERS AROUND THE HOT PATHS. THEY ONLY MEASURE WHILE THE PROFILER IS ENABLED, OTHERWISE A TIMED FUNCTION
+# COSTS ONE ATTRIBUTE CHECK MORE THAN BEFORE. NOTHING HERE USES PYGAME, SO THE ENGINE CAN BE TIMED TOO
+
+
+class Timer:
+    __slots__ = ("name", "samples", "count", "total")
+
+    def __init__(self, name: str, samples: int = SAMPLES):
+        self.name = name
+        # ONLY THE LAST SAMPLES ARE KEPT FOR THE PERCENTILES, THE COUNT AND THE TOTAL ARE FOR THE WHOLE SESSION
+        self.samples = deque(maxlen=samples)
+        self.count = 0
+        self.total = 0.0
+
+    def __str__(self):
+        return (f"{self.name}: {self.percentile(0.5) * 1000:.2f}/{self.percentile(0.95) * 1000:.2f}/"
+                f"{self.percentile(0.99) * 1000:.2f} ms over {self.count}")
+
+    def add(self, duration: float):
+        self.samples.append(duration)
+        self.count += 1
+        self.total += duration
+
+    def percentile(self, fraction: float) -> float:
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.timers = {}
+        self.event_times = deque()
+
+    def timer(self, name: str) -> Timer:
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = Timer(name)
+        return timer
+
+    def timed(self, name: str):
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.timer(name).add(time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def measure(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timer(name).add(time.perf_counter() - start)
+
+    def count_event(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.event_times.append(now)
+        while now - self.event_times[0] > 1:
+            self.event_times.popleft()
+
+    @property
+    def events_per_second(self) -> int:
+        # THE EVENTS OF THE LAST SECOND, SO A BURST OF CLICKS DOESN'T STAY IN THE NUMBER FOREVER
+        now = time.perf_counter()
+        while self.event_times and now - self.event_times[0] > 1:
+            self.event_times.popleft()
+        return len(self.event_times)
+
+    def clear(self):
+        self.timers.clear()
+        self.event_times.clear()
+
+
+class ProfileCapture:
+    # cProfile OVER A NUMBER OF TURNS, WRITTEN TO A .prof FILE THAT pstats (OR snakeviz) CAN READ
+    def __init__(self, turns: int, profile_file: str = PROFILE_FILE):
+        self.turns = turns
+        self.profile_file = profile_file
+        self.profile = None
+        self.last_turn = 0
+
+    @property
+    def running(self) -> bool:
+        return self.profile is not None
+
+    def start(self, turn: int):
+        self.last_turn = turn + self.turns
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        # A GAME CLOSED BEFORE THE LAST TURN STILL WRITES WHAT WAS CAPTURED
+        atexit.register(self.stop)
+
+    def update(self, turn: int):
+        if self.running and turn >= self.last_turn:
+            self.stop()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.profile.disable()
+        self.profile.dump_stats(self.profile_file)
+        self.profile = None
+        print(f"Profile of {self.turns} turns written to {self.profile_file}")
+
+
+profiler = Profiler()
+
+
+def timed(name: str):
+    return profiler.timed(name)
+
+
+def measure(name: str):
+    return profiler.measure(name)
@@ -0,0 +1,164 @@
+import argparse
+import struct
+import time
+from collections import namedtuple
+from dataclasses import astuple, fields
+import Constants as c
+from MapCompiler import load_map
+from Engine import GameState, PLAYING, Drive, DirectFlight, CharterFlight, ShuttleFlight, BuildResearchStation, \
+    TreatDisease, DiscoverCure, Pass, Discard
+
+REPLAY_FILE = "game.log"
+
+MAGIC = b"PDLOG"
+FORMAT_VERSION = 1
+
+# MAGIC, VERSION, SEED, DIFFICULTY, PLAYERS, FOLLOWED BY ONE BYTE PER ROLE AND ONE BYTE PER SEAT (A POSITION IN c.SEATS)
+HEADER = struct.Struct("<5sxHQBB")
+# ACTION TYPE, ITS ARGUMENT (CITY, COLOR OR CARD) AND THE ZOBRIST HASH OF THE STATE AFTER IT
+RECORD = struct.Struct("<BHQ")
+
+ACTION_TYPES = (Drive, DirectFlight, CharterFlight, ShuttleFlight, BuildResearchStation, TreatDisease, DiscoverCure,
+                Pass, Discard)
+ACTION_CODES = {action_type: code for code, action_type in enumerate(ACTION_TYPES)}
+
+# EVERY RANDOM DRAW OF A GAME (SHUFFLES, INFECTIONS, EPIDEMICS) COMES FROM THE GameState's RANDOM NUMBER GENERATOR,
+# SO THE SEED, THE ROLES AND THE ACTIONS ARE ENOUGH TO PLAY THE SAME GAME AGAIN. THE HASHES CATCH A REPLAY THAT
+# DIVERGES, FOR EXAMPLE AFTER A RULE CHANGE
+
+GameLog = namedtuple("GameLog", "seed difficulty roles actions hashes seats")
+
+
+class ReplayDivergedError(RuntimeError):
+    pass
+
+
+class ActionLog:
+    def __init__(self, seed: int, difficulty: str, roles: list[str], log_file: str = REPLAY_FILE,
+                 seats: list[str] | None = None):
+        self.log_file = log_file
+        seats = seats or [c.HUMAN_SEAT] * len(roles)
+        # APPEND ONLY: THE HEADER IS WRITTEN ONCE AND EVERY ACTION ADDS ONE RECORD THAT IS FLUSHED IMMEDIATELY
+        self.file = open(log_file, "wb")
+        self.file.write(HEADER.pack(MAGIC, FORMAT_VERSION, seed, c.DIFFICULTIES.index(difficulty), len(roles)))
+        self.file.write(bytes(c.ROLES.index(role) for role in roles))
+        self.file.write(bytes(c.SEATS.index(seat) for seat in seats))
+        self.file.flush()
+
+    @classmethod
+    def reopen(cls, log_file: str, length: int) -> "ActionLog":
+        # APPENDS TO AN EXISTING LOG AFTER ITS FIRST length BYTES, WHATEVER WAS WRITTEN AFTER THEM IS DROPPED
+        action_log = cls.__new__(cls)
+        action_log.log_file = log_file
+        action_log.file = open(log_file, "r+b")
+        action_log.file.truncate(length)
+        action_log.file.seek(length)
+        return action_log
+
+    def record(self, action, state_hash: int):
+        arguments = astuple(action)
+        self.file.write(RECORD.pack(ACTION_CODES[type(action)], arguments[0] if arguments else 0, state_hash))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def header_size(players: int) -> int:
+    return HEADER.size + 2 * players
+
+
+def read_log(log_file: str = REPLAY_FILE) -> GameLog:
+    with open(log_file, "rb") as f:
+        data = f.read()
+
+    magic, version, seed, difficulty, players = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"{log_file} is not a version {FORMAT_VERSION} game log")
+    roles = [c.ROLES[role] for role in data[HEADER.size:HEADER.size + players]]
+    seats = [c.SEATS[seat] for seat in data[HEADER.size + players:header_size(players)]]
+
+    actions = []
+    hashes = []
+    # A GAME THAT CRASHED WHILE WRITING MAY END WITH A PARTIAL RECORD, WHICH IS IGNORED
+    records = data[header_size(players):]
+    for code, argument, state_hash in RECORD.iter_unpack(records[:len(records) - len(records) % RECORD.size]):
+        action_type = ACTION_TYPES[code]
+        actions.append(action_type(argument) if fields(action_type) else action_type())
+        hashes.append(state_hash)
+
+    return GameLog(seed, c.DIFFICULTIES[difficulty], roles, actions, hashes, seats)
+
+
+def start_state(game_log: GameLog, map_data) -> GameState:
+    state = GameState(map_data, game_log.difficulty, game_log.seed)
+    state.setup(list(game_log.roles))
+    return state
+
+
+def replay(game_log: GameLog, map_data, turn: int | None = None, verify: bool = True) -> (GameState, int):
+    # FAST FORWARD WITHOUT ANY RENDERING TO THE START OF turn, OR TO THE END OF THE LOG.
+    # RETURNS THE STATE AND HOW MANY ACTIONS OF THE LOG WERE APPLIED
+    state = start_state(game_log, map_data)
+
+    applied = 0
+    for action, state_hash in zip(game_log.actions, game_log.hashes):
+        if state.status != PLAYING or (turn is not None and state.turn >= turn):
+            break
+
+        state.apply(action)
+        applied += 1
+        if verify and state.hash != state_hash:
+            raise ReplayDivergedError(f"The replay diverged from the log at action {applied}: {action}")
+
+    return state, applied
+
+
+def continue_log(game_log: GameLog, applied: int, log_file: str = REPLAY_FILE) -> ActionLog:
+    # A GAME HANDED OFF TO THE GUI GETS A NEW LOG THAT STARTS WITH THE REPLAYED ACTIONS, SO IT CAN BE REPLAYED AGAIN
+    action_log = ActionLog(game_log.seed, game_log.difficulty, game_log.roles, log_file, game_log.seats)
+    for action, state_hash in zip(game_log.actions[:applied], game_log.hashes[:applied]):
+        action_log.record(action, state_hash)
+    return action_log
+
+
+def resume_log(state: GameState, log_file: str = REPLAY_FILE) -> ActionLog | None:
+    # A GAME RESUMED FROM ITS CHECKPOINT KEEPS WRITING TO ITS LOG. AN ACTION IS LOGGED BEFORE THE CHECKPOINT IS SAVED,
+    # SO THE LOG MAY GO ONE ACTION FURTHER, AND IS CUT BACK TO THE LAST ACTION WITH THE HASH OF THE CHECKPOINT.
+    # None WHEN THE LOG IS MISSING OR OF ANOTHER GAME
+    try:
+        game_log = read_log(log_file)
+    except (OSError, ValueError, struct.error):
+        return None
+
+    state_hash = state.hash
+    if game_log.roles != [player.role for player in state.players] or state_hash not in game_log.hashes:
+        return None
+
+    kept = len(game_log.hashes) - game_log.hashes[::-1].index(state_hash)
+    return ActionLog.reopen(log_file, header_size(len(game_log.roles)) + kept * RECORD.size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays a game log headlessly")
+    parser.add_argument("log_file", nargs="?", default=REPLAY_FILE)
+    parser.add_argument("--turn", type=int, default=None, help="stop at the start of this turn")
+    parser.add_argument("--repeat", type=int, default=100, help="replays to time")
+    arguments = parser.parse_args()
+
+    map_data = load_map()
+    game_log = read_log(arguments.log_file)
+    state, applied = replay(game_log, map_data, arguments.turn)
+    print(state)
+    for player in state.players:
+        print(player)
+
+    start = time.perf_counter()
+    for _ in range(arguments.repeat):
+        replay(game_log, map_data, arguments.turn, verify=False)
+    elapsed = (time.perf_counter() - start) / arguments.repeat
+    print(f"{applied} actions replayed in {elapsed * 1000:.2f} ms: {applied / elapsed:.0f} actions/sec")
+
+
+if __name__ == "__main__":
+    main()
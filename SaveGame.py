@@ -0,0 +1,165 @@
+import math
+import os
+import random
+import struct
+from array import array
+import numpy as np
+import Constants as c
+from Deck import Deck, PlayerDeck, InfectionCard, EpidemicCard
+from Engine import GameState, PlayerState, PLAYING, WON, LOST, ACTION_PHASE, DISCARD_PHASE
+
+CHECKPOINT_FILE = "checkpoint.sav"
+
+MAGIC = b"PDSAV"
+FORMAT_VERSION = 1
+
+STATUSES = (PLAYING, WON, LOST)
+PHASES = (ACTION_PHASE, DISCARD_PHASE)
+# EPIDEMIC CARDS ARE THE ONLY PLAYER CARDS THAT ARE NOT A CITY
+EPIDEMIC = 0xFFFF
+
+# MAGIC, VERSION, CITIES, DIFFICULTY, STATUS, PHASE, PLAYERS, CURRENT PLAYER, MOVES, OUTBREAKS, INFECTION RATE,
+# CURED AND ERADICATED BITS, TURN, CUBE SUPPLY PER COLOR, SIZES OF THE PLAYER DECK, PLAYER DISCARD PILE, INFECTION DECK
+# AND INFECTION DISCARD PILE
+HEADER = struct.Struct("<5sxHHBBBBBBBBBBI4h4H")
+# THE MERSENNE TWISTER STATE OF THE GAME'S RANDOM NUMBER GENERATOR, SO A LOADED GAME KEEPS DRAWING THE SAME CARDS
+RNG_STATE = struct.Struct("<625Id")
+# THE NUMBER OF INFECTION STRATA, FOLLOWED BY THEIR SIZES FROM THE BOTTOM OF THE INFECTION DECK UP
+STRATA_HEADER = struct.Struct("<H")
+# AFTER THEM, WHO PLAYS EVERY PLAYER: ONE BYTE PER PLAYER, A POSITION IN c.SEATS
+
+# THE WHOLE STATE IS STORED AS INTEGER INDICES: CITIES, ROLES AND CARDS ARE POSITIONS IN THE MAP OR IN c.ROLES
+
+
+def bits(flags: list[bool]) -> int:
+    return sum(1 << position for position, flag in enumerate(flags) if flag)
+
+
+def flags(bits_value: int, count: int) -> list[bool]:
+    return [bits_value >> position & 1 == 1 for position in range(count)]
+
+
+def save_state(state: GameState, seats: list[str] | None = None) -> bytes:
+    index = state.map.index
+    cities = len(state.map)
+
+    player_deck = [EPIDEMIC if isinstance(card, EpidemicCard) else index[card.name] for card in state.player_deck]
+    player_discard_pile = [index[card.name] for card in state.player_discard_pile]
+    infection_deck = [index[card.name] for card in state.infection_deck]
+    infection_discard_pile = [index[card.name] for card in state.infection_discard_pile]
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, cities, c.DIFFICULTIES.index(state.difficulty),
+                         STATUSES.index(state.status), PHASES.index(state.phase), len(state.players),
+                         state.current_player, state.moves, state.outbreaks, state.infection_rate_counter,
+                         bits(state.cured), bits(state.eradicated), state.turn, *state.cube_supply,
+                         len(player_deck), len(player_discard_pile), len(infection_deck), len(infection_discard_pile))
+
+    _, mersenne_state, gauss_next = state.rng.getstate()
+    players = state.players
+    seats = seats or [c.HUMAN_SEAT] * len(players)
+
+    return b"".join((
+        header,
+        state.research_stations.to_bytes((cities + 7) // 8, "little"),
+        state.cubes.tobytes(),
+        bytes(c.ROLES.index(player.role) for player in players),
+        bytes(len(player.hand) for player in players),
+        array("H", [player.city for player in players]).tobytes(),
+        array("H", [card for player in players for card in player.hand]).tobytes(),
+        array("H", player_deck).tobytes(),
+        array("H", player_discard_pile).tobytes(),
+        array("H", infection_deck).tobytes(),
+        array("H", infection_discard_pile).tobytes(),
+        RNG_STATE.pack(*mersenne_state, math.nan if gauss_next is None else gauss_next),
+        STRATA_HEADER.pack(len(state.infection_strata)),
+        array("H", state.infection_strata).tobytes(),
+        bytes(c.SEATS.index(seat) for seat in seats)
+    ))
+
+
+def load_state(data: bytes, map_data) -> (GameState, list[str]):
+    if len(data) < HEADER.size:
+        raise ValueError("The save is too short to be a game")
+
+    (magic, version, cities, difficulty, status, phase, player_count, current_player, moves, outbreaks,
+     infection_rate_counter, cured, eradicated, turn, *rest) = HEADER.unpack_from(data)
+    cube_supply, deck_sizes = rest[:len(c.COLOR_NAMES)], rest[len(c.COLOR_NAMES):]
+
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"Not a version {FORMAT_VERSION} save")
+    if cities != len(map_data):
+        raise ValueError(f"The save is for a map of {cities} cities, not {len(map_data)}")
+
+    position = HEADER.size
+
+    def take(length: int) -> bytes:
+        nonlocal position
+        section = data[position:position + length]
+        position += length
+        return section
+
+    def take_indices(count: int) -> list[int]:
+        indices = array("H")
+        indices.frombytes(take(2 * count))
+        return indices.tolist()
+
+    state = GameState(map_data, c.DIFFICULTIES[difficulty])
+    state.status = STATUSES[status]
+    state.phase = PHASES[phase]
+    state.current_player = current_player
+    state.moves = moves
+    state.turn = turn
+    state.outbreaks = outbreaks
+    state.infection_rate_counter = infection_rate_counter
+    state.cured = flags(cured, len(c.COLOR_NAMES))
+    state.eradicated = flags(eradicated, len(c.COLOR_NAMES))
+    state.cube_supply = list(cube_supply)
+
+    state.research_stations = int.from_bytes(take((cities + 7) // 8), "little")
+    state.cubes = np.frombuffer(take(cities * len(c.COLOR_NAMES)), dtype=np.int8).reshape(cities, -1).copy()
+
+    roles = take(player_count)
+    hand_sizes = take(player_count)
+    positions = take_indices(player_count)
+    hands = take_indices(sum(hand_sizes))
+    state.players = []
+    for role, city, hand_size in zip(roles, positions, hand_sizes):
+        player = PlayerState(c.ROLES[role], city)
+        player.hand, hands = hands[:hand_size], hands[hand_size:]
+        state.players.append(player)
+
+    # THE CITY CARDS ARE THE SAME OBJECTS IN EVERY PILE, AS THEY ARE IN A GAME THAT WAS PLAYED
+    state.city_cards = list(PlayerDeck(map_data))
+    infection_cards = [InfectionCard(name) for name in map_data.names]
+    player_deck, player_discard_pile, infection_deck, infection_discard_pile = (take_indices(size)
+                                                                                for size in deck_sizes)
+    state.player_deck = Deck(EpidemicCard() if card == EPIDEMIC else state.city_cards[card] for card in player_deck)
+    state.player_discard_pile = Deck(state.city_cards[card] for card in player_discard_pile)
+    state.infection_deck = Deck(infection_cards[card] for card in infection_deck)
+    state.infection_discard_pile = Deck(infection_cards[card] for card in infection_discard_pile)
+
+    *mersenne_state, gauss_next = RNG_STATE.unpack_from(data, position)
+    position += RNG_STATE.size
+    state.rng = random.Random()
+    state.rng.setstate((3, tuple(mersenne_state), None if math.isnan(gauss_next) else gauss_next))
+
+    strata_count, = STRATA_HEADER.unpack_from(data, position)
+    position += STRATA_HEADER.size
+    state.index_infection_strata(take_indices(strata_count))
+    seats = [c.SEATS[seat] for seat in take(player_count)]
+
+    state.rehash()
+    return state, seats
+
+
+def save_game(state: GameState, save_file: str = CHECKPOINT_FILE, seats: list[str] | None = None):
+    # WRITING TO A TEMPORARY FILE FIRST SO A CRASH WHILE SAVING NEVER LEAVES A HALF WRITTEN SAVE
+    temporary_file = save_file + ".tmp"
+    with open(temporary_file, "wb") as f:
+        f.write(save_state(state, seats))
+    os.replace(temporary_file, save_file)
+
+
+def load_game(map_data, save_file: str = CHECKPOINT_FILE) -> (GameState, list[str]):
+    with open(save_file, "rb") as f:
+        return load_state(f.read(), map_data)
@@ -0,0 +1,423 @@
+import argparse
+import asyncio
+import struct
+from array import array
+from dataclasses import astuple, fields
+import numpy as np
+import Constants as c
+from MapCompiler import load_map
+from Deck import Deck, PlayerDeck, InfectionCard
+from Engine import GameState, PlayerState, IllegalActionError
+from SaveGame import STATUSES, PHASES, bits, flags
+from Replay import ACTION_TYPES, ACTION_CODES
+
+HOST = "127.0.0.1"
+PORT = 7777
+
+# EVERY MESSAGE IS A 4 BYTE LENGTH FOLLOWED BY A 1 BYTE TYPE AND ITS PAYLOAD
+FRAME = struct.Struct("<IB")
+
+# CLIENT TO SERVER
+JOIN = 1
+ACTION = 2
+JOIN_REQUEST = struct.Struct("<IBBQ")  # TABLE, DIFFICULTY, PLAYERS, SEED (ONLY USED IF THE TABLE IS NEW)
+ACTION_REQUEST = struct.Struct("<BH")  # ACTION TYPE AND ITS ARGUMENT, AS IN THE GAME LOG
+
+# SERVER TO CLIENT
+SNAPSHOT = 1
+DELTA = 2
+ERROR = 3
+
+# A CLIENT THAT DOESN'T READ ITS DELTAS IS DROPPED ONCE THIS MANY BYTES WAIT FOR IT, INSTEAD OF BUFFERING FOREVER
+MAX_BUFFERED = 1 << 20
+
+# CITIES, DIFFICULTY, STATUS, PHASE, PLAYERS, CURRENT PLAYER, MOVES, OUTBREAKS, INFECTION RATE, CURED AND ERADICATED
+# BITS, TURN, PLAYER DECK SIZE, CUBE SUPPLY PER COLOR, SIZE OF THE PLAYER DISCARD PILE AND NUMBER OF INFECTION STRATA
+SNAPSHOT_HEADER = struct.Struct("<HBBBBBBBBBBIH4hHB")
+# STATUS, PHASE, CURRENT PLAYER, MOVES, OUTBREAKS, INFECTION RATE, CURED AND ERADICATED BITS, TURN, PLAYER DECK SIZE,
+# CUBE SUPPLY PER COLOR AND THE NUMBER OF NEW RESEARCH STATIONS, CHANGED CUBES, MOVED PAWNS, CHANGED HANDS, INFECTION
+# STRATA, CARDS THAT CHANGED STRATUM AND NEW PLAYER DISCARDS
+DELTA_HEADER = struct.Struct("<BBBBBBBBIH4hBHBBBHB")
+CUBE_CHANGE = struct.Struct("<HBB")  # CITY, COLOR, CUBES NOW
+PAWN_MOVE = struct.Struct("<BH")  # PLAYER, CITY NOW
+HAND_HEADER = struct.Struct("<BB")  # PLAYER, CARDS NOW, FOLLOWED BY THE CARDS
+STRATUM_CHANGE = struct.Struct("<Hh")  # INFECTION CARD, STRATUM NOW (-1 IS THE DISCARD PILE)
+
+# A SNAPSHOT IS SENT ONCE, WHEN A CLIENT JOINS. AFTER THAT EVERY ACTION IS FOLLOWED BY A DELTA WITH ONLY WHAT CHANGED,
+# WHICH IS A FEW DOZEN BYTES INSTEAD OF THE WHOLE GAME. BOTH ONLY CARRY WHAT THE PLAYERS CAN SEE ON THE TABLE: THE
+# HANDS, THE DISCARD PILES AND WHICH INFECTION CARDS WERE SHUFFLED BACK TOGETHER AT EACH EPIDEMIC, BUT NEVER THE ORDER
+# OF A DECK OR THE STATE OF THE RANDOM NUMBER GENERATOR, WHICH WOULD TELL A CLIENT EVERY CARD STILL TO COME
+
+
+def frame(message_type: int, payload: bytes = b"") -> bytes:
+    return FRAME.pack(len(payload) + 1, message_type) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> (int, bytes):
+    length, message_type = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return message_type, await reader.readexactly(length - 1)
+
+
+def encode_action(action) -> bytes:
+    arguments = astuple(action)
+    return ACTION_REQUEST.pack(ACTION_CODES[type(action)], arguments[0] if arguments else 0)
+
+
+def decode_join(payload: bytes) -> (int, str, int, int):
+    if len(payload) != JOIN_REQUEST.size:
+        raise ValueError(f"A join request is {JOIN_REQUEST.size} bytes, not {len(payload)}")
+    table_id, difficulty, players, seed = JOIN_REQUEST.unpack(payload)
+    if difficulty >= len(c.DIFFICULTIES):
+        raise ValueError(f"There is no difficulty {difficulty}")
+    if str(players) not in c.NUMBER_OF_PLAYERS:
+        raise ValueError(f"A game is for {c.NUMBER_OF_PLAYERS[0]} to {c.NUMBER_OF_PLAYERS[-1]} players, not {players}")
+    return table_id, c.DIFFICULTIES[difficulty], players, seed
+
+
+def decode_action(payload: bytes):
+    code, argument = ACTION_REQUEST.unpack(payload)
+    if code >= len(ACTION_TYPES):
+        raise IllegalActionError(f"There is no action {code}")
+    action_type = ACTION_TYPES[code]
+    return action_type(argument) if fields(action_type) else action_type()
+
+
+class PublicState:
+    # WHAT A DELTA IS COMPUTED AGAINST: THE PARTS OF A GameState THAT CLIENTS SEE
+    __slots__ = ("cubes", "research_stations", "positions", "hands", "infection_stratum", "player_discards")
+
+    def __init__(self, state: GameState):
+        self.cubes = state.cubes.copy()
+        self.research_stations = state.research_stations
+        self.positions = [player.city for player in state.players]
+        self.hands = [tuple(player.hand) for player in state.players]
+        self.infection_stratum = state.infection_stratum.copy()
+        # THE PLAYER DISCARD PILE IS NEVER SHUFFLED BACK, SO WHAT CHANGES IS ONLY WHAT WAS ADDED ON TOP OF IT
+        self.player_discards = len(state.player_discard_pile)
+
+
+def encode_snapshot(state: GameState) -> bytes:
+    index = state.map.index
+    cities = len(state.map)
+    players = state.players
+    player_discard_pile = [index[card.name] for card in state.player_discard_pile]
+
+    header = SNAPSHOT_HEADER.pack(cities, c.DIFFICULTIES.index(state.difficulty), STATUSES.index(state.status),
+                                  PHASES.index(state.phase), len(players), state.current_player, state.moves,
+                                  state.outbreaks, state.infection_rate_counter, bits(state.cured),
+                                  bits(state.eradicated), state.turn, len(state.player_deck), *state.cube_supply,
+                                  len(player_discard_pile), len(state.infection_strata))
+
+    return b"".join((
+        header,
+        state.research_stations.to_bytes((cities + 7) // 8, "little"),
+        state.cubes.tobytes(),
+        bytes(c.ROLES.index(player.role) for player in players),
+        bytes(len(player.hand) for player in players),
+        array("H", [player.city for player in players]).tobytes(),
+        array("H", [card for player in players for card in player.hand]).tobytes(),
+        array("H", player_discard_pile).tobytes(),
+        array("H", state.infection_strata).tobytes(),
+        state.infection_stratum.astype("<i2").tobytes()
+    ))
+
+
+def infection_discard_pile(state: GameState) -> Deck:
+    # A CLIENT ONLY KNOWS WHICH CARDS ARE IN THE INFECTION DISCARD PILE, SO IT KEEPS THEM IN MAP ORDER
+    return Deck(InfectionCard(state.map.names[city]) for city in np.flatnonzero(state.infection_stratum < 0).tolist())
+
+
+def decode_snapshot(data: bytes, map_data) -> (GameState, int):
+    # A CLIENT'S GameState HAS NO DECKS TO DRAW FROM AND NO HASH, SO IT CAN BE SHOWN AND ASKED FOR ITS LEGAL ACTIONS,
+    # BUT NOT PLAYED ON. RETURNS IT WITH THE SIZE OF THE PLAYER DECK
+    (cities, difficulty, status, phase, player_count, current_player, moves, outbreaks, infection_rate_counter, cured,
+     eradicated, turn, player_deck_size, *rest) = SNAPSHOT_HEADER.unpack_from(data)
+    colors = len(c.COLOR_NAMES)
+    cube_supply = rest[:colors]
+    player_discards, strata = rest[colors:]
+    if cities != len(map_data):
+        raise ValueError(f"The table plays on a map of {cities} cities, not {len(map_data)}")
+
+    position = SNAPSHOT_HEADER.size
+
+    def take(length: int) -> bytes:
+        nonlocal position
+        section = data[position:position + length]
+        position += length
+        return section
+
+    def take_indices(count: int) -> list[int]:
+        indices = array("H")
+        indices.frombytes(take(2 * count))
+        return indices.tolist()
+
+    state = GameState(map_data, c.DIFFICULTIES[difficulty])
+    state.status = STATUSES[status]
+    state.phase = PHASES[phase]
+    state.current_player = current_player
+    state.moves = moves
+    state.turn = turn
+    state.outbreaks = outbreaks
+    state.infection_rate_counter = infection_rate_counter
+    state.cured = flags(cured, colors)
+    state.eradicated = flags(eradicated, colors)
+    state.cube_supply = list(cube_supply)
+
+    state.research_stations = int.from_bytes(take((cities + 7) // 8), "little")
+    state.cubes = np.frombuffer(take(cities * colors), dtype=np.int8).reshape(cities, -1).copy()
+    state.index_full_cities()
+
+    roles = take(player_count)
+    hand_sizes = take(player_count)
+    positions = take_indices(player_count)
+    hands = take_indices(sum(hand_sizes))
+    state.players = []
+    for role, city, hand_size in zip(roles, positions, hand_sizes):
+        player = PlayerState(c.ROLES[role], city)
+        player.hand, hands = hands[:hand_size], hands[hand_size:]
+        state.players.append(player)
+
+    state.city_cards = list(PlayerDeck(map_data))
+    state.player_discard_pile = Deck(state.city_cards[card] for card in take_indices(player_discards))
+    state.infection_strata = take_indices(strata)
+    state.infection_stratum = np.frombuffer(take(2 * cities), dtype="<i2").astype(np.int16)
+    state.infection_discard_pile = infection_discard_pile(state)
+    return state, player_deck_size
+
+
+def encode_delta(before: PublicState, state: GameState) -> bytes:
+    new_stations = state.research_stations & ~before.research_stations
+    stations = [city for city in range(len(state.map)) if new_stations >> city & 1]
+
+    changed_cities, changed_colors = np.nonzero(state.cubes != before.cubes)
+    cubes = state.cubes[changed_cities, changed_colors].tolist()
+    cube_changes = [CUBE_CHANGE.pack(city, color, count)
+                    for city, color, count in zip(changed_cities.tolist(), changed_colors.tolist(), cubes)]
+
+    pawn_moves = [PAWN_MOVE.pack(number, player.city) for number, player in enumerate(state.players)
+                  if player.city != before.positions[number]]
+
+    hands = [HAND_HEADER.pack(number, len(player.hand)) + struct.pack(f"<{len(player.hand)}H", *player.hand)
+             for number, player in enumerate(state.players) if tuple(player.hand) != before.hands[number]]
+
+    changed_cards = np.flatnonzero(state.infection_stratum != before.infection_stratum).tolist()
+    stratum_changes = [STRATUM_CHANGE.pack(city, int(state.infection_stratum[city])) for city in changed_cards]
+
+    index = state.map.index
+    player_discards = [index[card.name] for card in list(state.player_discard_pile)[before.player_discards:]]
+
+    header = DELTA_HEADER.pack(STATUSES.index(state.status), PHASES.index(state.phase), state.current_player,
+                               state.moves, state.outbreaks, state.infection_rate_counter, bits(state.cured),
+                               bits(state.eradicated), state.turn, len(state.player_deck), *state.cube_supply,
+                               len(stations), len(cube_changes), len(pawn_moves), len(hands),
+                               len(state.infection_strata), len(stratum_changes), len(player_discards))
+    return b"".join([header, struct.pack(f"<{len(stations)}H", *stations)] + cube_changes + pawn_moves + hands
+                    + [array("H", state.infection_strata).tobytes()] + stratum_changes
+                    + [array("H", player_discards).tobytes()])
+
+
+def apply_delta(state: GameState, delta: bytes) -> int:
+    # BRINGS A CLIENT'S COPY OF THE GAME UP TO DATE AND RETURNS THE SIZE OF THE PLAYER DECK
+    (status, phase, current_player, moves, outbreaks, infection_rate_counter, cured, eradicated, turn,
+     player_deck_size, *rest) = DELTA_HEADER.unpack_from(delta)
+    colors = len(c.COLOR_NAMES)
+    cube_supply = rest[:colors]
+    stations, cube_changes, pawn_moves, hands, strata, stratum_changes, player_discards = rest[colors:]
+
+    state.status = STATUSES[status]
+    state.phase = PHASES[phase]
+    state.current_player = current_player
+    state.moves = moves
+    state.outbreaks = outbreaks
+    state.infection_rate_counter = infection_rate_counter
+    state.cured = flags(cured, colors)
+    state.eradicated = flags(eradicated, colors)
+    state.turn = turn
+    state.cube_supply = list(cube_supply)
+
+    position = DELTA_HEADER.size
+    for city in struct.unpack_from(f"<{stations}H", delta, position):
+        state.research_stations |= 1 << city
+    position += 2 * stations
+
+    for _ in range(cube_changes):
+        city, color, count = CUBE_CHANGE.unpack_from(delta, position)
+        state.set_cubes(city, color, int(state.cubes[city, color]), count)
+        position += CUBE_CHANGE.size
+
+    for _ in range(pawn_moves):
+        number, city = PAWN_MOVE.unpack_from(delta, position)
+        state.players[number].city = city
+        position += PAWN_MOVE.size
+
+    for _ in range(hands):
+        number, size = HAND_HEADER.unpack_from(delta, position)
+        position += HAND_HEADER.size
+        state.players[number].hand = list(struct.unpack_from(f"<{size}H", delta, position))
+        position += 2 * size
+
+    state.infection_strata = list(struct.unpack_from(f"<{strata}H", delta, position))
+    position += 2 * strata
+
+    for _ in range(stratum_changes):
+        city, stratum = STRATUM_CHANGE.unpack_from(delta, position)
+        state.infection_stratum[city] = stratum
+        position += STRATUM_CHANGE.size
+    if stratum_changes:
+        state.infection_discard_pile = infection_discard_pile(state)
+
+    state.player_discard_pile.add_cards(state.city_cards[card]
+                                        for card in struct.unpack_from(f"<{player_discards}H", delta, position))
+    return player_deck_size
+
+
+class Table:
+    def __init__(self, table_id: int, map_data, difficulty: str, players: int, seed: int):
+        self.table_id = table_id
+        self.state = GameState(map_data, difficulty, seed)
+        self.state.setup(list(c.ROLES[:players]))
+        self.clients = set()
+        self.actions = 0
+
+    def apply(self, action) -> bytes:
+        # AN ILLEGAL ACTION IS TURNED DOWN BEFORE IT TOUCHES THE GAME, SO NO CLIENT CAN LEAVE A TABLE HALF CHANGED
+        if not self.state.is_legal(action):
+            raise IllegalActionError(f"{action} is not a legal action now")
+        before = PublicState(self.state)
+        self.state.apply(action)
+        self.actions += 1
+        return encode_delta(before, self.state)
+
+
+class TableServer:
+    # ONE PROCESS, ONE EVENT LOOP AND ANY NUMBER OF TABLES. EVERY ACTION IS APPLIED BY THE LOOP ITSELF, SO THE TABLES
+    # NEED NO LOCKS, AND A GAME ACTION TAKES MICROSECONDS SO IT NEVER HOLDS UP THE OTHER TABLES
+    def __init__(self, map_data=None):
+        self.map = map_data if map_data is not None else load_map()
+        self.tables = {}
+        self.actions = 0
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        table = None
+        try:
+            while True:
+                message_type, payload = await read_frame(reader)
+
+                if message_type == JOIN:
+                    try:
+                        request = decode_join(payload)
+                    except ValueError as error:
+                        writer.write(frame(ERROR, str(error).encode()))
+                    else:
+                        if table is not None:
+                            self.leave(writer, table)
+                        table = self.join(writer, *request)
+                        writer.write(frame(SNAPSHOT, encode_snapshot(table.state)))
+
+                elif message_type == ACTION and table is not None:
+                    try:
+                        delta = frame(DELTA, table.apply(decode_action(payload)))
+                    except (IllegalActionError, struct.error) as error:
+                        writer.write(frame(ERROR, str(error).encode()))
+                    else:
+                        self.actions += 1
+                        for client in list(table.clients):
+                            client.write(delta)
+                            # ONLY THE SENDER IS WAITED FOR, SO A SPECTATOR THAT STOPPED READING WOULD GROW ITS
+                            # BUFFER FOREVER. CLOSING IT ENDS ITS OWN handle_client, WHICH LEAVES THE TABLE
+                            if client is not writer and client.transport.get_write_buffer_size() > MAX_BUFFERED:
+                                table.clients.discard(client)
+                                client.close()
+
+                else:
+                    writer.write(frame(ERROR, b"Join a table first"))
+
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if table is not None:
+                self.leave(writer, table)
+            writer.close()
+
+    def join(self, writer: asyncio.StreamWriter, table_id: int, difficulty: str, players: int, seed: int) -> Table:
+        table = self.tables.get(table_id)
+        if table is None:
+            table = self.tables[table_id] = Table(table_id, self.map, difficulty, players, seed)
+        table.clients.add(writer)
+        return table
+
+    def leave(self, writer: asyncio.StreamWriter, table: Table):
+        # A TABLE LIVES AS LONG AS SOMEONE SITS AT IT
+        table.clients.discard(writer)
+        if not table.clients and self.tables.get(table.table_id) is table:
+            del self.tables[table.table_id]
+
+    async def serve(self, host: str = HOST, port: int = PORT, unix_socket: str | None = None):
+        if unix_socket is not None:
+            server = await asyncio.start_unix_server(self.handle_client, unix_socket)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+
+        async with server:
+            print(f"Serving tables on {unix_socket or f'{host}:{port}'}", flush=True)
+            await server.serve_forever()
+
+
+class TableClient:
+    # A CLIENT KEEPS ITS OWN COPY OF ITS TABLE'S GAME, BUILT FROM THE SNAPSHOT AND UPDATED BY EVERY DELTA
+    def __init__(self, map_data):
+        self.map = map_data
+        self.reader = None
+        self.writer = None
+        self.state = None
+        self.player_deck_size = 0
+
+    async def connect(self, host: str = HOST, port: int = PORT, unix_socket: str | None = None):
+        if unix_socket is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(unix_socket)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    async def join(self, table_id: int, difficulty: str = "NORMAL", players: int = 2, seed: int = 0) -> GameState:
+        self.writer.write(frame(JOIN, JOIN_REQUEST.pack(table_id, c.DIFFICULTIES.index(difficulty), players, seed)))
+        message_type, payload = await read_frame(self.reader)
+        if message_type != SNAPSHOT:
+            raise ConnectionError(payload.decode())
+        self.state, self.player_deck_size = decode_snapshot(payload, self.map)
+        return self.state
+
+    async def send(self, action):
+        # RETURNS ONCE THE DELTA OF THIS ACTION CAME BACK AND WAS APPLIED
+        self.writer.write(frame(ACTION, encode_action(action)))
+        message_type, payload = await read_frame(self.reader)
+        if message_type == ERROR:
+            raise IllegalActionError(payload.decode())
+        self.player_deck_size = apply_delta(self.state, payload)
+
+    async def receive(self):
+        # FOR THE OTHER SEATS OF A TABLE: WAITS FOR THE NEXT DELTA SOMEONE ELSE CAUSED
+        message_type, payload = await read_frame(self.reader)
+        if message_type == DELTA:
+            self.player_deck_size = apply_delta(self.state, payload)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hosts game tables over TCP or a Unix socket")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    arguments = parser.parse_args()
+
+    try:
+        asyncio.run(TableServer().serve(arguments.host, arguments.port, arguments.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
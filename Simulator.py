@@ -0,0 +1,155 @@
+import argparse
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import Constants as c
+from MapCompiler import load_map
+from Distances import UNREACHABLE
+from Engine import GameState, PLAYING, WON, DISCARD_PHASE, Drive, TreatDisease, DiscoverCure, Discard, \
+    BuildResearchStation
+
+GameRecord = namedtuple("GameRecord", "difficulty players seed won turns outbreaks cube_peaks")
+
+
+class RandomPolicy:
+    name = "random"
+
+    def choose(self, state: GameState, rng: random.Random):
+        return rng.choice(state.legal_actions())
+
+
+class GreedyPolicy:
+    name = "greedy"
+
+    def choose(self, state: GameState, rng: random.Random):
+        actions = state.legal_actions()
+        player = state.player
+
+        if state.phase == DISCARD_PHASE:
+            # KEEPING THE COLOR THE PLAYER IS CLOSEST TO CURING
+            counts = [len(state.cards_of_color(player.hand, color)) for color in range(len(c.COLOR_NAMES))]
+            return min(actions, key=lambda action: counts[state.map.colors[action.card]])
+
+        for action in actions:
+            if isinstance(action, DiscoverCure):
+                return action
+
+        treatments = [action for action in actions if isinstance(action, TreatDisease)]
+        if treatments:
+            return max(treatments, key=lambda action: state.cubes[player.city, action.color])
+
+        # WITH ENOUGH CARDS FOR A CURE THE PLAYER HEADS FOR THE CLOSEST RESEARCH STATION
+        for color, cured in enumerate(state.cured):
+            if not cured and len(state.cards_of_color(player.hand, color)) >= c.CARDS_TO_CURE:
+                step = self.step_towards(state, player.city, state.research_stations)
+                if step is not None:
+                    return Drive(step)
+                if BuildResearchStation() in actions and len(player.hand) > c.CARDS_TO_CURE:
+                    return BuildResearchStation()
+
+        drives = [action for action in actions if isinstance(action, Drive)]
+        city_cubes = state.cubes.sum(axis=1)
+        infected = [action for action in drives if city_cubes[action.city] > 0]
+        if infected:
+            return max(infected, key=lambda action: city_cubes[action.city])
+
+        return rng.choice(drives) if drives else rng.choice(actions)
+
+    @staticmethod
+    def step_towards(state: GameState, start: int, targets: int):
+        # THE FIRST STEP OF A SHORTEST PATH TO ANY CITY IN THE targets BITMASK, READ FROM THE DISTANCE TABLE
+        if targets >> start & 1:
+            return None
+
+        nearest = state.map.distances.tables_for(targets)[0]
+        step = min(state.neighbors(start), key=nearest.__getitem__, default=None)
+        return step if step is not None and nearest[step] != UNREACHABLE else None
+
+
+POLICIES = {policy.name: policy for policy in (RandomPolicy, GreedyPolicy)}
+
+_map_data = None
+
+
+def initialize_worker():
+    # EVERY WORKER LOADS (MEMORY MAPS) THE MAP ONCE INSTEAD OF RECEIVING IT WITH EVERY GAME
+    global _map_data
+    _map_data = load_map()
+
+
+def game_seed(base_seed: int, difficulty: str, players: int, game_number: int) -> int:
+    # THE SEED ONLY DEPENDS ON WHICH GAME IT IS, SO THE RESULTS DON'T DEPEND ON HOW GAMES ARE SPREAD OVER WORKERS
+    return hash((base_seed, c.DIFFICULTIES.index(difficulty), players, game_number)) & 0xFFFFFFFFFFFF
+
+
+def play_game(difficulty: str, players: int, seed: int, policy_name: str) -> GameRecord:
+    if _map_data is None:
+        initialize_worker()
+
+    rng = random.Random(seed)
+    state = GameState(_map_data, difficulty, seed)
+    state.setup(list(c.ROLES[:players]))
+    policy = POLICIES[policy_name]()
+
+    cube_peaks = [c.CUBES_PER_COLOR - supply for supply in state.cube_supply]
+    while state.status == PLAYING:
+        state.apply(policy.choose(state, rng))
+        for color, supply in enumerate(state.cube_supply):
+            cube_peaks[color] = max(cube_peaks[color], c.CUBES_PER_COLOR - supply)
+
+    return GameRecord(difficulty, players, seed, state.status == WON, state.turn, state.outbreaks, tuple(cube_peaks))
+
+
+def play_batch(batch: list) -> list[GameRecord]:
+    return [play_game(*game) for game in batch]
+
+
+def simulate(games: int, difficulties=c.DIFFICULTIES, player_counts=(2, 3, 4), policy_name: str = "greedy",
+             workers: int | None = None, base_seed: int = 0, batch_size: int = 32):
+    jobs = [(difficulty, players, game_seed(base_seed, difficulty, players, game_number), policy_name)
+            for difficulty in difficulties for players in player_counts for game_number in range(games)]
+    batches = [jobs[start:start + batch_size] for start in range(0, len(jobs), batch_size)]
+
+    # RESULTS ARE STREAMED BACK BATCH BY BATCH AS SOON AS THEY ARE READY
+    with ProcessPoolExecutor(max_workers=workers, initializer=initialize_worker) as executor:
+        for records in executor.map(play_batch, batches):
+            yield from records
+
+
+def summarize(records: list[GameRecord]) -> dict:
+    summary = {}
+    for record in records:
+        key = (record.difficulty, record.players)
+        summary.setdefault(key, []).append(record)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays many headless games to estimate win rates")
+    parser.add_argument("--games", type=int, default=100, help="games per difficulty and player count")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="greedy")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    records = list(simulate(arguments.games, policy_name=arguments.policy, workers=arguments.workers,
+                            base_seed=arguments.seed))
+    elapsed = time.perf_counter() - start
+
+    print(f"{'difficulty':<10} {'players':>7} {'win rate':>9} {'turns':>7} {'outbreaks':>10} cube peaks")
+    for (difficulty, players), group in summarize(records).items():
+        wins = sum(record.won for record in group) / len(group)
+        turns = sum(record.turns for record in group) / len(group)
+        outbreaks = sum(record.outbreaks for record in group) / len(group)
+        peaks = [max(record.cube_peaks[color] for record in group) for color in range(len(c.COLOR_NAMES))]
+        print(f"{difficulty:<10} {players:>7} {wins:>9.1%} {turns:>7.1f} {outbreaks:>10.2f} {peaks}")
+
+    print(f"{len(records)} games in {elapsed:.2f} s with {arguments.workers} workers: "
+          f"{len(records) / elapsed:.1f} games/sec")
+
+
+if __name__ == "__main__":
+    main()
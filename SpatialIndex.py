@@ -0,0 +1,54 @@
+from collections import defaultdict
+
+
+class UniformGrid:
+    def __init__(self, cell_size: int):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def cell_of(self, x: float, y: float) -> (int, int):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, key, x: float, y: float):
+        self.cells[self.cell_of(x, y)].append((key, x, y))
+        self.positions[key] = (x, y)
+
+    def nearest_within(self, x: float, y: float, radius: float):
+        # ONLY THE BUCKETS THE CIRCLE AROUND THE POINT CAN TOUCH ARE TESTED
+        min_cell_x, min_cell_y = self.cell_of(x - radius, y - radius)
+        max_cell_x, max_cell_y = self.cell_of(x + radius, y + radius)
+
+        best_key = None
+        best_distance = radius * radius
+
+        for cell_x in range(min_cell_x, max_cell_x + 1):
+            for cell_y in range(min_cell_y, max_cell_y + 1):
+                for key, key_x, key_y in self.cells.get((cell_x, cell_y), ()):
+                    distance = (x - key_x) ** 2 + (y - key_y) ** 2
+                    if distance < best_distance:
+                        best_key = key
+                        best_distance = distance
+
+        return best_key
+
+    def query_rect(self, left: float, top: float, right: float, bottom: float):
+        min_cell_x, min_cell_y = self.cell_of(left, top)
+        max_cell_x, max_cell_y = self.cell_of(right, bottom)
+
+        # A RECT WIDER THAN THE OCCUPIED PART OF THE GRID IS CHEAPER TO ANSWER BY WALKING THE OCCUPIED CELLS
+        if (max_cell_x - min_cell_x + 1) * (max_cell_y - min_cell_y + 1) > len(self.cells):
+            cells = [bucket for (cell_x, cell_y), bucket in self.cells.items()
+                     if min_cell_x <= cell_x <= max_cell_x and min_cell_y <= cell_y <= max_cell_y]
+        else:
+            cells = [self.cells[cell] for cell in
+                     ((cell_x, cell_y) for cell_x in range(min_cell_x, max_cell_x + 1)
+                      for cell_y in range(min_cell_y, max_cell_y + 1)) if cell in self.cells]
+
+        for bucket in cells:
+            for key, key_x, key_y in bucket:
+                if left <= key_x <= right and top <= key_y <= bottom:
+                    yield key
@@ -0,0 +1,142 @@
+import numpy as np
+import Constants as c
+
+ZOOM_STEP = 1.25
+MAX_ZOOM = 4.0
+PAN_STEP = 150
+
+# LEVEL OF DETAIL: BELOW THESE ZOOMS THE CITY NAMES AND THE CUBE COUNTS ARE NOT DRAWN, AND WITH MORE CITIES THAN
+# MAX_LABELED_CITIES IN VIEW THE NAMES ARE LEFT OUT AT ANY ZOOM
+LABEL_ZOOM = 0.75
+CUBE_ZOOM = 0.5
+MAX_LABELED_CITIES = 150
+MIN_MARKER_RADIUS = 2
+
+# HOW FAR A CITY'S NAME AND CUBES REACH FROM ITS CENTER ON SCREEN, SO CITIES JUST OUTSIDE THE VIEW ARE STILL DRAWN
+CITY_MARGIN = 200
+
+
+def world_size(map_data) -> (int, int):
+    # THE WORLD IS THE MAP IMAGE, OR BIGGER IF A MAP HAS CITIES OUTSIDE IT
+    return max(c.WIDTH, int(map_data.xs.max()) + 1), max(c.HEIGHT, int(map_data.ys.max()) + 1)
+
+
+def edge_segments(x1: int, y1: int, x2: int, y2: int, world_width: int) -> list[tuple]:
+    # THE MAP WRAPS AROUND HORIZONTALLY: AN EDGE LONGER THAN HALF THE WORLD GOES THE SHORT WAY, OFF ONE SIDE AND BACK
+    # IN FROM THE OTHER, AS TWO SEGMENTS THAT MEET THE EDGES OF THE WORLD AT THE SAME HEIGHT
+    if abs(x2 - x1) <= world_width / 2:
+        return [(x1, y1, x2, y2)]
+
+    if x1 > x2:
+        x1, y1, x2, y2 = x2, y2, x1, y1
+    shifted_x2 = x2 - world_width
+    crossing_y = y1 + (y2 - y1) * x1 / (x1 - shifted_x2)
+    return [(x1, y1, 0, crossing_y), (x2, y2, world_width, crossing_y)]
+
+
+def clamp_axis(position: float, world_length: float, view_length: float) -> float:
+    # THE VIEW STAYS ON THE WORLD, A WORLD SMALLER THAN THE VIEW IS CENTERED IN IT
+    free_space = world_length - view_length
+    return free_space / 2 if free_space < 0 else min(max(position, 0.0), free_space)
+
+
+class EdgeIndex:
+    # THE SEGMENTS OF ALL THE EDGES AS ARRAYS, SO FINDING THE ONES IN VIEW IS A FEW COMPARISONS OVER WHOLE COLUMNS
+    # INSTEAD OF A PYTHON LOOP OVER THOUSANDS OF EDGES
+    def __init__(self, map_data, world_width: int):
+        segments = []
+        for city1, city2 in map_data.edges():
+            segments += edge_segments(int(map_data.xs[city1]), int(map_data.ys[city1]),
+                                      int(map_data.xs[city2]), int(map_data.ys[city2]), world_width)
+
+        self.segments = np.array(segments, dtype=np.float64).reshape(-1, 4)
+        x1, y1, x2, y2 = self.segments.T
+        self.left = np.minimum(x1, x2)
+        self.right = np.maximum(x1, x2)
+        self.top = np.minimum(y1, y2)
+        self.bottom = np.maximum(y1, y2)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def query_rect(self, left: float, top: float, right: float, bottom: float) -> np.ndarray:
+        # THE SEGMENTS WHOSE BOUNDING BOX MEETS THE RECT, ONE (x1, y1, x2, y2) ROW EACH
+        in_rect = (self.left <= right) & (self.right >= left) & (self.top <= bottom) & (self.bottom >= top)
+        return self.segments[in_rect]
+
+
+class Camera:
+    def __init__(self, world_width: int, world_height: int, view_width: int = c.WIDTH, view_height: int = c.HEIGHT):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.view_width = view_width
+        self.view_height = view_height
+        # ZOOMED ALL THE WAY OUT, WHERE THE CAMERA STARTS, THE WHOLE WORLD FITS THE VIEW. THE STANDARD MAP IS THE SIZE
+        # OF THE SCREEN, SO THERE THAT IS A ZOOM OF 1
+        self.min_zoom = min(1.0, view_width / world_width, view_height / world_height)
+        self.zoom = self.min_zoom
+        # THE WORLD COORDINATES AT THE TOP LEFT OF THE VIEW
+        self.x = 0.0
+        self.y = 0.0
+        self.clamp()
+
+    @property
+    def is_identity(self) -> bool:
+        return self.zoom == 1 and self.x == 0 and self.y == 0
+
+    @property
+    def world_rect(self) -> (float, float, float, float):
+        return self.x, self.y, self.x + self.view_width / self.zoom, self.y + self.view_height / self.zoom
+
+    @property
+    def show_cubes(self) -> bool:
+        return self.zoom >= CUBE_ZOOM
+
+    @property
+    def marker_radius(self) -> int:
+        return max(MIN_MARKER_RADIUS, round(c.RADIUS_OF_CIRCLE * min(1.0, self.zoom)))
+
+    def show_labels(self, visible_cities: int) -> bool:
+        return self.zoom >= LABEL_ZOOM and visible_cities <= MAX_LABELED_CITIES
+
+    def to_screen(self, x: float, y: float) -> (int, int):
+        return round((x - self.x) * self.zoom), round((y - self.y) * self.zoom)
+
+    def to_screen_arrays(self, xs: np.ndarray, ys: np.ndarray) -> (np.ndarray, np.ndarray):
+        # THE SAME ROUNDING AS to_screen, FOR ALL THE CITIES IN VIEW AT ONCE
+        return (np.rint((xs - self.x) * self.zoom).astype(np.int64),
+                np.rint((ys - self.y) * self.zoom).astype(np.int64))
+
+    def to_world(self, screen_x: float, screen_y: float) -> (float, float):
+        return self.x + screen_x / self.zoom, self.y + screen_y / self.zoom
+
+    def clamp(self):
+        self.x = clamp_axis(self.x, self.world_width, self.view_width / self.zoom)
+        self.y = clamp_axis(self.y, self.world_height, self.view_height / self.zoom)
+
+    def zoom_at(self, screen_x: float, screen_y: float, factor: float) -> bool:
+        # THE POINT UNDER THE CURSOR STAYS WHERE IT IS. RETURNS WHETHER THE VIEW CHANGED
+        zoom = min(max(self.zoom * factor, self.min_zoom), MAX_ZOOM)
+        if zoom == self.zoom:
+            return False
+        world_x, world_y = self.to_world(screen_x, screen_y)
+        self.zoom = zoom
+        self.x = world_x - screen_x / zoom
+        self.y = world_y - screen_y / zoom
+        self.clamp()
+        return True
+
+    def pan(self, screen_dx: float, screen_dy: float) -> bool:
+        old_position = (self.x, self.y)
+        self.x += screen_dx / self.zoom
+        self.y += screen_dy / self.zoom
+        self.clamp()
+        return (self.x, self.y) != old_position
+
+    def reset(self) -> bool:
+        old_view = (self.zoom, self.x, self.y)
+        self.zoom = self.min_zoom
+        self.x = 0.0
+        self.y = 0.0
+        self.clamp()
+        return (self.zoom, self.x, self.y) != old_view
@@ -0,0 +1,161 @@
+import pygame
+from Button import Button, display_buttons
+from Fonts import render_text
+import Constants as c
+import Input
+
+# THE SIDE OF THE SQUARES A PANEL IS CUT INTO TO FIND THE BUTTON UNDER A CLICK
+GRID_CELL = 100
+
+
+class Label(Button):
+    # TEXT THAT IS PART OF A SCREEN BUT CAN'T BE CLICKED, SO IT IS REPAINTED WITH THE BUTTONS AROUND IT
+    def __init__(self, x: int, y: int, name: str, text: str, text_size: int, text_color: tuple[int, int, int] = c.RED,
+                 background: tuple[int, int, int] | None = None):
+        super().__init__(x, y, name)
+        self.clickable = False
+        self.text = text
+        self.text_size = text_size
+        self.text_color = text_color
+        self.background = background
+
+    @property
+    def rect(self) -> pygame.Rect:
+        return self.bounds
+
+    @property
+    def bounds(self) -> pygame.Rect:
+        return self.render().get_rect(topleft=(self.x, self.y))
+
+    def render(self) -> pygame.Surface:
+        return render_text(self.text, self.text_size, self.text_color, self.background)
+
+    def display_button(self, screen: pygame.Surface):
+        screen.blit(self.render(), (self.x, self.y))
+
+    def is_point_inside(self, x: int, y: int):
+        return False
+
+
+class Panel:
+    # A RECT OF THE SCREEN THAT OWNS ITS WIDGETS AND THE PANELS INSIDE IT. A CLICK ONLY GOES DOWN INTO THE VISIBLE PANELS
+    # WHOSE RECT HOLDS IT, AND INSIDE A PANEL ONLY THE WIDGETS OF THE GRID CELL UNDER THE CLICK ARE TESTED, SO FINDING
+    # THE CLICKED BUTTON DOESN'T DEPEND ON HOW MANY BUTTONS A SCREEN HAS
+    def __init__(self, rect: pygame.Rect, background: pygame.Surface | None = None, visible: bool = True):
+        self.rect = pygame.Rect(rect)
+        # DRAWN AT THE TOP LEFT OF THE PANEL UNDER ITS WIDGETS, A PANEL WITHOUT ONE IS TRANSPARENT
+        self.background = background
+        self.visible = visible
+        self.widgets = []
+        self.panels = []
+        self.cells = {}
+        # THE AREAS OF THE SCREEN TO PAINT AT THE NEXT draw, BESIDES THOSE OF THE DIRTY WIDGETS. A TRANSPARENT PANEL HAS
+        # NOTHING OF ITS OWN TO PAINT UNTIL IT IS SHOWN OR HIDDEN
+        self.invalid = [self.rect.copy()] if background is not None else []
+
+    def cells_of(self, rect: pygame.Rect):
+        for cell_x in range(rect.left // GRID_CELL, (rect.right - 1) // GRID_CELL + 1):
+            for cell_y in range(rect.top // GRID_CELL, (rect.bottom - 1) // GRID_CELL + 1):
+                yield cell_x, cell_y
+
+    def add(self, *widgets: Button):
+        for widget in widgets:
+            self.widgets.append(widget)
+            widget.dirty = True
+            for cell in self.cells_of(widget.rect):
+                self.cells.setdefault(cell, []).append(widget)
+
+    def add_panel(self, panel: "Panel") -> "Panel":
+        self.panels.append(panel)
+        return panel
+
+    def replace_widgets(self, widgets: list[Button]):
+        for widget in self.widgets:
+            if widget.drawn_bounds is not None:
+                self.invalid.append(widget.drawn_bounds)
+        self.widgets = []
+        self.cells = {}
+        self.add(*widgets)
+
+    def find(self, info: str) -> Button | None:
+        return next((widget for widget in self.widgets if widget.info == info), None)
+
+    def set_visible(self, visible: bool):
+        if visible != self.visible:
+            self.visible = visible
+            self.invalid.append(self.rect.copy())
+
+    def panel_at(self, x: int, y: int) -> "Panel | None":
+        # THE INNERMOST VISIBLE PANEL UNDER THE POINT. THE PANELS ADDED LAST ARE ON TOP
+        if not (self.visible and self.rect.collidepoint(x, y)):
+            return None
+        for panel in reversed(self.panels):
+            found = panel.panel_at(x, y)
+            if found is not None:
+                return found
+        return self
+
+    def route(self, x: int, y: int) -> Button | None:
+        # THE CLICKABLE WIDGET UNDER THE POINT, LOOKING IN THE PANELS ON TOP FIRST
+        if not (self.visible and self.rect.collidepoint(x, y)):
+            return None
+        for panel in reversed(self.panels):
+            widget = panel.route(x, y)
+            if widget is not None:
+                return widget
+        for widget in reversed(self.cells.get((x // GRID_CELL, y // GRID_CELL), ())):
+            if widget.is_clicked(x, y):
+                return widget
+        return None
+
+    def collect_invalid(self) -> list[pygame.Rect]:
+        # WHERE A DIRTY WIDGET WAS AND WHERE IT IS NOW, ITS TEXT OR IMAGE MAY HAVE CHANGED SIZE
+        areas = self.invalid
+        self.invalid = []
+        for widget in self.widgets:
+            if widget.dirty:
+                if widget.drawn_bounds is not None:
+                    areas.append(widget.drawn_bounds)
+                areas.append(widget.bounds)
+                widget.dirty = False
+        for panel in self.panels:
+            areas += panel.collect_invalid()
+        return areas
+
+    def paint(self, screen: pygame.Surface, area: pygame.Rect):
+        if not (self.visible and self.rect.colliderect(area)):
+            return
+
+        if self.background is not None:
+            clipped = area.clip(self.rect)
+            screen.blit(self.background, clipped.topleft, clipped.move(-self.rect.x, -self.rect.y))
+
+        widgets = [widget for widget in self.widgets if widget.bounds.colliderect(area)]
+        display_buttons(screen, widgets)
+        for widget in widgets:
+            widget.drawn_bounds = widget.bounds
+
+        for panel in self.panels:
+            panel.paint(screen, area)
+
+    def draw(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        # PAINTS ONLY WHAT CHANGED SINCE THE LAST DRAW: EVERY INVALID AREA IS REDRAWN FROM THE BACKGROUNDS UP WITH ALL
+        # THE WIDGETS IN IT, IN THE ORDER THEY WERE ADDED. RETURNS THE AREAS THAT WERE PAINTED
+        areas = []
+        for area in sorted(self.collect_invalid(), key=lambda rect: rect.width * rect.height, reverse=True):
+            if area.width and area.height and not any(painted.contains(area) for painted in areas):
+                areas.append(area)
+
+        for area in areas:
+            screen.set_clip(area)
+            self.paint(screen, area)
+        screen.set_clip(None)
+        return areas
+
+
+def refresh(screen: pygame.Surface, panel: Panel):
+    # DRAWS WHAT CHANGED ON A SCREEN MADE OF PANELS AND SENDS ONLY THAT TO THE DISPLAY
+    areas = panel.draw(screen)
+    if areas:
+        pygame.display.update(areas)
+        Input.frame_drawn()
@@ -0,0 +1,97 @@
+import random
+from functools import lru_cache
+import Constants as c
+
+ZOBRIST_SEED = 0x5EED
+MAX_PLAYERS = 4
+MAX_CUBES = 3
+TRANSPOSITION_TABLE_SIZE = 1 << 16
+
+# ZOBRIST HASHING: EVERY PIECE OF THE STATE HAS A RANDOM 64 BIT KEY AND THE HASH OF A STATE IS THE XOR OF THE KEYS
+# OF EVERYTHING IN IT, SO A CHANGE TO ONE PIECE UPDATES THE HASH WITH ONE OR TWO XORS
+
+
+class ZobristKeys:
+    def __init__(self, cities: int, seed: int = ZOBRIST_SEED):
+        rng = random.Random(seed)
+        colors = len(c.COLOR_NAMES)
+
+        def table(*shape):
+            if len(shape) == 1:
+                return [rng.getrandbits(64) for _ in range(shape[0])]
+            return [table(*shape[1:]) for _ in range(shape[0])]
+
+        self.positions = table(MAX_PLAYERS, cities)
+        self.hands = table(MAX_PLAYERS, cities)
+        # THE KEY FOR ZERO CUBES IS 0 SO AN EMPTY BOARD HASHES TO 0
+        self.cubes = [[[0] + table(MAX_CUBES) for _ in range(colors)] for _ in range(cities)]
+        self.research_stations = table(cities)
+        self.infection_discards = table(cities)
+        self.cured = table(colors)
+        self.eradicated = table(colors)
+
+        # SMALL COUNTERS ARE MIXED IN WHEN THE HASH IS READ INSTEAD OF BEING KEPT IN THE INCREMENTAL HASH
+        self.current_player = table(MAX_PLAYERS)
+        self.moves = table(c.ACTIONS_PER_TURN + 1)
+        self.outbreaks = table(c.OUTBREAK_LIMIT + 1)
+        self.infection_rate_counter = table(max(c.EPIDEMIC_CARDS.values()) + 1)
+        self.player_deck_size = table(cities + max(c.EPIDEMIC_CARDS.values()) + 1)
+        self.discard_phase = rng.getrandbits(64)
+        self.game_over = rng.getrandbits(64)
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(cities: int) -> ZobristKeys:
+    # THE KEYS ONLY DEPEND ON THE SIZE OF THE MAP, SO ALL GAMES (AND ALL THEIR COPIES) SHARE THEM
+    return ZobristKeys(cities)
+
+
+class TranspositionTable:
+    # A FIXED NUMBER OF SLOTS INDEXED BY THE LOW BITS OF THE HASH. WHEN TWO POSITIONS WANT THE SAME SLOT THE ENTRY
+    # FROM AN OLDER SEARCH IS REPLACED FIRST, OTHERWISE THE ONE SEARCHED LESS DEEPLY
+    def __init__(self, size: int = TRANSPOSITION_TABLE_SIZE):
+        if size & (size - 1):
+            raise ValueError(f"The size of a transposition table must be a power of two, not {size}")
+        self.mask = size - 1
+        self.slots = [None] * size
+        self.generation = 0
+        self.entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.replacements = 0
+
+    def __len__(self):
+        return self.entries
+
+    def __str__(self):
+        return (f"TranspositionTable: {self.entries} of {len(self.slots)} slots, {self.hits} hits, "
+                f"{self.misses} misses, {self.replacements} replacements")
+
+    def new_search(self):
+        # THE ENTRIES STAY USABLE BUT EVERYTHING STORED FROM NOW ON WINS OVER THEM
+        self.generation += 1
+
+    def get(self, key: int, default=None):
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[3]
+        self.misses += 1
+        return default
+
+    def store(self, key: int, value, depth: int = 0):
+        slot = key & self.mask
+        entry = self.slots[slot]
+
+        if entry is None:
+            self.entries += 1
+        elif entry[0] != key:
+            if entry[1] == self.generation and entry[2] > depth:
+                return
+            self.replacements += 1
+
+        self.slots[slot] = (key, self.generation, depth, value)
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+        self.entries = 0
@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MapCompiler import load_map
+from Engine import GameState, PLAYING
+from BatchInfection import InfectionBatch
+
+GAMES = 2000
+PHASES = 10
+
+
+def engine_infections_per_second(map_data) -> float:
+    states = []
+    for seed in range(GAMES):
+        state = GameState(map_data, "NORMAL", seed)
+        state.setup(["Scientist", "Medic"])
+        states.append(state)
+
+    start = time.perf_counter()
+    for _ in range(PHASES):
+        for state in states:
+            if state.status == PLAYING:
+                state.infection_phase()
+    return GAMES * PHASES / (time.perf_counter() - start)
+
+
+def batch_infections_per_second(map_data) -> float:
+    batch = InfectionBatch(map_data, GAMES, seed=0)
+    batch.infect_initial()
+
+    start = time.perf_counter()
+    for _ in range(PHASES):
+        batch.infection_phase()
+    return GAMES * PHASES / (time.perf_counter() - start)
+
+
+def main():
+    map_data = load_map()
+    engine = engine_infections_per_second(map_data)
+    batch = batch_infections_per_second(map_data)
+    print(f"engine: {engine:12.0f} infection phases/sec")
+    print(f" batch: {batch:12.0f} infection phases/sec ({batch / engine:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
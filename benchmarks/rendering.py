@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+START = time.perf_counter()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 3
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "rendering_baseline.json")
+RESULTS_FILE = os.path.join(ROOT, "benchmarks", "rendering_results.json")
+TOLERANCE = 0.15
+ROLES = ["Scientist", "Researcher"]
+
+# EVERY RUN IS A FRESH PROCESS THAT PLAYS THE REAL main.py UNDER SDL'S DUMMY DRIVER. THE SCRIPTED CLICKS ARE POSTED
+# ONE AT A TIME, WHENEVER THE GAME WAITS FOR INPUT, SO A RUN DOESN'T DEPEND ON HOW FAST THE MACHINE IS
+
+TIMED_METHODS = ("display_board", "display_current_board_position", "display_player_hand")
+
+MENU_CLICKS = [
+    (640, 410),  # PLAY
+    (205, 449),  # 2 PLAYERS
+    (805, 449),  # EASY
+    (635, 625),  # CONTINUE
+    (35, 260),  # SCIENTIST
+    (435, 260),  # RESEARCHER
+    (1210, 410)  # START
+]
+ACTION_TAB = (10, 790)
+HAND_BUTTON = (310, 560)
+BUILD_BUTTON = (505, 560)
+
+
+def card_position(position: int) -> (int, int):
+    return 5 + 190 * position + 20, 570
+
+
+def script_for_seed(map_data, seed: int) -> list | None:
+    # THE CLICKS OF THE FIRST TURN: DRIVE TO A NEIGHBOR, BUILD A RESEARCH STATION THERE, FLY WITH A CARD FROM THE
+    # HAND AND DRIVE ONCE MORE, WHICH ENDS THE TURN. ONLY SEEDS WHERE THE FIRST HAND ALLOWS THIS ARE USED
+    from Engine import GameState, Drive, BuildResearchStation, DirectFlight
+
+    state = GameState(map_data, "EASY", seed)
+    state.setup(list(ROLES))
+    start = state.player.city
+    neighbor = next((city for city in state.neighbors(start) if city in state.player.hand), None)
+    if neighbor is None:
+        return None
+
+    clicks = [(int(map_data.xs[neighbor]), int(map_data.ys[neighbor]))]
+    state.apply(Drive(neighbor))
+
+    clicks += [ACTION_TAB, BUILD_BUTTON, card_position(state.player.hand.index(neighbor))]
+    state.apply(BuildResearchStation())
+
+    card = state.player.hand[0]
+    clicks += [ACTION_TAB, HAND_BUTTON, card_position(0)]
+    state.apply(DirectFlight(card))
+
+    last = state.neighbors(card)[0]
+    clicks.append((int(map_data.xs[last]), int(map_data.ys[last])))
+    return clicks
+
+
+def find_script(map_data) -> (int, list):
+    for seed in range(1000):
+        clicks = script_for_seed(map_data, seed)
+        if clicks is not None:
+            return seed, MENU_CLICKS + clicks
+    raise RuntimeError("No seed gives a first hand that can build next to the starting city")
+
+
+def summarize(durations: list[float]) -> dict:
+    durations = sorted(durations)
+    if not durations:
+        return {"count": 0, "median_ms": 0.0, "p95_ms": 0.0}
+    return {"count": len(durations), "median_ms": statistics.median(durations) * 1000,
+            "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000}
+
+
+def run_child(result_file: str):
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import runpy
+    import pygame
+    import Input
+    from Board import GUI
+    from MapCompiler import load_map
+
+    seed, clicks = find_script(load_map())
+    durations = {name: [] for name in TIMED_METHODS}
+    latencies = []
+    flips = []
+    pending = []
+
+    def timed(name, method):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                durations[name].append(time.perf_counter() - start)
+        return wrapper
+
+    for name in TIMED_METHODS:
+        setattr(GUI, name, timed(name, getattr(GUI, name)))
+
+    def flipped(display_function):
+        def wrapper(*args, **kwargs):
+            result = display_function(*args, **kwargs)
+            now = time.perf_counter()
+            flips.append(now)
+            # EVENT TO FLIP: FROM POSTING A CLICK TO THE FIRST FRAME SENT TO THE DISPLAY AFTER IT
+            if pending:
+                latencies.append(now - pending.pop())
+            return result
+        return wrapper
+
+    pygame.display.flip = flipped(pygame.display.flip)
+    pygame.display.update = flipped(pygame.display.update)
+
+    script = iter(clicks)
+    wait_for_event = Input.dispatcher.wait_for_event
+
+    def scripted_wait_for_event():
+        if not pygame.event.peek():
+            click = next(script, None)
+            if click is None:
+                pygame.event.post(pygame.event.Event(pygame.QUIT))
+            else:
+                pending[:] = [time.perf_counter()]
+                pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=click))
+        return wait_for_event()
+
+    Input.dispatcher.wait_for_event = scripted_wait_for_event
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_file = os.path.join(directory, "game.log")
+        sys.argv = ["main.py", "--seed", str(seed), "--log", log_file, "--checkpoint",
+                    os.path.join(directory, "checkpoint.sav")]
+        try:
+            runpy.run_path("main.py", run_name="__main__")
+        except SystemExit:
+            pass
+        # A RUN WHERE THE SCRIPT DIDN'T GET THROUGH THE TURN WOULD TIME SOMETHING ELSE
+        from Replay import read_log
+        actions = len(read_log(log_file).actions)
+        assert actions == 4, f"the scripted turn logged {actions} actions instead of 4"
+
+    results = {"startup_ms": (flips[0] - START) * 1000, "total_s": time.perf_counter() - START, "actions": actions,
+               "event_to_flip": summarize(latencies)}
+    results.update({name: summarize(durations[name]) for name in TIMED_METHODS})
+    with open(result_file, "w") as f:
+        json.dump(results, f)
+
+
+def run_once() -> dict:
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    with tempfile.TemporaryDirectory() as directory:
+        result_file = os.path.join(directory, "result.json")
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--child", result_file], cwd=ROOT, env=env,
+                       capture_output=True, check=True)
+        with open(result_file) as f:
+            return json.load(f)
+
+
+def median_of_runs(runs: list[dict]) -> dict:
+    # THE MEDIAN OF EVERY NUMBER OVER THE RUNS, KEEPING THE SHAPE OF A SINGLE RESULT
+    if isinstance(runs[0], dict):
+        return {key: median_of_runs([run[key] for run in runs]) for key in runs[0]}
+    return statistics.median(runs)
+
+
+def regressions(results: dict, baseline: dict, tolerance: float, prefix: str = "") -> list[str]:
+    found = []
+    for key, value in results.items():
+        if key not in baseline:
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            found += regressions(value, baseline[key], tolerance, f"{name}.")
+        elif key.endswith("_ms") and baseline[key] > 0 and value > baseline[key] * (1 + tolerance):
+            found.append(f"{name}: {value:.2f} ms, baseline {baseline[key]:.2f} ms "
+                         f"(+{(value / baseline[key] - 1) * 100:.0f}%)")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the real GUI driven by scripted clicks")
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--output", default=RESULTS_FILE, help="where the results are written as JSON")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown before failing")
+    parser.add_argument("--child", metavar="RESULT_FILE", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.child:
+        run_child(arguments.child)
+        return
+
+    results = median_of_runs([run_once() for _ in range(arguments.runs)])
+    with open(arguments.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"startup: {results['startup_ms']:8.1f} ms to first frame")
+    for name in ("event_to_flip",) + TIMED_METHODS:
+        print(f"{name:>31}: {results[name]['median_ms']:7.2f} ms median, {results[name]['p95_ms']:7.2f} ms p95 "
+              f"over {results[name]['count']:.0f} calls")
+    print(f"results written to {arguments.output} (median of {arguments.runs} runs)")
+
+    if arguments.save_baseline:
+        with open(arguments.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {arguments.baseline}")
+    elif os.path.exists(arguments.baseline):
+        with open(arguments.baseline) as f:
+            found = regressions(results, json.load(f), arguments.tolerance)
+        for regression in found:
+            print(f"REGRESSION {regression}")
+        if found:
+            sys.exit(1)
+        print(f"no regressions against {arguments.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MapCompiler import load_map
+from Engine import PLAYING
+from Server import HOST, TableClient
+
+TABLES = 200
+DURATION = 10.0
+PORT = 7787
+
+# THE SERVER RUNS IN ITS OWN PROCESS, THE CLIENTS OF ALL THE TABLES SHARE THIS ONE. EVERY CLIENT PLAYS ALL THE SEATS
+# OF ITS TABLE WITH RANDOM LEGAL ACTIONS FROM ITS OWN COPY OF THE GAME, SO THE DELTAS ARE WHAT KEEPS IT PLAYABLE
+
+
+async def play_table(client: TableClient, table_id: int, deadline: float, latencies: list[float]):
+    rng = random.Random(table_id)
+    games = 0
+    while time.perf_counter() < deadline:
+        # A FINISHED GAME IS REPLACED BY A NEW TABLE, SO THE NUMBER OF TABLES STAYS THE SAME
+        state = await client.join(table_id * 1000 + games, "NORMAL", 2, table_id * 1000 + games)
+        games += 1
+        while state.status == PLAYING and time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await client.send(rng.choice(state.legal_actions()))
+            latencies.append(time.perf_counter() - start)
+
+
+async def load_test(tables: int, duration: float, connect: dict) -> (list[float], float):
+    map_data = load_map()
+    clients = [TableClient(map_data) for _ in range(tables)]
+    for client in clients:
+        await client.connect(**connect)
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(play_table(client, table_id, start + duration, latencies)
+                           for table_id, client in enumerate(clients)))
+    elapsed = time.perf_counter() - start
+
+    for client in clients:
+        await client.close()
+    return latencies, elapsed
+
+
+def wait_for_server(server: subprocess.Popen):
+    # THE SERVER PRINTS ONE LINE ONCE IT LISTENS
+    line = server.stdout.readline()
+    if not line:
+        raise RuntimeError("The server didn't start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays many tables against Server.py and times the round trips")
+    parser.add_argument("--tables", type=int, default=TABLES)
+    parser.add_argument("--duration", type=float, default=DURATION, help="seconds to play")
+    parser.add_argument("--tcp", action="store_true", help="connect over TCP instead of a Unix socket")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if arguments.tcp:
+            connect = {"host": HOST, "port": PORT}
+            command = ["--host", HOST, "--port", str(PORT)]
+        else:
+            connect = {"unix_socket": os.path.join(directory, "tables.sock")}
+            command = ["--unix", connect["unix_socket"]]
+
+        server = subprocess.Popen([sys.executable, "Server.py"] + command, stdout=subprocess.PIPE, text=True)
+        try:
+            wait_for_server(server)
+            latencies, elapsed = asyncio.run(load_test(arguments.tables, arguments.duration, connect))
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+
+    def percentile(fraction: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+    print(f"{arguments.tables} tables over {'TCP' if arguments.tcp else 'a Unix socket'}: "
+          f"{len(latencies) / elapsed:.0f} actions/sec")
+    print(f"round trip: {percentile(0.5):.2f} ms median, {percentile(0.99):.2f} ms p99 over {len(latencies)} actions")
+
+
+if __name__ == "__main__":
+    main()
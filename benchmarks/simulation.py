@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Simulator
+
+GAMES_PER_SETTING = 40
+
+
+def games_per_second(workers: int) -> float:
+    start = time.perf_counter()
+    records = list(Simulator.simulate(GAMES_PER_SETTING, workers=workers))
+    return len(records) / (time.perf_counter() - start)
+
+
+def main():
+    # THROUGHPUT WITH A GROWING NUMBER OF WORKERS, TO SEE HOW CLOSE TO LINEAR THE SCALING IS
+    workers = 1
+    single_worker = None
+    while workers <= os.cpu_count():
+        rate = games_per_second(workers)
+        single_worker = single_worker or rate
+        print(f"{workers:>3} workers: {rate:8.1f} games/sec ({rate / single_worker:.2f}x)")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
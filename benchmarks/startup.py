@@ -0,0 +1,49 @@
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+
+# EACH RUN IS A FRESH PROCESS SO NOTHING IS ALREADY DECODED OR IMPORTED
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import os, sys
+sys.path.insert(0, os.getcwd())
+import pygame
+import Constants as c
+import Images as i
+import Menu
+from Button import ButtonFactory
+pygame.init()
+screen = pygame.display.set_mode((c.WIDTH, c.HEIGHT))
+if sys.argv[1] == "eager":
+    i.loader.prefetch()
+else:
+    i.start_prefetch()
+Menu.display_starting_screen(screen, ButtonFactory.create_starting_screen_button())
+print(time.perf_counter() - start)
+"""
+
+
+def time_to_first_frame(mode: str) -> float:
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, mode], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    results = {}
+    for mode in ("eager", "lazy"):
+        results[mode] = statistics.median(time_to_first_frame(mode) for _ in range(RUNS))
+        print(f"{mode:>5}: {results[mode] * 1000:8.1f} ms to first frame (median of {RUNS})")
+
+    print(f"improvement: {(results['eager'] - results['lazy']) * 1000:.1f} ms "
+          f"({results['eager'] / results['lazy']:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,160 +1,242 @@
+import argparse
+import os
+import random
 import pygame
 from Button import ButtonFactory
 from Board import Board, GUI
 from Player import Player
-from Deck import Deck, PlayerDeck, InfectionDeck
+from Engine import PLAYING, DISCARD_PHASE, Discard
+from MCTS import MCTSPlayer
 import Constants as c
 import Menu
 import Images as i
-
-pygame.init()
-
-# MAKE THE WINDOW THE SIZE OF YOUR SCREEN
-screen = pygame.display.set_mode((c.WIDTH, c.HEIGHT))
-# CREATE THE BOARD
-board = Board()
-button_factory = ButtonFactory()
-
-# STARTING SCREEN WHERE THE USER HAS TO CLICK THE START BUTTON TO CONTINUE TO THE NEXT SCREEN
-start_button = button_factory.create_starting_screen_button()
-Menu.display_starting_screen(screen, start_button)
-Menu.wait_to_continue_to_main_menu(start_button)
-
-wait = True
-main_menu_buttons = button_factory.create_main_menu_buttons()
-while wait:
-    Menu.display_main_menu(screen, main_menu_buttons, str(board.player_count), board.difficulty)
-    wait = Menu.wait_to_continue_to_role_menu(main_menu_buttons, board)
-
-number_of_players = board.player_count
-player_number = 1
-players = pygame.sprite.Group()
-role_dict = {
-    "Scientist": (i.role_1, i.role_1_pin),
-    "Researcher": (i.role_2, i.role_2_pin),
-    "Operations Expert": (i.role_3, i.role_3_pin),
-    "Contingency Planner": (i.role_4, i.role_4_pin),
-    "Dispatcher": (i.role_5, i.role_5_pin),
-    "Medic": (i.role_6, i.role_6_pin),
-    "Quarantine Specialist": (i.role_7, i.role_7_pin)
-}
-
-role_buttons = button_factory.create_roles_menu_buttons(role_dict)  # list of (Button, int) where int is the related to what part will be the button displayed
-offset_x = 0
-print(role_buttons)
-# PICKING AND CREATING THE PLAYERS
-while player_number <= int(board.player_count):
-    Menu.display_role_menu(screen, player_number, role_buttons, 1)
-    role = Menu.get_user_input(role_buttons, 1)
-    while type(role) is int:
-        Menu.display_role_menu(screen, player_number, role_buttons, role)
-        role = Menu.get_user_input(role_buttons, role)
-
-    print(role)
-    player_image = pygame.transform.scale(role_dict[role][1], (c.LENGTH_PLAYER, c.HEIGHT_PLAYER))
-    player = Player(role, player_image, 285 + offset_x, 250, offset_x)
-    print(player)
-    players.add(player)
-
-    player_number += 1
-    offset_x -= 5
-
-# MAKING THE FINAL SCREEN BEFORE THE START OF THE GAME
-Menu.display_chosen_game_options(screen, players, board)
-# CREATING THE CITY GRAPH IN THE BOARD
-board.add_cities()
-board.add_connections()
-
-# CREATES THE GUI
-game = GUI(screen, board)
-action_buttons = button_factory.create_action_buttons()
-game.action_button_list.extend(action_buttons)
-
-# CREATING THE DECKS
-player_deck = PlayerDeck(board.cities)
-players_discard_pile = Deck()
-player_deck.shuffle()
-
-infection_deck = InfectionDeck(board.cities)
-infection_discard_pile = Deck()
-infection_deck.shuffle()
-
-# FIRST INFECTIONS OF 9 CITIES
-target_cities = infection_deck.get_cards(9)
-infection_deck.remove_top_cards(9)
-infection_discard_pile.add_cards(target_cities)
-
-for i in range(9):
-    city_color = board.cities[target_cities[i].name].color
-    diseases = 3 if i < 3 else (2 if i < 6 else 1)
-    board.cities[target_cities[i].name].add_diseases(diseases, city_color)
-
-# DEALING CARDS TO ALL THE PLAYERS
-n = 4 if int(board.player_count) == 2 else (3 if int(board.player_count) == 3 else 2)
-
-for player in players:
-    drawn_cards = player_deck.get_cards(n)
-
-    player.draw([city.name for city in drawn_cards])
-    player_deck.remove_top_cards(n)
-    players_discard_pile.add_cards(drawn_cards)
-
-    print(player)
-    print(player_deck)
-
-run = True
-# GAME LOOP
-while run:
-    # PLAYERS TURN
-    for player in players:
-        game.display_current_board_position(player, players)
-        while player.moves > 0:
-            pygame.display.flip()
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    run = False
-
-                mouse_x, mouse_y = pygame.mouse.get_pos()
-                # ACTIONS POSSIBLE WITH MENU OFF
-                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and game.action_menu_open is False:
-
-                    # CHECKING TO SEE IF THE PLAYER TRIES TO OPEN THE ACTION MENU
-                    if mouse_y in range(780, 800):
-                        game.display_action_menu()
-                        game.display_action_icons()
-
-                        pygame.display.flip()
-                    else:
-                        # CHECKING IF THE PLAYER TRIES TO MOVE TO ANOTHER CITY
-                        chosen_city = board.get_city_at_coordinates(mouse_x, mouse_y)
-                        print(chosen_city)
-                        print(player.city)
-                        if chosen_city is not None and (board.has_edge(chosen_city, player.city)
-                                                        or (board.cities[chosen_city].has_research_station
-                                                            and board.cities[player.city].has_research_station)):
-                            player.move(board.cities[chosen_city].x, board.cities[chosen_city].y, chosen_city)
-                            game.display_current_board_position(player, players)
-                            break
-
-                # ACTIONS POSSIBLE WITH MENU ON
-                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and game.action_menu_open is True:
-
-                    # CLOSING THE MENU
-                    if mouse_y not in range(540, 800):
+import Input
+import SaveGame
+import Replay
+from Profiling import ProfileCapture, PROFILE_FILE, measure
+from Viewport import ZOOM_STEP, PAN_STEP
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pandemic")
+    parser.add_argument("--resume", action="store_true", help="continue the last unfinished game from its checkpoint")
+    parser.add_argument("--replay", metavar="LOG", help="replay a game log and continue playing from where it stops")
+    parser.add_argument("--turn", type=int, default=None, help="stop the replay at the start of this turn")
+    parser.add_argument("--seed", type=int, default=None, help="seed of a new game, random by default")
+    parser.add_argument("--log", default=Replay.REPLAY_FILE, help="where the game log is written")
+    parser.add_argument("--checkpoint", default=SaveGame.CHECKPOINT_FILE, help="where the checkpoint is written")
+    parser.add_argument("--profile-turns", type=int, default=0, help="run cProfile for this many turns")
+    parser.add_argument("--profile-file", default=PROFILE_FILE, help="where the cProfile output is written")
+    arguments = parser.parse_args()
+    # THE CONTINUED GAME IS WRITTEN FROM THE START, SO WRITING IT OVER THE LOG BEING REPLAYED WOULD LOSE EVERY ACTION
+    # AFTER --turn
+    if (arguments.replay is not None and os.path.exists(arguments.replay) and os.path.exists(arguments.log) and
+            os.path.samefile(arguments.replay, arguments.log)):
+        parser.error(f"--replay {arguments.replay} would be overwritten by the continued game, give it another --log")
+
+    pygame.init()
+
+    # MAKE THE WINDOW THE SIZE OF YOUR SCREEN
+    screen = pygame.display.set_mode((c.WIDTH, c.HEIGHT))
+    # DECODING THE REST OF THE IMAGES IN THE BACKGROUND WHILE THE STARTING SCREEN IS SHOWN
+    i.start_prefetch()
+    # CREATE THE BOARD
+    board = Board()
+    button_factory = ButtonFactory()
+
+    players = pygame.sprite.Group()
+    role_dict = {
+        "Scientist": (i.role_1, i.role_1_pin),
+        "Researcher": (i.role_2, i.role_2_pin),
+        "Operations Expert": (i.role_3, i.role_3_pin),
+        "Contingency Planner": (i.role_4, i.role_4_pin),
+        "Dispatcher": (i.role_5, i.role_5_pin),
+        "Medic": (i.role_6, i.role_6_pin),
+        "Quarantine Specialist": (i.role_7, i.role_7_pin)
+    }
+    roles = []
+    seats = []
+
+    # python main.py --resume CONTINUES FROM THE CHECKPOINT SAVED AFTER THE LAST ACTION OF AN UNFINISHED GAME
+    resuming = arguments.resume and os.path.exists(arguments.checkpoint)
+    replaying = arguments.replay is not None
+
+    # EVERY RANDOM CHOICE OF A NEW GAME COMES FROM THIS SEED, WHICH IS WRITTEN AT THE START OF ITS GAME LOG
+    seed = arguments.seed if arguments.seed is not None else random.SystemRandom().getrandbits(64)
+
+    if not (resuming or replaying):
+        # STARTING SCREEN WHERE THE USER HAS TO CLICK THE START BUTTON TO CONTINUE TO THE NEXT SCREEN
+        starting_screen = Menu.display_starting_screen(screen, button_factory.create_starting_screen_button())
+        Menu.wait_to_continue_to_main_menu(starting_screen)
+
+        wait = True
+        main_menu = Menu.create_main_menu(button_factory.create_main_menu_buttons())
+        while wait:
+            Menu.display_main_menu(screen, main_menu, str(board.player_count), board.difficulty)
+            wait = Menu.wait_to_continue_to_role_menu(main_menu, board)
+
+        player_number = 1
+        menu_rng = random.Random(seed)
+        role_buttons = button_factory.create_roles_menu_buttons(role_dict)  # list of (Button, int) where int is the related to what part will be the button displayed
+        seat_button = button_factory.create_seat_button()
+        role_menu = Menu.create_role_menu(role_buttons, seat_button)
+        # PICKING THE ROLES OF THE PLAYERS
+        while player_number <= int(board.player_count):
+            Menu.display_role_menu(screen, role_menu, player_number, 1)
+            role = Menu.get_user_input(role_menu, 1, menu_rng)
+            while type(role) is int:
+                Menu.display_role_menu(screen, role_menu, player_number, role)
+                role = Menu.get_user_input(role_menu, role, menu_rng)
+
+            roles.append(role)
+            seats.append(seat_button.info)
+            if seat_button.info == c.AI_SEAT:
+                Menu.toggle_seat(seat_button)
+            player_number += 1
+
+    # CREATING THE CITIES OF THE BOARD, THEIR CONNECTIONS ARE READ FROM THE COMPILED MAP
+    board.add_cities()
+
+    # SETTING UP THE GAME: DECKS, FIRST INFECTIONS AND STARTING HANDS
+    action_log = None
+    if replaying:
+        # THE LOGGED GAME IS FAST FORWARDED WITHOUT RENDERING AND THEN HANDED TO THE GUI
+        game_log = Replay.read_log(arguments.replay)
+        state, applied = Replay.replay(game_log, board.map, arguments.turn)
+        board.resume_game(state)
+        action_log = Replay.continue_log(game_log, applied, arguments.log)
+        seats = list(game_log.seats)
+    elif resuming:
+        state, seats = SaveGame.load_game(board.map, arguments.checkpoint)
+        board.resume_game(state)
+        # THE ACTIONS PLAYED FROM NOW ON GO AT THE END OF THE LOG OF THE GAME THAT IS RESUMED
+        action_log = Replay.resume_log(board.state, arguments.log)
+    else:
+        board.start_game(roles, seed)
+        action_log = Replay.ActionLog(seed, board.difficulty, roles, arguments.log, seats)
+
+    if resuming or replaying:
+        roles = [player.role for player in board.state.players]
+
+    # THE AI SEATS SHARE ONE SEARCH WITH ITS POOL OF WORKER PROCESSES
+    ai_player = MCTSPlayer() if c.AI_SEAT in seats else None
+
+    # CREATING THE PLAYERS
+    offset_x = 0
+    for index, role in enumerate(roles):
+        player = Player(role, role_dict[role][1], offset_x, board.state, index)
+        players.add(player)
+        offset_x -= 5
+
+    players.update(board.cities)
+
+    # MAKING THE FINAL SCREEN BEFORE THE START OF THE GAME
+    Menu.display_chosen_game_options(screen, players, board)
+
+    # CREATES THE GUI
+    game = GUI(screen, board)
+    game.action_log = action_log
+    game.checkpoint_file = arguments.checkpoint
+    game.seats = seats
+    game.action_panel.add(*button_factory.create_action_buttons())
+
+    # F3 SHOWS AND HIDES THE PROFILING OVERLAY
+    Input.dispatcher.key_handlers[pygame.K_F3] = game.toggle_profiling_overlay
+    # F4 SHOWS AND HIDES THE INFECTION RISK HEATMAP
+    Input.dispatcher.key_handlers[pygame.K_F4] = game.toggle_heatmap
+
+    # THE MOUSE WHEEL ZOOMS AT THE CURSOR, THE ARROW KEYS PAN AND HOME SHOWS THE WHOLE MAP AGAIN
+    Input.dispatcher.event_handlers[pygame.MOUSEWHEEL] = \
+        lambda event: game.zoom(ZOOM_STEP ** event.y, pygame.mouse.get_pos())
+    Input.dispatcher.key_handlers.update({
+        pygame.K_LEFT: lambda: game.pan(-PAN_STEP, 0),
+        pygame.K_RIGHT: lambda: game.pan(PAN_STEP, 0),
+        pygame.K_UP: lambda: game.pan(0, -PAN_STEP),
+        pygame.K_DOWN: lambda: game.pan(0, PAN_STEP),
+        pygame.K_HOME: game.reset_camera
+    })
+    profile_capture = ProfileCapture(arguments.profile_turns, arguments.profile_file)
+    if arguments.profile_turns > 0:
+        profile_capture.start(board.state.turn)
+
+    # GAME LOOP
+    while board.state.status == PLAYING:
+        # PLAYERS TURN
+        player = players.sprites()[board.state.current_player]
+        profile_capture.update(board.state.turn)
+
+        # ONLY WHAT WAS REDRAWN SINCE THE LAST CLICK IS SENT TO THE DISPLAY
+        with measure("frame"):
+            if game.action_menu_open is False:
+                game.display_current_board_position(player, players)
+            game.update_display()
+
+        # AN AI SEAT PLAYS ITS ACTIONS AND ITS DISCARDS WITHOUT WAITING FOR CLICKS, THE WINDOW KEEPS ANSWERING WHILE
+        # IT SEARCHES
+        if seats[board.state.current_player] == c.AI_SEAT:
+            Input.poll()
+            game.action_menu_open = False
+            game.apply_action(ai_player.choose(board.state, Input.poll), players)
+            continue
+
+        # THE PLAYER HAS MORE CARDS THAN THE HAND LIMIT AND HAS TO DISCARD ONE
+        if board.state.phase == DISCARD_PHASE:
+            card_buttons = button_factory.create_city_buttons(board.cities, player.cards)
+            game.display_player_hand(card_buttons)
+            discarded_card = game.pick_a_card()
+            game.action_menu_open = False
+            if discarded_card is not None:
+                game.apply_action(Discard(board.map.index[discarded_card]), players)
+            continue
+
+        mouse_x, mouse_y = Input.wait_for_click()
+        with measure("handle_click"):
+            # THE CLICK GOES TO THE INNERMOST PANEL UNDER IT, THE GAME SCREEN ITSELF WHEN IT MISSES ALL OF THEM
+            panel = game.widgets.panel_at(mouse_x, mouse_y)
+
+            # ACTIONS POSSIBLE WITH MENU OFF
+            if game.action_menu_open is False:
+
+                # CHECKING TO SEE IF THE PLAYER TRIES TO OPEN THE ACTION MENU
+                if panel is game.action_tab:
+                    game.display_action_menu()
+                else:
+                    # CHECKING IF THE PLAYER TRIES TO MOVE TO ANOTHER CITY
+                    chosen_city = game.city_at(mouse_x, mouse_y)
+                    if chosen_city is not None:
+                        move = board.state.movement_action(board.map.index[chosen_city])
+                        if move is not None:
+                            game.apply_action(move, players)
+
+            # ACTIONS POSSIBLE WITH MENU ON
+            else:
+
+                # CLOSING THE MENU
+                if panel is game.widgets:
+                    game.action_menu_open = False
+                else:
+                    # CHECKING IF THE PLAYER HAS PRESSED AN ACTION BUTTON
+                    button = game.action_panel.route(mouse_x, mouse_y)
+                    if button is not None and (button.info == "Hand" or button.info == "Build"):
+                        card_buttons = button_factory.create_city_buttons(board.cities, player.cards)
+                        game.display_player_hand(card_buttons)
+                        game.handle_button_action(button.info, player, players)
                         game.action_menu_open = False
-                        game.display_current_board_position(player, players)
-                        pygame.display.flip()
-                    else:
-                        # CHECKING IF THE PLAYER HAS PRESSED AN ACTION BUTTON
-                        for button in game.action_button_list:
-                            if button.is_clicked(mouse_x, mouse_y):
-                                if button.info == "Hand" or button.info == "Build":
-                                    card_buttons = button_factory.create_city_buttons(board.cities, player.cards)
-                                    game.display_player_hand(card_buttons)
-                                    game.handle_button_action(card_buttons, button.info, player, players)
-                                    game.action_menu_open = False
-
-        player.replenish_moves()
-
-pygame.quit()
+
+    game.display_current_board_position(players.sprites()[board.state.current_player], players)
+    profile_capture.stop()
+    game.display_game_over()
+    # A FINISHED GAME CAN'T BE RESUMED
+    if os.path.exists(arguments.checkpoint):
+        os.remove(arguments.checkpoint)
+    if ai_player is not None:
+        ai_player.close()
+    if action_log is not None:
+        action_log.close()
+    Input.wait_for_click()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    # THE AI SEATS SEARCH IN WORKER PROCESSES, WHICH IMPORT THIS MODULE AGAIN AND MUSTN'T START A GAME OF THEIR OWN
+    main()